@@ -1,10 +1,28 @@
+import arranque  # primero: marca el inicio para medir el arranque en frío
 import streamlit as st
 import pandas as pd
 import numpy as np
-import io
-import altair as alt 
-from accesibilidad_heatmaps import render_mapa_calor_accesible
-import streamlit.components.v1 as components
+import os
+import datetime
+import time
+from functools import partial
+from motor_calculo import (
+    DIAS_POR_MES, ORDEN_MESES, RESOLUCION_BASE, RESOLUCIONES,
+    columnas_franjas, detectar_resolucion, formato_hora, horas_por_franja,
+)
+from ingesta import columnas_tabla, error_duplicada, filas_duplicadas, ingerir_por_bloques, leer_tabla
+from almacen_cargas import AlmacenCargas
+from validacion import estilos_errores, indice_errores, indice_ventana, pagina_errores, validar_datos
+from grafo_calculo import construir_grafo_cuadro_carga
+from cache_resultados import CacheResultados
+from exportaciones import MIME, diferida, diferida_tabla, informe_diferido, plantilla, tabla_metricas
+from simulacion_anual import TIPOS_DIA, es_bisiesto, parsear_festivos, serie_anual
+from consultas_demanda import parsear_valores
+from escenarios import generar_escenarios
+from proyectos import ARCHIVO_POR_DEFECTO, AlmacenProyectos
+# altair, streamlit.components.v1, los mapas de calor y el informe PDF se importan
+# al usarse (pestaña 2 con datos), no en el arranque: ver arranque.py
+arranque.desde_inicio("importaciones base")
 
 def inject_print_css(page_size: str = "A4", orientation: str = "portrait", margin_mm: int = 12):
     st.markdown(f"""
@@ -23,6 +41,8 @@ def inject_print_css(page_size: str = "A4", orientation: str = "portrait", margi
     """, unsafe_allow_html=True)
 
 def render_print_button(titulo="📄 Imprimir / Descargar PDF", delay_ms: int = 600):
+    import streamlit.components.v1 as components
+
     components.html(f"""
       <div style="text-align:center; margin-top: 1.5rem;">
         <button id="print-btn" style="
@@ -75,25 +95,165 @@ def render_print_button(titulo="📄 Imprimir / Descargar PDF", delay_ms: int =
     """, height=90)
 
 
+@st.cache_resource
+def cache_compartida():
+    """Caché de resultados única por proceso, compartida por todas las sesiones.
+    Si se define CUADRO_CARGA_CACHE_DIR, los resultados también se guardan en ese directorio."""
+    return CacheResultados(
+        max_elementos=int(os.environ.get("CUADRO_CARGA_CACHE_MAX", "512")),
+        directorio=os.environ.get("CUADRO_CARGA_CACHE_DIR") or None,
+    )
+
+
+@st.cache_resource
+def almacen_proyectos():
+    """Archivo SQLite de proyectos compartido por todas las sesiones (CUADRO_CARGA_PROYECTOS: ruta del archivo)."""
+    return AlmacenProyectos(os.environ.get("CUADRO_CARGA_PROYECTOS") or ARCHIVO_POR_DEFECTO)
+
+
+@st.cache_resource
+def precarga_modulos():
+    """Importa los módulos pesados en segundo plano, una sola vez por proceso (CUADRO_CARGA_PRECARGA=1)."""
+    return arranque.precargar()
+
+
+def aplicar_edicion_tabla(almacen: AlmacenCargas, claves_visibles: list):
+    """
+    on_change del editor: aplica al almacén solo el delta (filas editadas, agregadas y eliminadas).
+    Si la tabla estaba validada y las filas del delta están bien, sigue validada (ver AlmacenCargas.validada).
+    """
+    if almacen.aplicar_cambios(claves_visibles, st.session_state.get("editor_tabla") or {}):
+        # El índice de errores de la validación anterior deja de corresponder a la tabla
+        st.session_state.pop("indice_validacion", None)
+        st.session_state.pop("errores_validacion", None)
+
+
+def guardar_proyecto(proyectos: AlmacenProyectos, nombre: str):
+    """Guarda la tabla de cargas y los ajustes de la sesión como 'nombre' (ValueError si hay cargas duplicadas)."""
+    almacen = st.session_state["almacen_cargas"]
+    ajustes = {clave: st.session_state[clave] for clave in AJUSTES_PROYECTO if clave in st.session_state}
+    ajustes["validada"] = almacen.validada
+    proyectos.guardar_proyecto(nombre, almacen, ajustes)
+    st.session_state["proyecto_activo"] = nombre
+    st.session_state["version_guardada"] = almacen.version
+
+
+def abrir_proyecto(proyectos: AlmacenProyectos, nombre: str):
+    """
+    Lectura indexada de un proyecto guardado: reemplaza el almacén de la sesión (armado con las
+    máscaras guardadas; la sesión no guarda otra copia de la tabla) y restaura sus ajustes.
+    """
+    almacen, ajustes = proyectos.abrir_almacen(nombre)
+    st.session_state["almacen_cargas"] = almacen
+    for clave in ("indice_validacion", "errores_validacion"):
+        st.session_state.pop(clave, None)
+    if ajustes.get("validada"):
+        # Se guardó validada: el análisis queda disponible sin volver a validar
+        almacen.marcar_validada()
+
+    # Ajustes y los widgets que los muestran (se crean después, en este mismo rerun)
+    for clave in AJUSTES_PROYECTO:
+        if clave in ajustes:
+            st.session_state[clave] = ajustes[clave]
+    for mes, valor in ajustes.get("ajustes_mensuales", {}).items():
+        st.session_state[f"ajuste_{mes}"] = st.session_state[f"slider_{mes}"] = valor
+    if "ajuste_general" in ajustes:
+        st.session_state["slider_general"] = ajustes["ajuste_general"]
+    for limite in ("inicio", "fin"):
+        if f"hora_diurna_{limite}" in ajustes:
+            valor = ajustes[f"hora_diurna_{limite}"]
+            if almacen.resolucion == RESOLUCION_BASE:
+                st.session_state[f"diurno_{limite}"] = int(valor)
+            else:
+                st.session_state[f"diurno_{limite}_{almacen.resolucion}"] = float(valor)
+    st.session_state["proyecto_activo"] = nombre
+    st.session_state["version_guardada"] = almacen.version
+
+
+def leer_horario_tipo_dia(archivo, resolucion: int, clave: str):
+    """Tabla de horarios de fin de semana / festivos, validada y remuestreada a 'resolucion'.
+    Devuelve None si no hay archivo o si no es válida (en ese caso se usa el horario laborable)."""
+    if archivo is None:
+        return None
+    guardado = st.session_state.get(f"horario_{clave}")
+    if guardado is not None and guardado[0] == (archivo.file_id, resolucion):
+        return guardado[1]
+    try:
+        df = leer_tabla(archivo, resolucion=resolucion)
+    except Exception as e:
+        st.error(f"Error al leer el archivo: {e}")
+        return None
+    errores = ["No hay datos para validar."] if df.empty else validar_datos(df, columnas=columnas_tabla(resolucion, item=False))
+    if errores:
+        st.error("El horario no es válido; se usará el horario laborable:\n- " + "\n- ".join(errores))
+        return None
+    st.session_state[f"horario_{clave}"] = ((archivo.file_id, resolucion), df)
+    return df
+
+
 st.set_page_config(page_title="Cuadro de Carga - Dashboard", layout="wide")
 
 # ======== TÍTULO GENERAL ========
 st.title("📊 Cuadro de Carga (Load Duration Curve)")
 st.markdown("Bienvenido al sistema para cargar, validar y analizar datos eléctricos.")
 
+# Tamaño a partir del cual la carga de archivos usa el modo por bloques
+UMBRAL_BLOQUES_MB = 20
+# Resaltado de celdas con errores en el editor y paginación del reporte de validación
+LIMITE_RESALTADO_FILAS = 20_000
+# A partir de este número de cargas el editor muestra una página (filtrable por nombre)
+TAMANO_PAGINA_EDITOR = 500
+TAMANO_PAGINA_ERRORES = 100
+# Métodos de construcción de la LDC anual (ver constructor_ldc.py)
+METODOS_LDC = {
+    "auto": "Automático",
+    "completo": "Orden completo (exacto)",
+    "top_k": "Top-K exacto + histograma",
+    "histograma": "Histograma (aproximado)",
+}
+# Escenarios: máximo de puntos del gráfico comparativo y de escenarios con detalle mensual
+LIMITE_PUNTOS_ESCENARIOS = 5_000
+LIMITE_ESCENARIOS_MENSUAL = 20
+NOMBRES_DIAS = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+
+# Ajustes de la sesión que se guardan con cada proyecto (ver proyectos.py)
+AJUSTES_PROYECTO = (
+    "ajustes_mensuales", "ajuste_general", "modo_ajuste_estacional",
+    "hora_diurna_inicio", "hora_diurna_fin", "filtro_mes_ref",
+)
+
+# ======== PROYECTOS ========
+# Tablas, ajustes y resultados en un archivo SQLite local: reabrir un proyecto es una lectura indexada
+proyectos = almacen_proyectos()
+with st.sidebar:
+    st.header("📁 Proyectos")
+    lista_proyectos = proyectos.proyectos()
+    if not lista_proyectos.empty:
+        proyecto_elegido = st.selectbox(
+            "Proyecto guardado", lista_proyectos["Proyecto"].tolist(), key="proyecto_elegido",
+            format_func=lambda p: f"{p} ({lista_proyectos.set_index('Proyecto').at[p, 'Cargas']:,} cargas)",
+        )
+        if st.button("📂 Abrir proyecto", use_container_width=True):
+            abrir_proyecto(proyectos, proyecto_elegido)
+            st.rerun()
+    nombre_proyecto = st.text_input("Nombre del proyecto", value=st.session_state.get("proyecto_activo", ""))
+    if st.button("💾 Guardar proyecto", use_container_width=True):
+        if not nombre_proyecto.strip():
+            st.warning("Debes ingresar un nombre de proyecto.")
+        elif "almacen_cargas" not in st.session_state or st.session_state["almacen_cargas"].empty:
+            st.warning("No hay cargas para guardar.")
+        else:
+            try:
+                guardar_proyecto(proyectos, nombre_proyecto.strip())
+                st.success(f"✅ Proyecto '{nombre_proyecto.strip()}' guardado.")
+            except ValueError as e:
+                st.error(f"❌ No se guardó el proyecto. {e}")
+    if st.session_state.get("proyecto_activo"):
+        st.caption(f"Proyecto activo: **{st.session_state['proyecto_activo']}**")
+
 # ======== PESTAÑAS ========
 tab1, tab2 = st.tabs(["⚡ Carga y Validación de Datos", "⚙️ Procesamiento y Análisis"])
 
-# Función auxiliar para reindexar la columna Item
-def reindexar_items(df):
-    """Asigna un índice secuencial (1, 2, 3...) a la columna 'Item'."""
-    if not df.empty:
-        # Crea una nueva columna 'Item' basada en el índice actual + 1
-        df['Item'] = range(1, len(df) + 1)
-        # Aseguramos que 'Item' sea un tipo de dato entero
-        df['Item'] = df['Item'].astype('Int64')
-    return df
-
 # ---------------------------------------------------------------------------
 # 🟩 PESTAÑA 1: CARGA Y VALIDACIÓN DE DATOS
 # ---------------------------------------------------------------------------
@@ -105,23 +265,30 @@ with tab1:
     st.info(
         "💡 **Instrucciones:**\n"
         "1. Sube un archivo en formato **CSV** o **Excel (XLSX)** que contenga las columnas "
-        "`Carga`, `Potencia (W)` y las horas `0` a `23`.\n"
+        "`Carga`, `Potencia (W)` y las horas `0` a `23` (o franjas de 30, 15 o 5 minutos: `0:00`, `0:15`, ...).\n"
         "2. Puedes editar directamente los valores en la tabla.\n"
         "3. Cuando los datos estén correctos, presiona **Validar Datos** para continuar."
     )
 
-    # ======== VARIABLES GLOBALES ========
-    columnas_horas = [f"{i}" for i in range(24)]
-    columnas = ["Item", "Carga", "Potencia (W)"] + columnas_horas
-
-    if "tabla_datos" not in st.session_state:
-        # Usamos float por defecto para Potencia (W) para evitar problemas de tipo después de NaN
-        st.session_state["tabla_datos"] = pd.DataFrame(columns=columnas).astype({"Item": 'Int64', "Potencia (W)": float})
+    # Almacén indexado por 'Carga' (upsert/eliminación O(1)): es lo único de la tabla que guarda la sesión;
+    # el editor, las descargas y el análisis leen de él solo lo que necesitan
+    if "almacen_cargas" not in st.session_state:
+        st.session_state["almacen_cargas"] = AlmacenCargas()
+    almacen = st.session_state["almacen_cargas"]
 
 
     # ======== CARGA Y DESCARGA DE ARCHIVO ========
     archivo = st.file_uploader("📂 Cargar archivo CSV o Excel", type=["csv", "xlsx"], label_visibility="collapsed")
 
+    # Modo por bloques: se activa a mano o automáticamente para archivos grandes
+    modo_bloques = st.checkbox(
+        "📦 Archivo grande: leer por bloques con tipos compactos",
+        value=False,
+        help=f"Lee el archivo en bloques, valida cada bloque al llegar y guarda las horas como uint8, "
+             f"la potencia como float32 y la carga como categórica. Se activa solo a partir de "
+             f"{UMBRAL_BLOQUES_MB} MB.",
+    )
+
     # Creamos 3 columnas para el uploader y los dos botones de descarga
 
     st.info("A continuación, puedes descargar una plantilla de ejemplo para utilizarla en la carga masiva.")
@@ -141,22 +308,13 @@ with tab1:
         Circuito luces LED,1200,0,0,0,0,1,1,1,0,0,0,1,0,1,0,1,0,1,0,0,0,0,1,0,0
     """
 
-    # 1. Convertir CSV string a DataFrame
-    # Esto es necesario para generar el Excel
-    df_template = pd.read_csv(io.StringIO(template_csv_content))
-    
-    # 2. Generar archivo XLSX en memoria (BytesIO)
-    output_xlsx = io.BytesIO()
-    df_template.to_excel(output_xlsx, index=False)
-    output_xlsx.seek(0)
-
     with col_template_csv:
         # --- BOTÓN PARA DESCARGAR PLANTILLA CSV ---
         st.download_button(
             "⬇️ Plantilla (CSV)",
-            data=template_csv_content.encode("utf-8"),
+            data=partial(plantilla, template_csv_content, "csv"),
             file_name="plantilla_cuadro_carga.csv",
-            mime="text/csv",
+            mime=MIME["csv"],
             use_container_width=True,
             help="Descarga un archivo CSV de ejemplo con la estructura requerida."
         )
@@ -164,56 +322,73 @@ with tab1:
         # --- BOTÓN PARA DESCARGAR PLANTILLA XLSX ---
         st.download_button(
             "⬇️ Plantilla (XLSX)",
-            data=output_xlsx.getvalue(),
+            # El Excel se genera al pulsar el botón, una sola vez por proceso (ver exportaciones.plantilla)
+            data=partial(plantilla, template_csv_content, "xlsx"),
             file_name="plantilla_cuadro_carga.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            mime=MIME["xlsx"],
             use_container_width=True,
             help="Descarga un archivo Excel de ejemplo con la estructura requerida."
         )
 
-    if archivo is not None:
+    # Cada archivo se incorpora una sola vez (el uploader conserva el archivo entre reruns)
+    if archivo is not None and st.session_state.get("archivo_incorporado") != archivo.file_id:
         try:
-            if archivo.name.endswith(".csv"):
-                df = pd.read_csv(archivo)
+            if modo_bloques or getattr(archivo, "size", 0) > UMBRAL_BLOQUES_MB * 1024 * 1024:
+                # Lectura por bloques: memoria acotada, errores con fila y columna
+                resultado = ingerir_por_bloques(archivo, nombre=archivo.name)
+                if resultado["errores"]:
+                    raise ValueError(
+                        f"{len(resultado['errores'])} problema(s) en {resultado['filas']:,} filas leídas:\n- "
+                        + "\n- ".join(resultado["errores"])
+                    )
+                df = resultado["datos"]
             else:
-                df = pd.read_excel(archivo)
+                # Lectura + conversión numérica + columnas faltantes/ordenadas (ver ingesta.py)
+                df = leer_tabla(archivo)
+                # Misma política que el modo por bloques: un archivo con cargas repetidas se rechaza entero
+                repetidas = filas_duplicadas(df["Carga"])
+                if len(repetidas):
+                    raise ValueError(
+                        f"{len(repetidas)} carga(s) duplicada(s) en {len(df):,} filas leídas:\n- "
+                        + "\n- ".join(error_duplicada(fila) for fila in repetidas[:50])
+                    )
 
-            # FORZAR CONVERSIÓN NUMÉRICA DESPUÉS DE LA CARGA
-            if "Potencia (W)" in df.columns:
-                # Convertir a numérico; errores se convierten a NaN
-                df["Potencia (W)"] = pd.to_numeric(df["Potencia (W)"], errors='coerce')
+            # Con la tabla vacía se adopta la resolución del archivo; si no, el archivo se remuestrea
+            resolucion_archivo = detectar_resolucion(df.columns)
+            if almacen.empty:
+                almacen.cambiar_resolucion(resolucion_archivo)
+            elif resolucion_archivo != almacen.resolucion:
+                st.info(f"El archivo tiene {resolucion_archivo} franjas por día; se remuestreó a {almacen.resolucion}.")
 
-            # Preparamos las columnas para la fusión
-            for col in columnas:
-                if col not in df.columns:
-                    df[col] = 0
-            
-            # Eliminamos la columna 'Item' si existe en el archivo cargado para evitar conflictos
-            if "Item" in df.columns:
-                df = df.drop(columns=["Item"])
-            
-            # Garantizamos el orden de las columnas sin el Item temporalmente para el merge
-            cols_sin_item = [col for col in columnas if col != "Item"]
-            if not df.empty:
-                df = df[cols_sin_item]
-                
-            # Fusionar con los datos existentes, eliminando duplicados basados en 'Carga'
-            df_consolidado = pd.concat(
-                [st.session_state["tabla_datos"].drop(columns=["Item"], errors='ignore'), df],
-                ignore_index=True
-            ).drop_duplicates(subset=["Carga"], keep="last")
-            
-            # APLICAMOS REINDEXACIÓN DE 'Item' Y REINICIAMOS EL ÍNDICE DE PANDAS
-            df_consolidado = reindexar_items(df_consolidado)
-            st.session_state["tabla_datos"] = df_consolidado.reset_index(drop=True)
+            # Upsert por 'Carga': las cargas que ya estaban en la tabla se reemplazan por las del archivo
+            almacen.upsert_tabla(df)
+            st.session_state["archivo_incorporado"] = archivo.file_id
 
             st.success("✅ Archivo cargado correctamente.")
         except Exception as e:
             st.error(f"Error al leer el archivo: {e}")
-    else:
-        if st.session_state["tabla_datos"].empty:
+    elif archivo is None:
+        if almacen.empty:
             st.info("Puedes cargar un archivo o comenzar a ingresar datos manualmente.")
 
+    # ======== RESOLUCIÓN DEL HORARIO ========
+    resolucion = st.selectbox(
+        "⏱️ Resolución del horario",
+        options=RESOLUCIONES,
+        index=RESOLUCIONES.index(almacen.resolucion),
+        format_func=lambda n: f"{n} franjas por día ({24 * 60 // n} min)",
+        help="Al cambiarla, los horarios existentes se remuestrean: al refinar se repite cada franja; "
+             "al agrupar, la franja queda encendida si lo estaba al menos la mitad del tiempo.",
+    )
+    if resolucion != almacen.resolucion:
+        almacen.cambiar_resolucion(resolucion)
+        st.session_state.pop("indice_validacion", None)
+        st.session_state.pop("errores_validacion", None)
+
+    # ======== VARIABLES GLOBALES ========
+    columnas_horas = almacen.columnas_horas
+    columnas = columnas_tabla(almacen.resolucion)
+
     # ======== INGRESO MANUAL ========
     st.subheader("✍️ Agregar carga manualmente")
 
@@ -225,7 +400,7 @@ with tab1:
         potencia = st.number_input("Potencia (W)", min_value=0.0, step=10.0, format="%.2f")
 
     horas_activas = st.multiselect(
-        "Selecciona las horas activas (1):",
+        "Selecciona las horas (o franjas) activas (1):",
         options=columnas_horas,
         default=[],
         help="Selecciona las horas del día en que esta carga está encendida."
@@ -237,27 +412,9 @@ with tab1:
         elif potencia == 0:
             st.warning("Debes ingresar una potencia mayor que 0.")
         else:
-            # Crear fila con horas activas = 1 y las demás = 0
-            fila = {col: (1 if col in horas_activas else 0) for col in columnas_horas}
-            fila.update({
-                "Carga": carga, 
-                "Potencia (W)": float(potencia) # Aseguramos que sea float
-                })
-
-            df_nuevo = pd.DataFrame([fila])
-            
-            # Consolidamos la tabla, eliminamos duplicados por Carga
-            df_consolidado = pd.concat(
-                [st.session_state["tabla_datos"].drop(columns=["Item"], errors='ignore'), df_nuevo],
-                ignore_index=True
-            )
-            
-            # ELIMINAR DUPLICADOS MANTENIENDO EL ÚLTIMO (EL MANUAL)
-            df_consolidado = df_consolidado.drop_duplicates(subset=["Carga"], keep="last")
-            
-            # APLICAMOS REINDEXACIÓN DE 'Item' Y REINICIAMOS EL ÍNDICE DE PANDAS
-            df_consolidado = reindexar_items(df_consolidado)
-            st.session_state["tabla_datos"] = df_consolidado.reset_index(drop=True)
+            # Horas activas = 1 y las demás = 0; si la carga ya existe se reemplaza (la manual gana)
+            horario = [1 if col in horas_activas else 0 for col in columnas_horas]
+            almacen.upsert(carga, float(potencia), horario)
             
             st.success(f"✅ Carga '{carga}' agregada correctamente.")
 
@@ -265,53 +422,90 @@ with tab1:
     st.markdown("### 🧾 Vista previa de los datos cargados o ingresados")
     st.caption("Puedes editar directamente cualquier celda o eliminar filas según sea necesario.")
 
-    # Almacenamos el DataFrame original para detectar eliminaciones/ediciones
-    df_original = st.session_state["tabla_datos"].copy()
-
-    edited_df = st.data_editor(
-        df_original,
+    # Con tablas grandes el editor muestra solo una ventana: editar una celda no cuesta
+    # proporcional a todo el cuadro (ni en el navegador ni al aplicar el cambio)
+    posiciones = np.arange(len(almacen))
+    if len(almacen) > TAMANO_PAGINA_EDITOR:
+        col_filtro, col_pagina = st.columns([2, 1])
+        with col_filtro:
+            filtro = st.text_input("🔎 Filtrar cargas por nombre", key="filtro_editor")
+        if filtro:
+            coincide = pd.Series(almacen.nombres(), dtype=object).astype(str).str.contains(filtro, case=False, regex=False)
+            posiciones = np.flatnonzero(coincide.to_numpy())
+        total_paginas = max(1, -(-len(posiciones) // TAMANO_PAGINA_EDITOR))
+        # La página guardada puede quedar fuera de rango al filtrar o eliminar filas
+        st.session_state["pagina_editor"] = min(st.session_state.get("pagina_editor", 1), total_paginas)
+        with col_pagina:
+            pagina = st.number_input(
+                f"Página (de {total_paginas})", min_value=1, max_value=total_paginas, step=1, key="pagina_editor",
+            )
+        posiciones = posiciones[(pagina - 1) * TAMANO_PAGINA_EDITOR:pagina * TAMANO_PAGINA_EDITOR]
+        st.caption(f"Mostrando {len(posiciones):,} de {len(almacen):,} cargas. Las filas nuevas se agregan al final.")
+    # Solo se materializan las filas de la ventana
+    ventana = almacen.vista(posiciones)
+
+    # Si la última validación falló, resaltamos las celdas con problemas de la ventana
+    indice_validacion = st.session_state.get("indice_validacion")
+    datos_editor = ventana
+    if indice_validacion is not None and not indice_validacion.empty and len(ventana) <= LIMITE_RESALTADO_FILAS:
+        indice_visible = indice_ventana(indice_validacion, posiciones)
+        datos_editor = ventana.style.apply(lambda _: estilos_errores(indice_visible, ventana), axis=None)
+
+    # Sin comparar tablas completas: el callback recibe solo el delta del editor y lo aplica
+    # fila a fila al almacén, sin fusionar nombres vacíos o repetidos: la validación los reporta
+    # ('Item' se vuelve a numerar al materializar la vista)
+    st.data_editor(
+        datos_editor,
         num_rows="dynamic",
         use_container_width=True,
         hide_index=True,
         column_order=columnas,
+        disabled=["Item"],
         key="editor_tabla",
+        on_change=aplicar_edicion_tabla,
+        args=(almacen, almacen.claves(posiciones)),
     )
-    
-    # Lógica para detectar si se eliminaron filas o se modificó el DataFrame
-    if not edited_df.equals(df_original):
-        if not edited_df.empty:
-            df_reindexed = reindexar_items(edited_df)
-            # REINICIAMOS EL ÍNDICE DE PANDAS DESPUÉS DE LA EDICIÓN/ELIMINACIÓN
-            st.session_state["tabla_datos"] = df_reindexed.reset_index(drop=True)
-        else:
-            # Caso de tabla vacía
-            st.session_state["tabla_datos"] = edited_df.reset_index(drop=True)
 
     # ======== DESCARGA ========
     col1, col2, col3, col4 = st.columns([1, 1, 1, 1]) 
     
+    # Las descargas construyen y serializan la tabla solo al pulsar el botón (memorizadas por huella de la tabla)
     with col1:
         # Botón para descargar como CSV (EXISTENTE)
         st.download_button(
             "💾 Descargar como CSV",
-            data=st.session_state["tabla_datos"].to_csv(index=False).encode("utf-8"),
+            data=diferida_tabla(almacen.a_dataframe, "csv"),
             file_name="datos_cuadro_carga.csv",
-            mime="text/csv",
+            mime=MIME["csv"],
             use_container_width=True
         )
 
     with col2:
         # Botón para descargar como XLSX (NUEVO)
-        # 1. Creamos un objeto BytesIO
-        output = io.BytesIO()
-        # 2. Guardamos el DataFrame en el buffer en formato Excel
-        st.session_state["tabla_datos"].to_excel(output, index=False)
-        # 3. Descargamos el contenido del buffer
         st.download_button(
             "💾 Descargar como Excel (XLSX)",
-            data=output.getvalue(),
+            data=diferida_tabla(almacen.a_dataframe, "xlsx"),
             file_name="datos_cuadro_carga.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            mime=MIME["xlsx"],
+            use_container_width=True
+        )
+
+    # Formatos columnares para análisis posteriores (pandas, Polars, DuckDB, Power BI...)
+    with col3:
+        st.download_button(
+            "💾 Descargar como Parquet",
+            data=diferida_tabla(almacen.a_dataframe, "parquet"),
+            file_name="datos_cuadro_carga.parquet",
+            mime=MIME["parquet"],
+            use_container_width=True
+        )
+
+    with col4:
+        st.download_button(
+            "💾 Descargar como Arrow (IPC)",
+            data=diferida_tabla(almacen.a_dataframe, "arrow"),
+            file_name="datos_cuadro_carga.arrow",
+            mime=MIME["arrow"],
             use_container_width=True
         )
 
@@ -319,62 +513,35 @@ with tab1:
     st.markdown("---")
     st.subheader("🔍 Validación de Datos")
 
-    def validar_datos(df):
-        errores = []
-
-        # Columnas requeridas
-        if not all(col in df.columns for col in columnas):
-            errores.append("❌ Faltan columnas requeridas o el formato no es correcto.")
-            return errores
-
-        # Potencia debe ser numérica y no negativa
-        # Comprobamos que el dtype sea numérico (incluyendo float para NaN)
-        if not pd.api.types.is_numeric_dtype(df["Potencia (W)"]):
-             errores.append("⚠️ 'Potencia (W)' debe ser un valor numérico.")
-        
-        # Comprobamos si hay valores NaN después de la conversión forzada (errores en el archivo)
-        if df["Potencia (W)"].isnull().any():
-             errores.append("⚠️ Hay valores no numéricos o faltantes en 'Potencia (W)'. Revise el archivo.")
-
-        # Comprobamos si hay valores negativos entre los números válidos
-        if (df["Potencia (W)"].dropna() < 0).any():
-            errores.append("⚠️ Hay valores negativos en 'Potencia (W)'.")
-
-        # Validar columnas H00–H23 (solo 0 o 1)
-        for col in columnas_horas:
-            if not df[col].fillna(0).astype(int).isin([0, 1]).all():
-                errores.append(f"❌ La columna {col} contiene valores distintos de 0 o 1.")
-
-        # Faltantes (ya cubiertos en Potencia, pero se revisa el resto)
-        if df.isnull().drop(columns=["Potencia (W)"], errors='ignore').any().any():
-            errores.append("⚠️ Hay valores faltantes en la tabla (excepto Potencia (W) donde ya se chequeó).")
-
-        # Duplicados
-        if df["Carga"].duplicated().any():
-            errores.append("⚠️ Existen cargas duplicadas.")
-
-        return errores
-
     col_1, col_2 = st.columns([1, 1])
     with col_1:
 
         if st.button("✅ Validar y Guardar Datos", use_container_width=True):
-            df = st.session_state["tabla_datos"]
-            if df.empty:
+            if almacen.empty:
                 st.error("No hay datos para validar.")
             else:
-                errores = validar_datos(df)
+                # La tabla completa solo existe mientras se valida
+                df = almacen.a_dataframe()
+                # Una sola pasada sobre la matriz N×n → índice fila/columna de problemas
+                indice = indice_errores(df) if all(col in df.columns for col in columnas) else None
+                errores = validar_datos(df, indice=indice)
                 if errores:
-                    st.error("Se encontraron los siguientes problemas:")
-                    for e in errores:
-                        st.write(e)
+                    st.session_state["errores_validacion"] = errores
+                    st.session_state["indice_validacion"] = indice
+                    # Volvemos a ejecutar para que el editor resalte las celdas
+                    st.rerun()
                 else:
+                    st.session_state.pop("errores_validacion", None)
+                    st.session_state.pop("indice_validacion", None)
                     st.success("✅ Datos validados correctamente. El formato es correcto.")
-                    st.session_state["datos_validos"] = df
+                    # Desde aquí, cada cambio solo revisa sus filas para seguir validado (ver AlmacenCargas.validada)
+                    almacen.marcar_validada()
                     st.balloons()
 
     ####
                 # Redirigir automáticamente a la segunda pestaña
+            import streamlit.components.v1 as components
+
             components.html(
                 """
                 <script>
@@ -385,6 +552,27 @@ with tab1:
                 height=0, width=0
             )
 
+    # ======== REPORTE DE ERRORES (persistente hasta que se edite la tabla) ========
+    if st.session_state.get("errores_validacion"):
+        st.error("Se encontraron los siguientes problemas:")
+        for e in st.session_state["errores_validacion"]:
+            st.write(e)
+
+        indice_validacion = st.session_state.get("indice_validacion")
+        if indice_validacion is not None and not indice_validacion.empty:
+            with st.expander(f"📋 Detalle por celda ({len(indice_validacion):,} problemas)"):
+                total_paginas = max(1, -(-len(indice_validacion) // TAMANO_PAGINA_ERRORES))
+                pagina = st.number_input(
+                    f"Página (de {total_paginas})", min_value=1, max_value=total_paginas, value=1, step=1,
+                    key="pagina_errores_validacion",
+                )
+                st.dataframe(
+                    pagina_errores(indice_validacion, pagina=pagina, tamano=TAMANO_PAGINA_ERRORES),
+                    hide_index=True, use_container_width=True,
+                )
+                if len(almacen) > LIMITE_RESALTADO_FILAS:
+                    st.caption(f"El resaltado de celdas en el editor se omite para tablas de más de {LIMITE_RESALTADO_FILAS:,} filas.")
+
 
 # ---------------------------------------------------------------------------
 # 🟦 PESTAÑA 2: PROCESAMIENTO
@@ -392,11 +580,22 @@ with tab1:
 with tab2:
     st.header("⚙️ Análisis y Consumo de Carga")
 
-    if "datos_validos" not in st.session_state or st.session_state["datos_validos"].empty:
+    if almacen.empty or almacen.version_validada is None:
         st.warning("⚠️ Primero, carga y valida los datos en la Pestaña 1 para comenzar el análisis.")
+    elif not almacen.validada:
+        st.warning("⚠️ Un cambio dejó filas con problemas (o reemplazó la tabla): vuelve a validarla en la Pestaña 1.")
     else:
-        
-        df_base = st.session_state["datos_validos"].copy()
+        # Importación diferida: solo las sesiones que llegan al análisis cargan gráficos y mapas de calor
+        with arranque.medir("importación de gráficos (pestaña 2)"):
+            import altair as alt
+            from accesibilidad_heatmaps import render_mapa_calor_accesible
+            from cache_graficos import mostrar_grafico
+            import graficos_raster
+            from informe_pdf import informe_pdf
+        inicio_pestana_2 = time.perf_counter()
+
+        resolucion = almacen.resolucion
+        paso_horas = horas_por_franja(resolucion)
         st.success("✅ Datos listos para el análisis.")
     
         # --- SECCIÓN DE CONFIGURACIÓN DE SEGMENTACIÓN ---
@@ -405,75 +604,76 @@ with tab2:
         # Creamos dos columnas para los sliders
         col_diurno_start, col_diurno_end = st.columns(2)
 
-        with col_diurno_start:
-            # Horario de inicio diurno
-            st.session_state["hora_diurna_inicio"] = st.slider(
-                "Hora de Inicio del Período Diurno",
-                min_value=0, 
-                max_value=23, 
-                value=6, # Valor por defecto a las 6:00 AM
-                step=1, 
-                format="%02d:00 h",
-                key="diurno_inicio"
-            )
-    
-        with col_diurno_end:
-            # Horario de fin diurno
-            st.session_state["hora_diurna_fin"] = st.slider(
-                "Hora de Fin del Período Diurno",
-                min_value=0, 
-                max_value=23, 
-                value=18, # Valor por defecto a las 18:00 PM
-                step=1, 
-                format="%02d:00 h",
-                key="diurno_fin"
-            )
-    
+        if resolucion != RESOLUCION_BASE:
+            # Resolución subhoraria: los límites se eligen entre los inicios de franja (en horas)
+            inicios_franja = [k * paso_horas for k in range(resolucion)]
+            with col_diurno_start:
+                st.session_state["hora_diurna_inicio"] = st.select_slider(
+                    "Hora de Inicio del Período Diurno",
+                    options=inicios_franja,
+                    value=6.0,
+                    format_func=lambda h: f"{formato_hora(h)} h",
+                    key=f"diurno_inicio_{resolucion}",
+                )
+            with col_diurno_end:
+                st.session_state["hora_diurna_fin"] = st.select_slider(
+                    "Hora de Fin del Período Diurno",
+                    options=inicios_franja,
+                    value=18.0,
+                    format_func=lambda h: f"{formato_hora(h)} h",
+                    key=f"diurno_fin_{resolucion}",
+                )
+        else:
+            with col_diurno_start:
+                # Horario de inicio diurno
+                st.session_state["hora_diurna_inicio"] = st.slider(
+                    "Hora de Inicio del Período Diurno",
+                    min_value=0, 
+                    max_value=23, 
+                    value=6, # Valor por defecto a las 6:00 AM
+                    step=1, 
+                    format="%02d:00 h",
+                    key="diurno_inicio"
+                )
+
+            with col_diurno_end:
+                # Horario de fin diurno
+                st.session_state["hora_diurna_fin"] = st.slider(
+                    "Hora de Fin del Período Diurno",
+                    min_value=0, 
+                    max_value=23, 
+                    value=18, # Valor por defecto a las 18:00 PM
+                    step=1, 
+                    format="%02d:00 h",
+                    key="diurno_fin"
+                )
+
         # Obtener las configuraciones
         diurno_inicio = st.session_state.get("hora_diurna_inicio", 6)
         diurno_fin = st.session_state.get("hora_diurna_fin", 18)
-        columnas_horas = [f"{i}" for i in range(24)]
+        columnas_horas = columnas_franjas(resolucion)
 
         st.markdown(
-            f"El **Período Diurno**☀️ se considerará desde las **{diurno_inicio:02d}:00** "
-            f"hasta las **{diurno_fin:02d}:00**."
+            f"El **Período Diurno**☀️ se considerará desde las **{formato_hora(diurno_inicio)}** "
+            f"hasta las **{formato_hora(diurno_fin)}**."
         )
 
         # Cálculo del período nocturno complementario
         if diurno_inicio < diurno_fin:
             # Caso normal: el día no cruza medianoche
             st.markdown(
-                f"El **Período Nocturno**🌙 se considerará desde las **{diurno_fin:02d}:00** "
-                f"hasta las **{diurno_inicio:02d}:00** del día siguiente."
+                f"El **Período Nocturno**🌙 se considerará desde las **{formato_hora(diurno_fin)}** "
+                f"hasta las **{formato_hora(diurno_inicio)}** del día siguiente."
             )   
         else:
             # Caso en que el día cruza medianoche
             st.markdown(
-                f"El **Período Nocturno**🌙 se considerará desde las **{diurno_fin:02d}:00** "
-                f"hasta las **{diurno_inicio:02d}:00** del mismo día."
+                f"El **Período Nocturno**🌙 se considerará desde las **{formato_hora(diurno_fin)}** "
+                f"hasta las **{formato_hora(diurno_inicio)}** del mismo día."
             )
         
         # --- CÁLCULO ROBUSTO DE HORAS DIURNAS/NOCTURNAS (SOLUCIÓN AL ERROR 1) ---
-        
-        def get_horas_segmento(inicio, fin):
-            """Calcula las columnas de horas para el segmento (incluso si cruza la medianoche)."""
-            horas = []
-            if inicio < fin:
-                # Caso normal: 07:00 a 19:00
-                for h in range(inicio, fin):
-                    horas.append(f"{h}")
-            else:
-                # Caso cruce de medianoche: 22:00 a 06:00 (ejemplo 22, 23, 0, 1, 2, 3, 4, 5)
-                # Desde inicio hasta 23
-                for h in range(inicio, 24):
-                    horas.append(f"{h}")
-                # Desde 0 hasta fin
-                for h in range(0, fin):
-                    horas.append(f"{h}")
-            return horas
-
-        horas_diurnas_cols = get_horas_segmento(diurno_inicio, diurno_fin)
-        horas_nocturnas_cols = [col for col in columnas_horas if col not in horas_diurnas_cols]
+        # La máscara diurna (incluso si cruza la medianoche) es el nodo 'mascara_diurna' del grafo
 
         st.markdown("---")
 
@@ -487,13 +687,10 @@ with tab2:
         col_mes, col_dias = st.columns(2)
 
         # Diccionario auxiliar para días por mes (asumiendo año no bisiesto por simplicidad)
-        dias_por_mes = {
-            "Enero": 31, "Febrero": 28, "Marzo": 31, "Abril": 30, "Mayo": 31, "Junio": 30,
-            "Julio": 31, "Agosto": 31, "Septiembre": 30, "Octubre": 31, "Noviembre": 30, "Diciembre": 31
-        }
+        dias_por_mes = DIAS_POR_MES
         
         # Definimos el orden de los meses para usarlo en los gráficos
-        orden_meses = list(dias_por_mes.keys())
+        orden_meses = ORDEN_MESES
 
         with col_mes:
             # Selector de Mes de Referencia
@@ -625,99 +822,73 @@ with tab2:
         multiplicador_actual = multiplicadores_mes.get(mes_seleccionado, 1.0)
 
 
-        df_calculo = df_base[["Potencia (W)"] + columnas_horas].copy()
-        
+        # Grafo de dependencias por sesión: cada nodo se recalcula solo si cambian sus entradas
+        # (p.ej. mover un multiplicador mensual no repite el producto N×n de potencia_horaria)
+        if "grafo_calculo" not in st.session_state:
+            st.session_state["grafo_calculo"] = construir_grafo_cuadro_carga(cache=cache_compartida())
+        grafo = st.session_state["grafo_calculo"]
+        # Perfil horario y subtotales por categoría mantenidos al editar cargas (O(n), sin recorrer la tabla)
+        grafo.fijar_entrada("perfil_horario", almacen.perfil_horario())
+        grafo.fijar_entrada("diurno_inicio", diurno_inicio)
+        grafo.fijar_entrada("diurno_fin", diurno_fin)
+        grafo.fijar_entrada("multiplicadores", multiplicadores_mes)
+        grafo.fijar_entrada("mes_referencia", mes_seleccionado)
+        grafo.fijar_entrada("dias_por_mes", dias_por_mes)
+
+        # Todas las métricas (base y ajustadas) salen del motor
+        metricas = {
+            "potencia_horaria": grafo.obtener("potencia_horaria"),
+            "potencia_horaria_ajustada": grafo.obtener("potencia_horaria_ajustada"),
+            **grafo.obtener("segmentos"),
+            **grafo.obtener("metricas_ajustadas"),
+            **grafo.obtener("proyeccion_mensual"),
+        }
+        mascara_diurna = grafo.obtener("mascara_diurna")
+
         # Cálculo de Potencia Total por Hora (en W) - BASE SIN AJUSTE
-        potencia_horaria = df_calculo[columnas_horas].mul(df_calculo["Potencia (W)"], axis=0).sum(axis=0)
-        potencia_horaria.name = "Potencia Total (W)"
-        
-        # df_potencia_total contiene la potencia horaria BASE
-        df_potencia_total = pd.DataFrame(potencia_horaria).T
+        potencia_horaria = pd.Series(metricas["potencia_horaria"], index=columnas_horas, name="Potencia Total (W)")
 
         # Energía Diaria (en kWh/día) - BASE SIN AJUSTE
-        energia_diurna_dia = (df_potencia_total[horas_diurnas_cols].sum(axis=1).iloc[0])/1000.0 if horas_diurnas_cols else 0.0 # kWh/día
-        energia_nocturna_dia = (df_potencia_total[horas_nocturnas_cols].sum(axis=1).iloc[0])/1000.0 if horas_nocturnas_cols else 0.0 # kWh/día
-        energia_total_dia = energia_diurna_dia + energia_nocturna_dia # kWh/día
-
-        # Potencia Máxima/Mínima/Media (BASE SIN AJUSTE)
-        potencia_max_w = df_potencia_total.iloc[0].max()
-        hora_max = df_potencia_total.iloc[0].idxmax()
-        potencia_min_w = df_potencia_total.iloc[0].min()
-        hora_min = df_potencia_total.iloc[0].idxmin()
-
-        num_horas_diurnas = len(horas_diurnas_cols)
-        num_horas_nocturnas = len(horas_nocturnas_cols)
-        
-        potencia_media_total_w = (energia_total_dia * 1000) / 24 
-        
-        if num_horas_diurnas > 0:
-            potencia_media_diurna_w = (energia_diurna_dia * 1000) / num_horas_diurnas
-            potencia_max_diurna_w = df_potencia_total[horas_diurnas_cols].iloc[0].max()
-            hora_max_diurna = df_potencia_total[horas_diurnas_cols].iloc[0].idxmax()
-        else:
-            potencia_media_diurna_w = 0
-            potencia_max_diurna_w = 0
-            hora_max_diurna = 'N/A'
-
-        if num_horas_nocturnas > 0:
-            potencia_media_nocturna_w = (energia_nocturna_dia * 1000) / num_horas_nocturnas
-            potencia_max_nocturna_w = df_potencia_total[horas_nocturnas_cols].iloc[0].max()
-            hora_max_nocturna = df_potencia_total[horas_nocturnas_cols].iloc[0].idxmin()
-        else:
-            potencia_media_nocturna_w = 0
-            potencia_max_nocturna_w = 0
-            hora_max_nocturna = 'N/A'
-            
-        factor_carga_general = (potencia_media_total_w / potencia_max_w) * 100 if potencia_max_w > 0 else 0
-        factor_carga_diurno = (potencia_media_diurna_w / potencia_max_diurna_w) * 100 if potencia_max_diurna_w > 0 else 0
-        factor_carga_nocturno = (potencia_media_nocturna_w / potencia_max_nocturna_w) * 100 if potencia_max_nocturna_w > 0 else 0
+        energia_diurna_dia = metricas["energia_diurna_dia"]
+        energia_nocturna_dia = metricas["energia_nocturna_dia"]
+        energia_total_dia = metricas["energia_total_dia"]
 
+        # Duración de cada segmento en horas (puede ser fraccionaria con franjas subhorarias):
+        # popcount de la máscara de bits del segmento diurno
+        franjas_diurnas = grafo.obtener("franjas_diurnas")
+        num_horas_diurnas = franjas_diurnas * paso_horas
+        num_horas_nocturnas = (resolucion - franjas_diurnas) * paso_horas
 
         # ---------------------------------------------------------------------------------
         # 🟢 CÁLCULOS AJUSTADOS (PARA EL MES SELECCIONADO)
         # ---------------------------------------------------------------------------------
 
         # 1. Potencia Horaria Ajustada
-        potencia_horaria_ajustada = potencia_horaria * multiplicador_actual
-        df_potencia_total_ajustada = pd.DataFrame(potencia_horaria_ajustada).T
+        potencia_horaria_ajustada = pd.Series(metricas["potencia_horaria_ajustada"], index=columnas_horas, name="Potencia Total (W)")
 
         # 2. Energía Diaria Ajustada
-        energia_total_dia_ajustada = energia_total_dia * multiplicador_actual
-        energia_diurna_dia_ajustada = energia_diurna_dia * multiplicador_actual
-        energia_nocturna_dia_ajustada = energia_nocturna_dia * multiplicador_actual
-        
+        energia_total_dia_ajustada = metricas["energia_total_dia_ajustada"]
+        energia_diurna_dia_ajustada = metricas["energia_diurna_dia_ajustada"]
+        energia_nocturna_dia_ajustada = metricas["energia_nocturna_dia_ajustada"]
+
         # 3. Métricas de Potencia (Ajustadas)
-        potencia_max_w_ajustada = df_potencia_total_ajustada.iloc[0].max()
-        hora_max_ajustada = df_potencia_total_ajustada.iloc[0].idxmax()
-        potencia_min_w_ajustada = df_potencia_total_ajustada.iloc[0].min()
-        hora_min_ajustada = df_potencia_total_ajustada.iloc[0].idxmin()
-        
-        # Potencia Media Ajustada
-        potencia_media_total_w_ajustada = (energia_total_dia_ajustada * 1000) / 24 
-        
-        if num_horas_diurnas > 0:
-            potencia_media_diurna_w_ajustada = (energia_diurna_dia_ajustada * 1000) / num_horas_diurnas
-            potencia_max_diurna_w_ajustada = df_potencia_total_ajustada[horas_diurnas_cols].iloc[0].max()
-            hora_max_diurna_ajustada = df_potencia_total_ajustada[horas_diurnas_cols].iloc[0].idxmax()
-        else:
-            potencia_media_diurna_w_ajustada = 0
-            potencia_max_diurna_w_ajustada = 0
-            hora_max_diurna_ajustada = 'N/A'
-
-        if num_horas_nocturnas > 0:
-            potencia_media_nocturna_w_ajustada = (energia_nocturna_dia_ajustada * 1000) / num_horas_nocturnas
-            potencia_max_nocturna_w_ajustada = df_potencia_total_ajustada[horas_nocturnas_cols].iloc[0].max()
-            hora_max_nocturna_ajustada = df_potencia_total_ajustada[horas_nocturnas_cols].iloc[0].idxmin()
-        else:
-            potencia_media_nocturna_w_ajustada = 0
-            potencia_max_nocturna_w_ajustada = 0
-            hora_max_nocturna_ajustada = 'N/A'
-            
-        # Factores de Carga Ajustados (El factor de carga no cambia con el ajuste si es uniforme,
-        # pero se recalculan para usar los valores de Pico Ajustado vs. Media Ajustada, manteniendo la consistencia)
-        factor_carga_general_ajustado = (potencia_media_total_w_ajustada / potencia_max_w_ajustada) * 100 if potencia_max_w_ajustada > 0 else 0
-        factor_carga_diurno_ajustado = (potencia_media_diurna_w_ajustada / potencia_max_diurna_w_ajustada) * 100 if potencia_max_diurna_w_ajustada > 0 else 0
-        factor_carga_nocturno_ajustado = (potencia_media_nocturna_w_ajustada / potencia_max_nocturna_w_ajustada) * 100 if potencia_max_nocturna_w_ajustada > 0 else 0
+        potencia_max_w_ajustada = metricas["potencia_max_w_ajustada"]
+        hora_max_ajustada = metricas["hora_max_ajustada"]
+        potencia_min_w_ajustada = metricas["potencia_min_w_ajustada"]
+        hora_min_ajustada = metricas["hora_min_ajustada"]
+
+        potencia_media_total_w_ajustada = metricas["potencia_media_total_w_ajustada"]
+        potencia_media_diurna_w_ajustada = metricas["potencia_media_diurna_w_ajustada"]
+        potencia_max_diurna_w_ajustada = metricas["potencia_max_diurna_w_ajustada"]
+        hora_max_diurna_ajustada = metricas["hora_max_diurna_ajustada"]
+        potencia_media_nocturna_w_ajustada = metricas["potencia_media_nocturna_w_ajustada"]
+        potencia_max_nocturna_w_ajustada = metricas["potencia_max_nocturna_w_ajustada"]
+        hora_max_nocturna_ajustada = metricas["hora_max_nocturna_ajustada"]
+
+        # Factores de Carga Ajustados
+        factor_carga_general_ajustado = metricas["factor_carga_general_ajustado"]
+        factor_carga_diurno_ajustado = metricas["factor_carga_diurno_ajustado"]
+        factor_carga_nocturno_ajustado = metricas["factor_carga_nocturno_ajustado"]
         
         # ---------------------------------------------------------------------------------
         # 🟢 FIN CÁLCULOS AJUSTADOS
@@ -743,7 +914,7 @@ with tab2:
             st.metric(
                 "📈 Potencia Máxima (Pico) Total", 
                 f"{potencia_max_w_ajustada:,.0f} W",
-                f"Ocurre a las {int(hora_max_ajustada):02d}:00 h"
+                f"Ocurre a las {formato_hora(hora_max_ajustada)} h"
             )
         
         with col_min:
@@ -751,7 +922,7 @@ with tab2:
             st.metric(
                 "📉 Potencia Mínima (Base) Total", 
                 f"{potencia_min_w_ajustada:,.0f} W",
-                f"Ocurre a las {int(hora_min_ajustada):02d}:00 h"
+                f"Ocurre a las {formato_hora(hora_min_ajustada)} h"
             )
 
         with col_pico_diurno:
@@ -759,7 +930,7 @@ with tab2:
             st.metric(
                 "Pico Diurno (W)", 
                 f"{potencia_max_diurna_w_ajustada:,.0f} W",
-                f"Ocurre a las {int(hora_max_diurna_ajustada):02d}:00 h" if hora_max_diurna_ajustada != 'N/A' else 'N/A'
+                f"Ocurre a las {formato_hora(hora_max_diurna_ajustada)} h" if hora_max_diurna_ajustada != 'N/A' else 'N/A'
             )
 
         with col_pico_nocturno:
@@ -767,7 +938,7 @@ with tab2:
             st.metric(
                 "Pico Nocturno (W)", 
                 f"{potencia_max_nocturna_w_ajustada:,.0f} W",
-                f"Ocurre a las {int(hora_max_nocturna_ajustada):02d}:00 h" if hora_max_nocturna_ajustada != 'N/A' else 'N/A'
+                f"Ocurre a las {formato_hora(hora_max_nocturna_ajustada)} h" if hora_max_nocturna_ajustada != 'N/A' else 'N/A'
             )
         
         st.markdown("---")
@@ -789,14 +960,14 @@ with tab2:
             st.metric(
                 "☀️ Potencia Media Diurna",
                 f"{potencia_media_diurna_w_ajustada:,.0f} W",
-                f"Promedio de {num_horas_diurnas} horas"
+                f"Promedio de {num_horas_diurnas:g} horas"
             )
         with col_pm_noc:
             # USAR AJUSTADO: potencia_media_nocturna_w_ajustada
             st.metric(
                 "🌙 Potencia Media Nocturna",
                 f"{potencia_media_nocturna_w_ajustada:,.0f} W",
-                f"Promedio de {num_horas_nocturnas} horas"
+                f"Promedio de {num_horas_nocturnas:g} horas"
             )
 
         st.markdown("---")
@@ -828,6 +999,51 @@ with tab2:
                 "Promedio Nocturno vs. Pico Nocturno"
             )
 
+        # COMPARACIÓN DE TODAS LAS VENTANAS DIURNAS (nodo 'matriz_ventanas': 576 consultas O(1))
+        with st.expander("🔎 1.4. Comparación de Ventanas Diurnas (24×24)"):
+            df_ventanas = grafo.obtener("matriz_ventanas")
+            col_criterio, col_duracion = st.columns(2)
+            with col_criterio:
+                criterio_ventana = st.selectbox(
+                    "Criterio",
+                    ["Promedio diurno/nocturno", "Factor de carga diurno (%)", "Factor de carga nocturno (%)"],
+                    key="criterio_ventana",
+                )
+            with col_duracion:
+                duracion_minima = st.slider(
+                    "Duración mínima de cada período (h)", min_value=1, max_value=12, value=6, key="duracion_minima_ventana"
+                )
+            if criterio_ventana == "Promedio diurno/nocturno":
+                puntaje = df_ventanas[["Factor de carga diurno (%)", "Factor de carga nocturno (%)"]].mean(axis=1)
+            else:
+                puntaje = df_ventanas[criterio_ventana]
+            df_ventanas = df_ventanas.assign(**{"Puntaje (%)": puntaje})
+            admisibles = df_ventanas[
+                (df_ventanas["Horas diurnas"] >= duracion_minima)
+                & (24 - df_ventanas["Horas diurnas"] >= duracion_minima)
+            ]
+            if not admisibles.empty:
+                mejor = admisibles.loc[admisibles["Puntaje (%)"].idxmax()]
+                st.success(
+                    f"Mejor ventana diurna: **{int(mejor['Inicio diurno']):02d}:00 – {int(mejor['Fin diurno']):02d}:00** "
+                    f"(FC diurno {mejor['Factor de carga diurno (%)']:,.2f} %, "
+                    f"FC nocturno {mejor['Factor de carga nocturno (%)']:,.2f} %)"
+                )
+            chart_ventanas = alt.Chart(admisibles).mark_rect().encode(
+                x=alt.X('Fin diurno:O', title='Fin del Período Diurno (h)'),
+                y=alt.Y('Inicio diurno:O', title='Inicio del Período Diurno (h)'),
+                color=alt.Color('Puntaje (%):Q', scale=alt.Scale(scheme='viridis'), title=criterio_ventana),
+                tooltip=[
+                    'Inicio diurno', 'Fin diurno', 'Horas diurnas',
+                    alt.Tooltip('Factor de carga diurno (%)', format=',.2f'),
+                    alt.Tooltip('Factor de carga nocturno (%)', format=',.2f'),
+                    alt.Tooltip('Energía diurna (kWh)', format=',.2f'),
+                    alt.Tooltip('Pico diurno (W)', format=',.0f'),
+                ]
+            ).properties(height=420)
+            mostrar_grafico(chart_ventanas, "ventanas", admisibles, criterio_ventana)
+            st.caption("El factor de carga no depende del multiplicador estacional; las celdas en blanco no cumplen la duración mínima.")
+
         st.markdown("---")
         
         # =========================================================================
@@ -878,20 +1094,12 @@ with tab2:
         # ENERGÍA ANUAL
         st.markdown("#### 2.3. Proyección de Energía Anual")
 
-        # ¡MODIFICADO! Calcular la suma anual basada en los multiplicadores
-        energia_anual_kwh = 0
-        energia_anual_diurna = 0
-        energia_anual_nocturna = 0
-
-        # Iterar por cada mes, aplicar su multiplicador y días, y sumar
-        for mes, dias in dias_por_mes.items():
-            multiplicador = multiplicadores_mes.get(mes, 1.0)
-            # USAR VALORES BASE (SIN AJUSTAR) para evitar doble conteo
-            energia_anual_kwh += (energia_total_dia * multiplicador) * dias
-            energia_anual_diurna += (energia_diurna_dia * multiplicador) * dias
-            energia_anual_nocturna += (energia_nocturna_dia * multiplicador) * dias
-        
-        total_dias_anual = sum(dias_por_mes.values())
+        # ¡MODIFICADO! Suma anual basada en los multiplicadores (calculada por el motor)
+        # USAR VALORES BASE (SIN AJUSTAR) para evitar doble conteo
+        energia_anual_kwh = metricas["energia_anual_kwh"]
+        energia_anual_diurna = metricas["energia_anual_diurna"]
+        energia_anual_nocturna = metricas["energia_anual_nocturna"]
+        total_dias_anual = metricas["total_dias_anual"]
 
         col_tot_anual, col_diurno_anual, col_nocturno_anual = st.columns(3)
 
@@ -902,7 +1110,130 @@ with tab2:
             st.metric(f"☀️ Energía Total Diurna", f"{energia_anual_diurna:,.2f} kWh")
         with col_nocturno_anual:
             st.metric(f"🌙 Energía Total Nocturna", f"{energia_anual_nocturna:,.2f} kWh")
-        
+
+        # BARRIDO DE ESCENARIOS (S juegos de multiplicadores evaluados en una sola pasada)
+        st.markdown("#### 2.4. Barrido de Escenarios de Ajuste Estacional")
+        origen_escenarios = st.radio(
+            "Origen de los escenarios",
+            ["Generar variaciones de los multiplicadores actuales", "Cargar tabla de escenarios (CSV/Excel)"],
+            horizontal=True,
+            key="origen_escenarios",
+        )
+        df_escenarios = None
+        if origen_escenarios.startswith("Generar"):
+            col_cantidad, col_variacion, col_semilla = st.columns(3)
+            with col_cantidad:
+                cantidad_escenarios = int(st.number_input(
+                    "Número de escenarios", min_value=1, max_value=100_000, value=1_000, step=100, key="cantidad_escenarios"
+                ))
+            with col_variacion:
+                variacion_escenarios = st.slider(
+                    "Variación por mes (± %)", min_value=1, max_value=50, value=10, key="variacion_escenarios"
+                )
+            with col_semilla:
+                semilla_escenarios = int(st.number_input("Semilla", min_value=0, value=0, step=1, key="semilla_escenarios"))
+            df_escenarios = generar_escenarios(
+                multiplicadores_mes, cantidad_escenarios, variacion_escenarios / 100, semilla_escenarios
+            )
+        else:
+            archivo_escenarios = st.file_uploader(
+                "Tabla de escenarios", type=["csv", "xlsx"], key="archivo_escenarios",
+                help="Una fila por escenario con columnas 'Enero'..'Diciembre' (multiplicadores) y, opcionalmente, "
+                     "'Escenario', 'Inicio diurno' y 'Fin diurno' (horas). Sin ventana, se usa la configurada arriba."
+            )
+            if archivo_escenarios is not None:
+                if archivo_escenarios.name.endswith(".csv"):
+                    df_escenarios = pd.read_csv(archivo_escenarios)
+                else:
+                    df_escenarios = pd.read_excel(archivo_escenarios)
+
+        if df_escenarios is not None:
+            try:
+                grafo.fijar_entrada("escenarios", df_escenarios)
+                barrido = grafo.obtener("barrido_escenarios")
+            except ValueError as e:
+                st.error(f"❌ {e}")
+                barrido = None
+
+        if df_escenarios is not None and barrido is not None:
+            df_resumen_escenarios = barrido["resumen"]
+            col_esc_energia, col_esc_pico, col_esc_fc = st.columns(3)
+            with col_esc_energia:
+                st.metric(
+                    f"Energía Anual ({len(df_resumen_escenarios):,} escenarios)",
+                    f"{df_resumen_escenarios['Energía anual (kWh)'].median():,.2f} kWh",
+                    f"{df_resumen_escenarios['Energía anual (kWh)'].min():,.0f} – "
+                    f"{df_resumen_escenarios['Energía anual (kWh)'].max():,.0f} kWh",
+                    delta_color="off",
+                )
+            with col_esc_pico:
+                st.metric(
+                    "Pico Anual Ajustado (mediana)",
+                    f"{df_resumen_escenarios['Pico anual ajustado (W)'].median():,.0f} W",
+                    f"máx. {df_resumen_escenarios['Pico anual ajustado (W)'].max():,.0f} W",
+                    delta_color="off",
+                )
+            with col_esc_fc:
+                mejor_escenario = df_resumen_escenarios.loc[df_resumen_escenarios["Factor de carga anual (%)"].idxmax()]
+                st.metric(
+                    "Mejor Factor de Carga Anual",
+                    f"{mejor_escenario['Factor de carga anual (%)']:,.2f} %",
+                    f"Escenario {mejor_escenario['Escenario']}",
+                    delta_color="off",
+                )
+
+            # Comparativo energía vs. pico: con muchos escenarios, imagen del servidor con todos los puntos
+            df_puntos = df_resumen_escenarios
+            if graficos_raster.usar_raster(len(df_puntos)):
+                st.image(graficos_raster.dispersion(
+                    df_puntos, 'Energía anual (kWh)', 'Pico anual ajustado (W)', 'Factor de carga anual (%)',
+                    titulo='Energía Anual vs. Pico Ajustado por Escenario',
+                ))
+                st.caption(f"Imagen renderizada en el servidor con los {len(df_puntos):,} escenarios.")
+            else:
+                if len(df_puntos) > LIMITE_PUNTOS_ESCENARIOS:
+                    df_puntos = df_puntos.sample(LIMITE_PUNTOS_ESCENARIOS, random_state=0)
+                    st.caption(f"El gráfico muestra {LIMITE_PUNTOS_ESCENARIOS:,} escenarios elegidos al azar; la descarga incluye todos.")
+                chart_escenarios = alt.Chart(df_puntos).mark_circle(size=30, opacity=0.6).encode(
+                    x=alt.X('Energía anual (kWh):Q', scale=alt.Scale(zero=False)),
+                    y=alt.Y('Pico anual ajustado (W):Q', scale=alt.Scale(zero=False)),
+                    color=alt.Color('Factor de carga anual (%):Q', scale=alt.Scale(scheme='viridis')),
+                    tooltip=[
+                        'Escenario', 'Mes del pico',
+                        alt.Tooltip('Energía anual (kWh)', format=',.2f'),
+                        alt.Tooltip('Pico anual ajustado (W)', format=',.0f'),
+                        alt.Tooltip('Factor de carga anual (%)', format=',.2f'),
+                    ]
+                ).properties(height=350, title='Energía Anual vs. Pico Ajustado por Escenario')
+                mostrar_grafico(chart_escenarios, "escenarios", df_puntos)
+
+            if len(df_resumen_escenarios) <= LIMITE_ESCENARIOS_MENSUAL:
+                chart_mensual_escenarios = alt.Chart(barrido["mensual"]).mark_line(point=True).encode(
+                    x=alt.X('Mes:O', sort=orden_meses, title='Mes del Año'),
+                    y=alt.Y('Energía (kWh):Q'),
+                    color='Escenario:N',
+                    tooltip=['Escenario', 'Mes', alt.Tooltip('Multiplicador', format='.2f'), alt.Tooltip('Energía (kWh)', format=',.2f')]
+                ).properties(height=300, title='Energía Mensual por Escenario')
+                mostrar_grafico(chart_mensual_escenarios, "escenarios_mensual", barrido["mensual"])
+
+            col_desc_esc, col_desc_esc_mes = st.columns(2)
+            with col_desc_esc:
+                st.download_button(
+                    "💾 Resumen por escenario (CSV)",
+                    data=diferida(df_resumen_escenarios, "csv"),
+                    file_name="escenarios_resumen.csv",
+                    mime=MIME["csv"],
+                    use_container_width=True
+                )
+            with col_desc_esc_mes:
+                st.download_button(
+                    "💾 Detalle mensual por escenario (CSV)",
+                    data=diferida(barrido["mensual"], "csv"),
+                    file_name="escenarios_mensual.csv",
+                    mime=MIME["csv"],
+                    use_container_width=True
+                )
+
         st.markdown("---")
 
         # =========================================================================
@@ -914,21 +1245,18 @@ with tab2:
         # --- GRÁFICO 3.1: CUADRO DE CARGA (LDC) ---
         st.markdown("#### 3.1. Cuadro de Carga (Load Duration Curve - LDC) de 24 Horas")
 
-        # 1. Preparar datos para LDC
-        df_ldc = df_potencia_total_ajustada.T.reset_index(drop=True).rename(columns={0: 'Potencia Total (W)'})
+        # 1. Preparar datos para LDC (nodo 'resumen_ldc': curva para el gráfico y pico/media exactos)
+        resumen_ldc = grafo.obtener("resumen_ldc")
+        df_ldc = resumen_ldc["curva"]
         st.info(f"El Cuadro de Carga (LDC) está ajustado por el multiplicador de **{mes_seleccionado} (x{multiplicador_actual:.2f})**.")
 
-        # Ordenar los valores ajustados
-        df_ldc = df_ldc.sort_values(by='Potencia Total (W)', ascending=False).reset_index(drop=True)
-        df_ldc['Duración (horas)'] = df_ldc.index + 1
-
-        # Recalcular Pico y Media Ajustados
-        potencia_max_w_ajustada = df_ldc['Potencia Total (W)'].max()
-        potencia_media_total_w_ajustada = df_ldc['Potencia Total (W)'].mean()
+        # Pico y Media Ajustados
+        potencia_max_w_ajustada = resumen_ldc["pico_w"]
+        potencia_media_total_w_ajustada = resumen_ldc["media_w"]
 
         # === GRÁFICO BASE ===
         ldc_curve = alt.Chart(df_ldc).mark_line(point=True, color='#007F5F').encode(
-            x=alt.X('Duración (horas):Q', title='Duración (horas/día)', scale=alt.Scale(domain=[1, 24])),
+            x=alt.X('Duración (horas):Q', title='Duración (horas/día)', scale=alt.Scale(domain=[paso_horas, 24])),
             y=alt.Y('Potencia Total (W):Q', title='Potencia Total (W)'),
             tooltip=['Duración (horas)', alt.Tooltip('Potencia Total (W)', format=',.0f')]
         ).properties(
@@ -984,7 +1312,7 @@ with tab2:
 
         # === COMBINAR TODAS LAS CAPAS ===
         chart_ldc = alt.layer(ldc_curve, line_pico, text_pico, line_media, text_media)
-        st.altair_chart(chart_ldc, use_container_width=True)
+        mostrar_grafico(chart_ldc, "ldc", df_ldc, potencia_max_w_ajustada, potencia_media_total_w_ajustada, paso_horas)
 
         st.markdown("""
             **Interpretación:** El **Cuadro de Carga (LDC)** muestra la potencia demandada (eje Y) para cada hora del día, ordenada de mayor a menor, frente al número de horas (eje X) durante las cuales esa potencia o una superior es requerida.  
@@ -996,20 +1324,18 @@ with tab2:
             # Los datos descargados (df_ldc) ya están ajustados
             st.download_button(
                 "💾 Descargar datos LDC (CSV)",
-                data=df_ldc.to_csv(index=False).encode("utf-8"),
+                data=diferida(grafo.obtener("ldc"), "csv"),
                 file_name="datos_ldc_ajustado.csv",
-                mime="text/csv",
+                mime=MIME["csv"],
                 use_container_width=True
             )
         with col_descarga_ldc_excel:
             # Los datos descargados (df_ldc) ya están ajustados
-            output_ldc = io.BytesIO()
-            df_ldc.to_excel(output_ldc, index=False)
             st.download_button(
                 "💾 Descargar datos LDC (Excel)",
-                data=output_ldc.getvalue(),
+                data=diferida(grafo.obtener("ldc"), "xlsx"),
                 file_name="datos_ldc_ajustado.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                mime=MIME["xlsx"],
                 use_container_width=True
             )
         
@@ -1018,33 +1344,32 @@ with tab2:
         # --- GRÁFICO 3.2: CONSUMO HORARIO SEGMENTADO ---
         st.markdown("#### 3.2. Potencia Horaria Diurna vs. Nocturna (W)")
 
-        # 1. Preparar los datos para el gráfico
-        # Se usa df_potencia_total_ajustada (calculado en el paso 0)
-        df_plot_horario = df_potencia_total_ajustada.T.reset_index()
-        df_plot_horario.columns = ['Hora', 'Potencia (W)']
-        df_plot_horario['Hora'] = df_plot_horario['Hora'].astype(int)
+        # 1. Preparar los datos para el gráfico (nodo 'tabla_horaria' del grafo)
+        df_plot_horario = grafo.obtener("tabla_horaria")
 
         st.info(f"El perfil mostrado está ajustado por el multiplicador de **{mes_seleccionado} (x{multiplicador_actual:.2f})**.")
-        
-        def get_segmento(hora):
-            return 'Diurno ☀️' if f"{hora}" in horas_diurnas_cols else 'Nocturno 🌙'
-
-        df_plot_horario['Segmento'] = df_plot_horario['Hora'].apply(get_segmento)
 
         # Crear el gráfico de barras con Altair
+        # Con franjas subhorarias el eje usa las etiquetas 'HH:MM' y solo rotula las horas en punto
+        eje_horario = alt.X('Hora:O', title='Hora del Día', axis=alt.Axis(labelAngle=0))
+        if resolucion != RESOLUCION_BASE:
+            eje_horario = alt.X(
+                'Franja:O', title='Hora del Día', sort=None,
+                axis=alt.Axis(labelAngle=0, values=[formato_hora(h) for h in range(24)]),
+            )
         chart_horario = alt.Chart(df_plot_horario).mark_bar().encode(
-            x=alt.X('Hora:O', title='Hora del Día', axis=alt.Axis(labelAngle=0)),
+            x=eje_horario,
             y=alt.Y('Potencia (W):Q', title='Potencia (W)'),
             color=alt.Color('Segmento:N', 
                             legend=alt.Legend(title="Período"),
                             scale=alt.Scale(domain=['Diurno ☀️', 'Nocturno 🌙'], 
                                             range=['#ffcc66', '#4c78a8'])),
-            tooltip=['Hora', 'Potencia (W)', 'Segmento']
+            tooltip=['Franja' if resolucion != RESOLUCION_BASE else 'Hora', 'Potencia (W)', 'Segmento']
         ).properties(
             title='Perfil de Consumo Horario Segmentado'
         ).properties(height=400)
 
-        st.altair_chart(chart_horario, use_container_width=True)
+        mostrar_grafico(chart_horario, "horario", df_plot_horario, resolucion)
         st.markdown("""
         **Interpretación:** Este gráfico de barras detalla la potencia total demandada por el sistema en cada una de las 24 horas del día. La segmentación de colores **Diurno/Nocturno** permite identificar visualmente los períodos de mayor y menor actividad de carga. Es crucial para verificar la concordancia entre los horarios configurados y los picos de consumo.
         """)
@@ -1054,19 +1379,17 @@ with tab2:
         with col_descarga_horario_csv:
             st.download_button(
                 "💾 Descargar datos horario (CSV)",
-                data=df_plot_horario.to_csv(index=False).encode("utf-8"),
+                data=diferida(df_plot_horario, "csv"),
                 file_name="datos_potencia_horaria_ajustada.csv",
-                mime="text/csv",
+                mime=MIME["csv"],
                 use_container_width=True
             )
         with col_descarga_horario_excel:
-            output_horario = io.BytesIO()
-            df_plot_horario.to_excel(output_horario, index=False)
             st.download_button(
                 "💾 Descargar datos horario (Excel)",
-                data=output_horario.getvalue(),
+                data=diferida(df_plot_horario, "xlsx"),
                 file_name="datos_potencia_horaria_ajustada.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                mime=MIME["xlsx"],
                 use_container_width=True
             )
 
@@ -1075,14 +1398,8 @@ with tab2:
         # --- GRÁFICO 3.3: ENERGÍA TOTAL POR MES ---
         st.markdown("#### 3.3. Proyección de Energía Total por Mes (kWh)")
 
-        # Crear DataFrame base con días, multiplicadores y energía ajustada
-        df_mensual = pd.DataFrame(list(dias_por_mes.items()), columns=['Mes', 'Días'])
-        df_mensual['Multiplicador'] = df_mensual['Mes'].map(multiplicadores_mes)
-        df_mensual['Energía (kWh)'] = df_mensual['Días'] * energia_total_dia * df_mensual['Multiplicador']
-
-        # Asegurar orden de los meses
-        df_mensual['Mes'] = pd.Categorical(df_mensual['Mes'], categories=orden_meses, ordered=True)
-        df_mensual = df_mensual.sort_values('Mes')
+        # DataFrame con días, multiplicadores y energía ajustada (nodo 'tabla_mensual' del grafo)
+        df_mensual = grafo.obtener("tabla_mensual")
 
         # Energía mensual promedio
         energia_mensual_promedio = df_mensual['Energía (kWh)'].mean()
@@ -1151,7 +1468,7 @@ with tab2:
             )
         )
 
-        st.altair_chart(chart_mensual, use_container_width=True)
+        mostrar_grafico(chart_mensual, "mensual", df_mensual)
 
         # --- Interpretación ---
         st.markdown("""
@@ -1164,21 +1481,245 @@ with tab2:
         with col_descarga_mensual_csv:
             st.download_button(
                 "💾 Descargar datos mensual (CSV)",
-                data=df_mensual.to_csv(index=False).encode("utf-8"),
+                data=diferida(df_mensual, "csv"),
                 file_name="datos_energia_mensual_ajustada.csv",
-                mime="text/csv",
+                mime=MIME["csv"],
                 use_container_width=True
             )
         with col_descarga_mensual_excel:
-            output_mensual = io.BytesIO()
-            df_mensual.to_excel(output_mensual, index=False)
             st.download_button(
                 "💾 Descargar datos mensual (Excel)",
-                data=output_mensual.getvalue(),
+                data=diferida(df_mensual, "xlsx"),
                 file_name="datos_energia_mensual_ajustada.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                mime=MIME["xlsx"],
+                use_container_width=True
+            )
+
+        st.markdown("---")
+
+        # --- GRÁFICO 3.4: SIMULACIÓN ANUAL HORA A HORA ---
+        st.markdown("#### 3.4. Simulación Anual Hora a Hora (8760 h)")
+        st.markdown(
+            "Simula el año completo con el calendario real (incluidos los años bisiestos), aplicando el "
+            "multiplicador de cada mes y horarios distintos para días laborables, fines de semana y festivos."
+        )
+
+        col_anio, col_fds = st.columns(2)
+        with col_anio:
+            anio_simulacion = int(st.number_input(
+                "Año a simular", min_value=1900, max_value=2100,
+                value=datetime.date.today().year, step=1, key="anio_simulacion"
+            ))
+        with col_fds:
+            dias_fin_de_semana = st.multiselect(
+                "Días de fin de semana",
+                options=list(range(7)),
+                default=[5, 6],
+                format_func=lambda d: NOMBRES_DIAS[d],
+                key="dias_fin_de_semana",
+            )
+
+        texto_festivos = st.text_area(
+            "Festivos (AAAA-MM-DD o DD/MM/AAAA, uno por línea o separados por comas)",
+            key="festivos_simulacion",
+            height=100,
+        )
+        festivos, festivos_invalidos = parsear_festivos(texto_festivos)
+        if festivos_invalidos:
+            st.warning(f"⚠️ Fechas no reconocidas (se ignoran): {', '.join(festivos_invalidos)}")
+        festivos = tuple(f for f in festivos if f.year == anio_simulacion)
+
+        # Horarios opcionales de fin de semana y festivos (misma estructura que la tabla de la pestaña 1)
+        col_horario_fds, col_horario_festivo = st.columns(2)
+        with col_horario_fds:
+            archivo_fds = st.file_uploader(
+                "Horario de fin de semana (opcional)", type=["csv", "xlsx"], key="archivo_horario_fin_de_semana",
+                help="Tabla con el mismo formato que la de la pestaña 1. Si no se carga, se usa el horario laborable."
+            )
+            datos_fin_de_semana = leer_horario_tipo_dia(archivo_fds, resolucion, "fin_de_semana")
+        with col_horario_festivo:
+            archivo_festivo = st.file_uploader(
+                "Horario de festivos (opcional)", type=["csv", "xlsx"], key="archivo_horario_festivo",
+                help="Tabla con el mismo formato que la de la pestaña 1. Si no se carga, se usa el horario laborable."
+            )
+            datos_festivo = leer_horario_tipo_dia(archivo_festivo, resolucion, "festivo")
+
+        grafo.fijar_entrada("anio", anio_simulacion)
+        grafo.fijar_entrada("festivos", festivos)
+        grafo.fijar_entrada("dias_fin_de_semana", tuple(dias_fin_de_semana))
+        grafo.fijar_entrada("datos_fin_de_semana", datos_fin_de_semana)
+        grafo.fijar_entrada("datos_festivo", datos_festivo)
+        resumen_anual = grafo.obtener("resumen_anual")
+
+        col_sim_energia, col_sim_pico, col_sim_base, col_sim_fc = st.columns(4)
+        with col_sim_energia:
+            st.metric(
+                f"Energía Anual Simulada ({resumen_anual['horas_anio']:,} h)",
+                f"{resumen_anual['energia_anual_kwh']:,.2f} kWh",
+                f"{'Año bisiesto' if es_bisiesto(anio_simulacion) else 'Año no bisiesto'}",
+                delta_color="off",
+            )
+        with col_sim_pico:
+            st.metric(
+                "📈 Pico Anual",
+                f"{resumen_anual['potencia_max_anual_w']:,.0f} W",
+                f"{resumen_anual['momento_max_anual']:%d/%m/%Y %H:%M} h",
+                delta_color="off",
+            )
+        with col_sim_base:
+            st.metric(
+                "📉 Base Anual",
+                f"{resumen_anual['potencia_min_anual_w']:,.0f} W",
+                f"{resumen_anual['momento_min_anual']:%d/%m/%Y %H:%M} h",
+                delta_color="off",
+            )
+        with col_sim_fc:
+            st.metric(
+                "Factor de Carga Anual",
+                f"{resumen_anual['factor_carga_anual']:,.2f} %",
+                f"Media: {resumen_anual['potencia_media_anual_w']:,.0f} W",
+                delta_color="off",
+            )
+
+        st.caption(" · ".join(
+            f"{tipo}: {dias} días, {energia:,.0f} kWh"
+            for tipo, dias, energia in zip(TIPOS_DIA, resumen_anual["dias_por_tipo"], resumen_anual["energia_por_tipo_kwh"])
+        ))
+
+        col_graf_ldc_anual, col_graf_mes_anual = st.columns(2)
+        with col_graf_ldc_anual:
+            # La LDC anual tiene 8760 puntos (o más con franjas subhorarias): el gráfico usa la curva reducida
+            metodo_ldc_anual = st.selectbox(
+                "Construcción de la LDC anual",
+                options=list(METODOS_LDC),
+                format_func=METODOS_LDC.get,
+                key="metodo_ldc_anual",
+                help="El pico, la media y los percentiles son exactos con cualquier método; solo cambia la curva dibujada.",
+            )
+            grafo.fijar_entrada("metodo_ldc_anual", metodo_ldc_anual)
+            ldc_anual = grafo.obtener("ldc_anual")
+            df_ldc_anual = ldc_anual["curva"]
+            if ldc_anual["exacta"] and graficos_raster.usar_raster(ldc_anual["n"]):
+                # Curva exacta con todos sus puntos, dibujada en el servidor
+                df_ldc_anual = grafo.obtener("ldc_anual_completa")
+                st.image(graficos_raster.linea(
+                    df_ldc_anual, 'Duración (horas)', 'Potencia Total (W)', titulo=f'LDC Anual {anio_simulacion}',
+                ))
+            else:
+                chart_ldc_anual = alt.Chart(df_ldc_anual).mark_line(color='#007F5F').encode(
+                    x=alt.X('Duración (horas):Q', title='Duración (horas/año)'),
+                    y=alt.Y('Potencia Total (W):Q', title='Potencia Total (W)'),
+                    tooltip=['Duración (horas)', alt.Tooltip('Potencia Total (W)', format=',.0f')]
+                ).properties(height=350, title=f'LDC Anual {anio_simulacion}')
+                mostrar_grafico(chart_ldc_anual, "ldc_anual", df_ldc_anual, anio_simulacion)
+            st.caption(
+                " · ".join(f"P{p}: {valor:,.0f} W" for p, valor in ldc_anual["percentiles"].items())
+                + f" · {len(df_ldc_anual):,} de {ldc_anual['n']:,} puntos"
+                + ("" if ldc_anual["exacta"] else f" (curva aproximada: {METODOS_LDC[ldc_anual['metodo']]})")
+            )
+        with col_graf_mes_anual:
+            df_mensual_anual = grafo.obtener("tabla_mensual_anual")
+            chart_mes_anual = alt.Chart(df_mensual_anual).mark_bar(color="#0AC999").encode(
+                x=alt.X('Mes:O', sort=orden_meses, title='Mes del Año'),
+                y=alt.Y('Energía (kWh):Q', title='Energía Simulada (kWh)'),
+                tooltip=[
+                    'Mes', 'Días',
+                    alt.Tooltip('Energía (kWh)', format=',.2f'),
+                    alt.Tooltip('Pico (W)', format=',.0f'),
+                ]
+            ).properties(height=350, title=f'Energía y Pico por Mes ({anio_simulacion})')
+            mostrar_grafico(chart_mes_anual, "mes_anual", df_mensual_anual, anio_simulacion)
+
+        st.markdown("""
+        **Interpretación:** A diferencia de la proyección 2.3 (todos los días iguales y 365 días), la simulación anual recorre el calendario real: cada día usa el horario de su tipo (laborable, fin de semana o festivo) escalado por el multiplicador de su mes. El **pico anual** indica la fecha y hora de máxima demanda, y la **LDC anual** muestra cuántas horas del año se supera cada nivel de potencia.
+        """)
+
+        col_descarga_serie, col_descarga_serie_parquet, col_descarga_mes_anual_csv, col_descarga_mes_anual_excel = st.columns(4)
+        with col_descarga_serie:
+            # La serie (8760 filas o más) se arma y serializa solo al pulsar el botón
+            st.download_button(
+                f"💾 Serie anual {anio_simulacion} (CSV)",
+                data=diferida(serie_anual, "csv", grafo.obtener("perfil_anual"), grafo.obtener("calendario_anual")),
+                file_name=f"simulacion_anual_{anio_simulacion}.csv",
+                mime=MIME["csv"],
+                use_container_width=True
+            )
+        with col_descarga_serie_parquet:
+            st.download_button(
+                f"💾 Serie anual {anio_simulacion} (Parquet)",
+                data=diferida(serie_anual, "parquet", grafo.obtener("perfil_anual"), grafo.obtener("calendario_anual")),
+                file_name=f"simulacion_anual_{anio_simulacion}.parquet",
+                mime=MIME["parquet"],
                 use_container_width=True
             )
+        with col_descarga_mes_anual_csv:
+            st.download_button(
+                "💾 Resumen mensual simulado (CSV)",
+                data=diferida(df_mensual_anual, "csv"),
+                file_name=f"simulacion_mensual_{anio_simulacion}.csv",
+                mime=MIME["csv"],
+                use_container_width=True
+            )
+        with col_descarga_mes_anual_excel:
+            st.download_button(
+                "💾 Resumen mensual simulado (Excel)",
+                data=diferida(df_mensual_anual, "xlsx"),
+                file_name=f"simulacion_mensual_{anio_simulacion}.xlsx",
+                mime=MIME["xlsx"],
+                use_container_width=True
+            )
+
+        # --- 3.5: CONSULTAS DE UMBRAL SOBRE LA LDC ---
+        st.markdown("#### 3.5. Consultas de Demanda sobre la LDC")
+        base_consulta = st.radio(
+            "Perfil consultado",
+            [f"Año simulado {anio_simulacion} (3.4)", f"Día ajustado de {mes_seleccionado} (3.1)"],
+            horizontal=True,
+            key="base_consulta_demanda",
+        )
+        indice_demanda = grafo.obtener("indice_demanda_anual" if base_consulta.startswith("Año") else "indice_demanda")
+
+        col_umbrales, col_percentiles = st.columns(2)
+        with col_umbrales:
+            texto_umbrales = st.text_input(
+                "Umbrales / topes de demanda (kW, separados por comas)",
+                value="5, 10, 15",
+                key="umbrales_demanda",
+            )
+        with col_percentiles:
+            texto_percentiles = st.text_input(
+                "Percentiles (0-100, separados por comas)",
+                value="50, 90, 95, 99",
+                key="percentiles_demanda",
+            )
+        umbrales_kw, umbrales_invalidos = parsear_valores(texto_umbrales)
+        percentiles_consulta, percentiles_invalidos = parsear_valores(texto_percentiles)
+        percentiles_consulta = percentiles_consulta[(percentiles_consulta >= 0) & (percentiles_consulta <= 100)]
+        if umbrales_invalidos or percentiles_invalidos:
+            st.warning(f"⚠️ Valores no reconocidos (se ignoran): {', '.join(umbrales_invalidos + percentiles_invalidos)}")
+
+        if len(percentiles_consulta):
+            st.caption(" · ".join(
+                f"P{p:g}: {valor / 1000:,.2f} kW"
+                for p, valor in zip(percentiles_consulta, indice_demanda.percentiles(percentiles_consulta))
+            ))
+        if len(umbrales_kw):
+            df_consulta = indice_demanda.consultar(umbrales_kw * 1000)
+            df_consulta.insert(0, "Umbral (kW)", umbrales_kw)
+            st.dataframe(
+                df_consulta.drop(columns="Umbral (W)").style.format({
+                    "Umbral (kW)": "{:,.2f}",
+                    "Horas sobre el umbral": "{:,.2f}",
+                    "% del tiempo": "{:.2f} %",
+                    "Energía sobre el umbral (kWh)": "{:,.2f}",
+                    "% de la energía": "{:.2f} %",
+                }),
+                hide_index=True,
+                use_container_width=True,
+            )
+        st.markdown(f"""
+        **Interpretación:** Sobre {indice_demanda.horas_totales:,g} h y {indice_demanda.energia_total_kwh:,.2f} kWh, cada fila indica cuántas horas la demanda **supera** el umbral y qué energía queda **por encima** de ese tope (la que habría que recortar o cubrir con otra fuente para no superarlo).
+        """)
 
         st.markdown("---")
 
@@ -1187,13 +1728,15 @@ with tab2:
         # =========================================================================
 
         # ¡MODIFICADO! Se agrega el diccionario de multiplicadores para que el mapa de calor mensual los use
-        render_mapa_calor_accesible(
-            df_base=df_base,                   # tu dataframe base de cargas
+        scheme_heatmap = render_mapa_calor_accesible(
+            df_base=almacen,                   # almacén compacto: solo se desempaquetan las filas del mapa
             potencia_horaria=potencia_horaria, # serie 0..23 ya calculada (BASE)
             default_view="Horario diario (0-23)",   # o "Horario mensual (12 meses)"
             default_scheme="blues",
             height=420,
-            multiplicadores_estacionales=multiplicadores_mes # <-- NUEVO ARGUMENTO
+            multiplicadores_estacionales=multiplicadores_mes, # <-- NUEVO ARGUMENTO
+            tabla_anual=grafo.obtener("heatmap_anual"), # día del año × hora de la simulación 3.4
+            subtotales_categoria=almacen.subtotales_categoria(),
         )
 
         # --- INTERPRETACIÓN DEL MAPA DE CALOR ---
@@ -1221,3 +1764,63 @@ with tab2:
         # 5) Botón para imprimir (FUERA del área)
 
         render_print_button("📄 Imprimir / Descargar PDF", delay_ms=800)
+
+        # Informe PDF armado en el servidor (fpdf2): mismas páginas siempre, sin el diálogo del navegador
+        st.download_button(
+            "📄 Informe PDF (generado en el servidor)",
+            # partial fija ahora los argumentos: el PDF se arma al pulsar, en otro hilo, sin leer el grafo
+            data=partial(
+                informe_pdf,
+                {**metricas, "mascara_diurna": mascara_diurna},
+                subtitulo=(f"Mes de referencia: {mes_seleccionado} (x{multiplicador_actual:.2f}) · "
+                           f"Período diurno: {formato_hora(diurno_inicio)} a {formato_hora(diurno_fin)}"),
+                multiplicadores=multiplicadores_mes,
+                dias_por_mes=dias_por_mes,
+                scheme=scheme_heatmap,
+                tabla_anual=grafo.obtener("heatmap_anual"),
+            ),
+            file_name=f"informe_cuadro_carga_{mes_seleccionado.lower()}.pdf",
+            mime="application/pdf",
+            help="Métricas, LDC, perfil horario, proyección mensual y mapas de calor en un PDF paginado.",
+        )
+
+        # Informe completo en un solo libro Excel (se escribe al pulsar el botón, ver exportaciones.py)
+        hojas_informe = {
+            "Cargas": almacen.a_dataframe,  # se construye al pulsar la descarga
+            "Perfil horario": df_plot_horario,
+            "LDC": grafo.obtener("ldc"),
+            "Proyección mensual": df_mensual,
+            "Métricas": tabla_metricas({
+                "mes_referencia": mes_seleccionado,
+                "multiplicador": multiplicador_actual,
+                "diurno_inicio": diurno_inicio,
+                "diurno_fin": diurno_fin,
+                **metricas,
+            }),
+        }
+        st.download_button(
+            "📦 Informe completo (Excel, todas las hojas)",
+            data=informe_diferido(hojas_informe),
+            file_name=f"informe_cuadro_carga_{mes_seleccionado.lower()}.xlsx",
+            mime=MIME["xlsx"],
+            help="Cargas, perfil horario, LDC, proyección mensual y métricas en un solo archivo.",
+        )
+
+        # Resultados del proyecto activo (solo si la tabla analizada es la guardada; no se reescriben si no cambian)
+        if st.session_state.get("version_guardada") == almacen.version:
+            for nombre_hoja, tabla_resultado in hojas_informe.items():
+                if nombre_hoja != "Cargas":
+                    proyectos.guardar_resultado(st.session_state["proyecto_activo"], nombre_hoja, tabla_resultado)
+
+        arranque.registrar("primer render de la pestaña 2", time.perf_counter() - inicio_pestana_2)
+
+# ======== TIEMPOS DE ARRANQUE ========
+arranque.desde_inicio("primer render completo")
+if arranque.PRECARGA:
+    precarga_modulos()
+if arranque.MOSTRAR_TIEMPOS:
+    with st.sidebar.expander("⏱️ Tiempos de arranque (primera vez en el proceso)"):
+        st.dataframe(
+            pd.DataFrame(list(arranque.tiempos().items()), columns=["Etapa", "Segundos"]),
+            hide_index=True, use_container_width=True,
+        )
@@ -4,6 +4,26 @@ import streamlit as st
 import pandas as pd
 import altair as alt
 
+import graficos_raster
+from cache_graficos import mostrar_grafico
+from ingesta import PALABRAS_CATEGORIA, categoria_por_nombre
+from mapa_calor_cargas import (
+    MAX_FILAS_HEATMAP, agrupar_filas, nombres_cargas, pagina_cargas, por_categoria, tabla_categorias, top_k_y_otras,
+)
+from matriz_heatmap import tabla_mensual, valores_compactos
+from motor_calculo import RESOLUCION_BASE, RESOLUCIONES, columnas_franjas
+
+# Vistas del mapa por carga (las agregadas se calculan en el servidor, ver mapa_calor_cargas.py)
+VISTA_TODAS = "Todas las cargas"
+VISTA_TOP_K = "Top-K + otras"
+VISTA_CATEGORIA = "Por categoría"
+VISTA_PAGINAS = "Páginas"
+VISTA_AGRUPADA = "Filas agrupadas"
+
+FORMATO_DIARIO = "Horario diario (0-23)"
+FORMATO_MENSUAL = "Horario mensual (12 meses)"
+FORMATO_ANUAL = "Horario anual (día × hora)"
+
 # Paletas seguras para distintos tipos de daltonismo
 # Nota: "Predeterminada (sin filtro)" usa 'blues' para volver al look original.
 CB_PALETTES = {
@@ -38,6 +58,50 @@ def _ui_accesibilidad(default_scheme: str = "blues") -> str:
 
 # ---------- RENDERIZADORES (privados) ----------
 
+def _eje_franjas(n: int, campo: str = "Hora") -> alt.X:
+    """Eje X ordinal de franjas (en orden del día) con etiquetas solo en las horas en punto."""
+    etiquetas = columnas_franjas(n) if n == RESOLUCION_BASE else [f"{h}:00" for h in range(24)]
+    return alt.X(
+        f"{campo}:O",
+        title="Hora del Día",
+        sort=columnas_franjas(n),
+        axis=alt.Axis(labelAngle=0, values=etiquetas),
+    )
+
+def _grafico_heatmap(
+    tabla: pd.DataFrame, scheme: str, eje_y: alt.Y, titulo_filas: str, titulo: str, height: int, marcas_y=None,
+):
+    """
+    Mapa filas × franjas con datos en línea y compactos (sin el límite de 5000 filas de Altair).
+    Con más de graficos_raster.UMBRAL_RASTER celdas se dibuja en el servidor como imagen PNG.
+    """
+    n = tabla.shape[1]
+    if graficos_raster.usar_raster(tabla.size):
+        st.image(graficos_raster.heatmap(tabla, scheme, titulo, titulo_filas, alto_px=height, marcas_y=marcas_y))
+        st.caption(f"Imagen renderizada en el servidor ({len(tabla):,} filas × {n} franjas).")
+        return
+
+    def _construir():
+        return (
+            alt.Chart(alt.Data(values=valores_compactos(tabla)))
+            .mark_rect()
+            .encode(
+                x=_eje_franjas(n, campo="h"),
+                y=eje_y,
+                color=alt.Color("w:Q", scale=alt.Scale(scheme=scheme), legend=alt.Legend(title="Potencia (W)")),
+                tooltip=[
+                    alt.Tooltip("c:N", title=titulo_filas),
+                    alt.Tooltip("h:N", title="Hora"),
+                    alt.Tooltip("w:Q", title="Potencia (W)", format=",.0f"),
+                ],
+            )
+            .properties(title=titulo, height=height)
+            .interactive()
+        )
+
+    # Los datos compactos solo se generan si la especificación no está en caché
+    mostrar_grafico(_construir, "heatmap", tabla, scheme, eje_y.to_dict(), titulo_filas, titulo, height)
+
 def _heatmap_mensual(
     potencia_horaria: pd.Series,
     scheme: str,
@@ -45,75 +109,84 @@ def _heatmap_mensual(
                  "Julio","Agosto","Septiembre","Octubre","Noviembre","Diciembre"),
     titulo="Potencia Horaria Agregada por Mes (W)",
     height=420,
-    # === MODIFICACIÓN 1: Añadir argumento para multiplicadores ===
     multiplicadores_estacionales=None, 
 ):
-    # Normalizar índice 0..23
-    ph = potencia_horaria.copy()
-    ph.index = pd.Index([int(str(h)) for h in ph.index])
-    if len(ph) != 24 or sorted(ph.index.tolist()) != list(range(24)):
-        raise ValueError("La Serie 'potencia_horaria' debe tener exactamente horas 0..23.")
-
-    # Asegurarse de que los multiplicadores sean un diccionario válido, si no, usar 1.0 para todos
-    if multiplicadores_estacionales is None:
-        multiplicadores_estacionales = {mes: 1.0 for mes in orden_meses} 
-
-    # === MODIFICACIÓN 2: Aplicar el multiplicador del mes ===
-    # La potencia horaria base (ph.loc[h]) se multiplica por el factor de ajuste del mes.
-    df_mensual = pd.DataFrame(
-        [
-            (mes, h, ph.loc[h] * multiplicadores_estacionales.get(mes, 1.0)) 
-            for mes in orden_meses 
-            for h in range(24)
-        ],
-        columns=["Mes", "Hora", "Potencia (W)"]
+    # Índice 0..n-1 (n = 24 horas o 48/96/288 franjas subhorarias)
+    n = len(potencia_horaria)
+    if n not in RESOLUCIONES or [str(h) for h in potencia_horaria.index] != columnas_franjas(n):
+        raise ValueError("La Serie 'potencia_horaria' debe tener exactamente horas 0..23 (o franjas 'H:MM').")
+
+    # Matriz mes × franja en un solo producto exterior (multiplicadores × perfil base)
+    tabla = tabla_mensual(potencia_horaria.to_numpy(), multiplicadores_estacionales, meses=list(orden_meses))
+    _grafico_heatmap(
+        tabla, scheme,
+        eje_y=alt.Y("c:O", title="Mes", sort=list(orden_meses)),
+        titulo_filas="Mes", titulo=titulo, height=height,
     )
-    # =======================================================
-    
-    df_mensual["Mes"] = pd.Categorical(df_mensual["Mes"], categories=list(orden_meses), ordered=True)
-    df_mensual["Hora"] = df_mensual["Hora"].astype(int)
-
-    chart = (
-        alt.Chart(df_mensual)
-        .mark_rect()
-        .encode(
-            x=alt.X("Hora:O", title="Hora del Día", axis=alt.Axis(labelAngle=0)),
-            y=alt.Y("Mes:O", title="Mes", sort=list(orden_meses)),
-            color=alt.Color("Potencia (W):Q", scale=alt.Scale(scheme=scheme), legend=alt.Legend(title="Potencia (W)")),
-            tooltip=[alt.Tooltip("Mes:N"), alt.Tooltip("Hora:Q"), alt.Tooltip("Potencia (W):Q", format=",.0f")],
-        )
-        .properties(title=titulo, height=height)
-        .interactive()
+
+def _heatmap_anual(
+    tabla_anual: pd.DataFrame,
+    scheme: str,
+    titulo="Potencia por Día del Año y Hora (W)",
+    height=600,
+):
+    """Mapa día del año × hora a partir de la tabla de matriz_heatmap.tabla_anual."""
+    fechas = list(tabla_anual.index)
+    # Etiquetas solo en el primer día de cada mes
+    primeros = [f for f in fechas if f.startswith("01/")]
+    _grafico_heatmap(
+        tabla_anual, scheme,
+        eje_y=alt.Y("c:O", title="Día del Año", sort=fechas, axis=alt.Axis(values=primeros)),
+        titulo_filas="Fecha", titulo=titulo, height=height, marcas_y=primeros,
     )
-    st.altair_chart(chart, use_container_width=True)
+
+def _tabla_por_carga(df_base: pd.DataFrame, subtotales_categoria: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Matriz filas×franjas del mapa por carga. Con más de MAX_FILAS_HEATMAP cargas
+    solo se ofrecen vistas agregadas en el servidor (top-K, categoría, páginas, grupos).
+    'subtotales_categoria': sumas por categoría ya mantenidas (AlmacenCargas.subtotales_categoria).
+    """
+    n_cargas = len(df_base)
+    # Top-K necesita al menos 2 cargas (con una sola, el slider tendría mínimo = máximo)
+    vistas = ([VISTA_TODAS] if n_cargas <= MAX_FILAS_HEATMAP else []) + ([VISTA_TOP_K] if n_cargas > 1 else []) + [
+        VISTA_CATEGORIA, VISTA_PAGINAS, VISTA_AGRUPADA
+    ]
+    vista = st.radio("Filas del mapa:", vistas, horizontal=True, key="vista_heatmap_cargas")
+
+    if vista == VISTA_TODAS:
+        return pagina_cargas(df_base, 1, n_cargas)
+    if vista == VISTA_TOP_K:
+        k = st.slider("Cargas individuales (K)", min_value=1, max_value=min(n_cargas, MAX_FILAS_HEATMAP - 1),
+                      value=min(n_cargas, 20), key="k_heatmap_cargas")
+        return top_k_y_otras(df_base, k)
+    if vista == VISTA_CATEGORIA:
+        palabras = st.number_input("Palabras del nombre que definen la categoría", min_value=1, max_value=4,
+                                   value=PALABRAS_CATEGORIA, step=1, key="palabras_categoria_heatmap")
+        if subtotales_categoria is not None and palabras == PALABRAS_CATEGORIA:
+            return tabla_categorias(subtotales_categoria)
+        return por_categoria(df_base, categoria_por_nombre(nombres_cargas(df_base), palabras))
+    if vista == VISTA_PAGINAS:
+        paginas = max(1, -(-n_cargas // MAX_FILAS_HEATMAP))
+        pagina = st.number_input(f"Página (de {paginas:,}, ordenadas por energía)", min_value=1, max_value=paginas,
+                                 value=1, step=1, key="pagina_heatmap_cargas")
+        return pagina_cargas(df_base, pagina, MAX_FILAS_HEATMAP)
+    filas_por_grupo = max(1, -(-n_cargas // MAX_FILAS_HEATMAP))
+    st.caption(f"Cada fila es la potencia media de {filas_por_grupo:,} cargas consecutivas (ordenadas por energía).")
+    return agrupar_filas(df_base, filas_por_grupo)
 
 def _heatmap_diario_por_carga(
     df_base: pd.DataFrame,
     scheme: str,
     titulo="Potencia por Carga Individual y Hora",
-    height=420
+    height=420,
+    subtotales_categoria: pd.DataFrame = None,
 ):
-    columnas_horas = [f"{i}" for i in range(24)]
-    df_heatmap_diario_wide = df_base[columnas_horas].mul(df_base["Potencia (W)"], axis=0)
-    df_heatmap_diario_wide["Carga"] = df_base["Carga"]
-    df_long = df_heatmap_diario_wide.melt(
-        id_vars=["Carga"], var_name="Hora", value_name="Potencia (W)"
+    tabla = _tabla_por_carga(df_base, subtotales_categoria)
+    _grafico_heatmap(
+        tabla, scheme,
+        eje_y=alt.Y("c:O", title="Carga Eléctrica", sort=list(tabla.index)),
+        titulo_filas="Carga", titulo=titulo, height=max(height, 14 * len(tabla)),
     )
-    df_long["Hora"] = df_long["Hora"].astype(int)
-
-    chart = (
-        alt.Chart(df_long)
-        .mark_rect()
-        .encode(
-            x=alt.X("Hora:O", title="Hora del Día", axis=alt.Axis(labelAngle=0)),
-            y=alt.Y("Carga:O", title="Carga Eléctrica"),
-            color=alt.Color("Potencia (W):Q", scale=alt.Scale(scheme=scheme), legend=alt.Legend(title="Potencia (W)")),
-            tooltip=["Carga", "Hora", alt.Tooltip("Potencia (W)", format=",.0f")],
-        )
-        .properties(title=titulo, height=height)
-        .interactive()
-    )
-    st.altair_chart(chart, use_container_width=True)
 
 # ---------- API PÚBLICA ----------
 
@@ -125,31 +198,46 @@ def render_mapa_calor_accesible(
     height: int = 420,
     # === MODIFICACIÓN 3: Añadir argumento aquí también ===
     multiplicadores_estacionales=None, 
+    tabla_anual: pd.DataFrame = None,
+    subtotales_categoria: pd.DataFrame = None,
 ):
     """
     Selector + mapa de calor accesible.
-    - 'default_view': "Horario diario (0-23)" o "Horario mensual (12 meses)".
+    - 'df_base': tabla de cargas o almacén compacto (AlmacenCargas; ver mapa_calor_cargas.py).
+    - 'default_view': "Horario diario (0-23)", "Horario mensual (12 meses)" o "Horario anual (día × hora)".
     - 'default_scheme': paleta por defecto cuando el modo de inclusión está DESactivado.
+    - 'tabla_anual': días × franjas (matriz_heatmap.tabla_anual); sin ella no se ofrece la vista anual.
+    - 'subtotales_categoria': potencia por categoría ya sumada (AlmacenCargas.subtotales_categoria)
+      para la vista "Por categoría" con la categorización por defecto.
+    Devuelve la paleta elegida (para reutilizarla, p.ej. en el informe PDF).
     """
+    formatos = [FORMATO_DIARIO, FORMATO_MENSUAL] + ([FORMATO_ANUAL] if tabla_anual is not None else [])
     st.radio(
         "Selecciona el formato del mapa de calor:",
-        options=["Horario diario (0-23)", "Horario mensual (12 meses)"],
-        index=0 if default_view == "Horario diario (0-23)" else 1,
+        options=formatos,
+        index=formatos.index(default_view) if default_view in formatos else 0,
         key="fmt_heatmap_selector",
         horizontal=True,
-        help="Cambia entre visión diaria (por carga) y mensual (12×24).",
+        help="Cambia entre visión diaria (por carga), mensual (12×24) y anual (día del año × hora).",
     )
     # Leer la selección del estado (evita recrear radio cuando se reusa la función)
-    formato = st.session_state.get("fmt_heatmap_selector", "Horario diario (0-23)")
+    formato = st.session_state.get("fmt_heatmap_selector", FORMATO_DIARIO)
 
     # UI de accesibilidad: devuelve la paleta a usar
     scheme = _ui_accesibilidad(default_scheme=default_scheme)
 
-    st.markdown("### 4.1. Mapa de Calor: Carga vs. Hora (W)" if formato.startswith("Horario diario") else
-                "### 4.1. Mapa de Calor: Mes vs. Hora (W)")
+    st.markdown({
+        FORMATO_DIARIO: "### 4.1. Mapa de Calor: Carga vs. Hora (W)",
+        FORMATO_MENSUAL: "### 4.1. Mapa de Calor: Mes vs. Hora (W)",
+        FORMATO_ANUAL: "### 4.1. Mapa de Calor: Día del Año vs. Hora (W)",
+    }.get(formato, "### 4.1. Mapa de Calor"))
 
-    if formato == "Horario diario (0-23)":
-        _heatmap_diario_por_carga(df_base=df_base, scheme=scheme, height=height)
+    if formato == FORMATO_DIARIO:
+        _heatmap_diario_por_carga(
+            df_base=df_base, scheme=scheme, height=height, subtotales_categoria=subtotales_categoria,
+        )
+    elif formato == FORMATO_ANUAL and tabla_anual is not None:
+        _heatmap_anual(tabla_anual=tabla_anual, scheme=scheme)
     else:
         # === MODIFICACIÓN 4: Pasar el argumento a la función interna ===
         _heatmap_mensual(
@@ -159,6 +247,7 @@ def render_mapa_calor_accesible(
             multiplicadores_estacionales=multiplicadores_estacionales 
         )
         # ==============================================================
+    return scheme
 
 # Compatibilidad con tu integración previa (si la usas en otros lados)
 def render_mapa_calor_mensual(potencia_horaria: pd.Series, **kwargs):
@@ -0,0 +1,557 @@
+# almacen_cargas.py
+# -*- coding: utf-8 -*-
+"""
+Almacén de cargas indexado por 'Carga'.
+
+Guarda la tabla en arreglos NumPy por columna (con capacidad que crece por
+duplicación) y un diccionario Carga → posición, de modo que agregar,
+actualizar o eliminar una carga es O(1) amortizado. El DataFrame con
+'Item', 'Carga', 'Potencia (W)' y '0'..'23' no se guarda: el editor pide
+solo las filas que muestra (vista) y la tabla completa se construye al
+descargarla o validarla.
+
+El horario de cada carga se guarda como máscara de bits (uint32 con 24
+franjas, n/8 bytes con resolución subhoraria; ver horario_bits.py). Las
+pocas filas con valores distintos de 0/1 (que la validación debe poder
+reportar) se guardan aparte tal cual.
+
+El perfil de potencia por franja (y su desglose por categoría, ver
+ingesta.categoria_por_nombre) se mantiene al vuelo: cada cambio resta el
+aporte anterior de las filas afectadas y suma el nuevo, así que editar una
+carga no recorre toda la tabla. Cada RECALCULO_PERFIL_CADA filas
+restadas se recalcula desde cero para descartar la deriva de redondeo.
+
+La validez también se sigue por cambio: partiendo de una tabla validada,
+cada cambio revisa solo las filas que toca (ver _fila_valida) y, si están
+bien, la nueva versión queda validada sin volver a recorrer la tabla.
+"""
+import numpy as np
+import pandas as pd
+
+import horario_bits
+from ingesta import categoria_por_nombre, columnas_tabla, remuestrear_tabla
+from motor_calculo import RESOLUCION_BASE, columnas_franjas, detectar_resolucion, remuestrear_horario
+
+CAPACIDAD_INICIAL = 64
+# Filas restadas del perfil entre dos recálculos completos (las restas son las que dejan residuos)
+RECALCULO_PERFIL_CADA = 10_000
+# Decimales (W) del perfil entregado: los residuos de las restas (~1e-12) no desempatan picos ni valles
+DECIMALES_PERFIL = 6
+
+
+def _sin_nombre(nombre) -> bool:
+    return pd.api.types.is_scalar(nombre) and bool(pd.isna(nombre))
+
+
+def _mismo_nombre(a, b) -> bool:
+    return (_sin_nombre(a) and _sin_nombre(b)) or (not _sin_nombre(a) and not _sin_nombre(b) and a == b)
+
+
+class _SinClave:
+    """Clave interna de una fila que no se puede indexar por nombre (vacío o repetido); la validación la reporta."""
+
+    __slots__ = ()
+
+
+def _numero(valor) -> float:
+    """Valor de una celda del editor como float (NaN si está vacía o no es numérica)."""
+    try:
+        return np.nan if valor is None else float(valor)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+class AlmacenCargas:
+    """
+    Tabla de cargas con upsert/eliminación O(1).
+    El orden de la vista es el de inserción; actualizar una carga existente la
+    mueve al final (igual que concat + drop_duplicates(keep="last")).
+    Las filas sin nombre o con un nombre ya usado se conservan con una clave
+    interna (_SinClave), de modo que la validación las reporte como faltantes
+    o duplicadas; si la fila que tenía el nombre desaparece, la primera
+    repetida pasa a indexarse por él.
+    """
+
+    def __init__(self, capacidad: int = CAPACIDAD_INICIAL, resolucion: int = RESOLUCION_BASE):
+        capacidad = max(int(capacidad), 1)
+        self.resolucion = resolucion
+        self.columnas_horas = columnas_franjas(resolucion)
+        self._bits = np.zeros(capacidad, dtype=horario_bits.dtype_mascara(resolucion))
+        self._irregulares = {}  # fila -> horario float32 (NaN o valores fuera de 0/1, pendientes de validar)
+        self._potencia = np.zeros(capacidad, dtype=np.float64)
+        self._nombres = np.empty(capacidad, dtype=object)
+        self._categorias = np.empty(capacidad, dtype=object)
+        self._perfil = np.zeros(resolucion, dtype=np.float64)
+        self._subtotales = {}   # categoría -> [potencia por franja, número de cargas]
+        self._filas_restadas = 0  # filas restadas del perfil desde el último recálculo completo
+        self._posicion = {}     # Carga (o _SinClave) -> fila en los arreglos (el orden del dict es el de la vista)
+        self._repetidas = {}    # Carga -> claves _SinClave de las filas que repiten ese nombre
+        self._claves = None     # (version, claves en el orden de la vista)
+        self._libres = []       # filas liberadas por eliminaciones, reutilizables
+        self._usadas = 0        # filas ocupadas alguna vez (tope de los arreglos)
+        self.version = 0        # se incrementa con cada cambio
+        self.version_validada = None  # última versión validada (completa, o por cambios con filas válidas)
+
+    # ---------- TAMAÑO Y CAPACIDAD ----------
+
+    def __len__(self) -> int:
+        return len(self._posicion)
+
+    def __contains__(self, carga) -> bool:
+        return carga in self._posicion
+
+    @property
+    def empty(self) -> bool:
+        return not self._posicion
+
+    # ---------- VALIDEZ ----------
+
+    @property
+    def validada(self) -> bool:
+        """True si la versión actual pasó la validación (completa o por cambios, ver _avanzar_validez)."""
+        return self.version_validada == self.version
+
+    def marcar_validada(self):
+        """La tabla actual pasó la validación completa (validacion.validar_datos)."""
+        self.version_validada = self.version
+
+    def _fila_valida(self, fila: int) -> bool:
+        """
+        Lo que validacion.indice_errores revisa de una fila, en O(1): nombre presente y no repetido
+        (la fila tiene la clave de su nombre), potencia numérica no negativa y horas 0/1 (no irregular).
+        """
+        nombre, potencia = self._nombres[fila], self._potencia[fila]
+        return (
+            not _sin_nombre(nombre) and self._posicion.get(nombre) == fila
+            and not np.isnan(potencia) and potencia >= 0 and fila not in self._irregulares
+        )
+
+    def _avanzar_validez(self, valida: bool, filas):
+        """Si la tabla era válida antes del cambio y las 'filas' tocadas lo son, la versión nueva también."""
+        if valida and all(self._fila_valida(fila) for fila in filas):
+            self.version_validada = self.version
+
+    def _asegurar_capacidad(self, extra: int):
+        necesaria = self._usadas + extra
+        capacidad = len(self._potencia)
+        if necesaria <= capacidad:
+            return
+        while capacidad < necesaria:
+            capacidad *= 2
+        bits = np.zeros(capacidad, dtype=self._bits.dtype)
+        bits[: self._usadas] = self._bits[: self._usadas]
+        potencia = np.zeros(capacidad, dtype=np.float64)
+        potencia[: self._usadas] = self._potencia[: self._usadas]
+        nombres = np.empty(capacidad, dtype=object)
+        nombres[: self._usadas] = self._nombres[: self._usadas]
+        categorias = np.empty(capacidad, dtype=object)
+        categorias[: self._usadas] = self._categorias[: self._usadas]
+        self._bits, self._potencia, self._nombres, self._categorias = bits, potencia, nombres, categorias
+
+    def _escribir_horario(self, filas: np.ndarray, horario: np.ndarray):
+        """Guarda las filas binarias como bits y las demás en '_irregulares'."""
+        if horario.dtype == np.uint8:
+            binario = (horario <= 1).all(axis=1)  # tipos compactos: sin pasar por float
+        else:
+            binario = horario_bits.es_binario(horario)
+        self._bits[filas] = horario_bits.empaquetar(np.where(binario[:, None], horario, 0))
+        for fila in filas[binario].tolist():
+            self._irregulares.pop(fila, None)
+        for k in np.flatnonzero(~binario).tolist():
+            self._irregulares[int(filas[k])] = horario[k].astype(np.float32)
+
+    def _aportar(self, filas: np.ndarray, signo: int):
+        """Suma (signo=1) o resta (signo=-1) el aporte de 'filas' al perfil y a los subtotales por categoría."""
+        if not len(filas):
+            return
+        # Las celdas vacías o no numéricas (tabla aún sin validar) no aportan
+        aporte = np.nan_to_num(self._horario_en_orden(filas) * self._potencia[filas, None]) * signo
+        self._perfil += aporte.sum(axis=0)
+        codigos, niveles = pd.factorize(self._categorias[filas])
+        sumas = np.zeros((len(niveles), aporte.shape[1]), dtype=np.float64)
+        np.add.at(sumas, codigos, aporte)
+        for categoria, suma, conteo in zip(niveles, sumas, np.bincount(codigos, minlength=len(niveles)).tolist()):
+            subtotal = self._subtotales.setdefault(categoria, [np.zeros(len(self._perfil)), 0])
+            subtotal[0] += suma
+            subtotal[1] += signo * conteo
+            if subtotal[1] <= 0:
+                del self._subtotales[categoria]
+        if signo < 0:
+            self._filas_restadas += len(filas)
+
+    def _recalcular_perfil(self):
+        """Perfil y subtotales desde cero (tras cambios masivos o cada RECALCULO_PERFIL_CADA filas)."""
+        self._perfil = np.zeros(self.resolucion, dtype=np.float64)
+        self._subtotales = {}
+        self._aportar(self._filas_en_orden(), 1)
+        self._filas_restadas = 0
+
+    def _fila_libre(self) -> int:
+        if self._libres:
+            return self._libres.pop()
+        self._asegurar_capacidad(1)
+        self._usadas += 1
+        return self._usadas - 1
+
+    def _clave_para(self, nombre):
+        """Clave de una fila nueva llamada 'nombre': el nombre si está libre; si no, una _SinClave."""
+        if _sin_nombre(nombre):
+            return _SinClave()
+        if nombre in self._posicion:
+            clave = _SinClave()
+            self._repetidas.setdefault(nombre, []).append(clave)
+            return clave
+        return nombre
+
+    def _cambiar_clave(self, anterior, nueva):
+        """Sustituye una clave conservando el orden de la vista (O(N): solo al renombrar o promover)."""
+        self._posicion = {(nueva if c is anterior or c == anterior else c): f for c, f in self._posicion.items()}
+
+    def _soltar_clave(self, clave, nombre):
+        """
+        La fila de 'clave' deja de llamarse 'nombre' (o desaparece; ya debe estar fuera de '_posicion'
+        o cambiada): si era una repetida se olvida; si tenía el nombre, la primera repetida lo hereda.
+        """
+        if isinstance(clave, _SinClave):
+            repetidas = self._repetidas.get(nombre, [])
+            if clave in repetidas:
+                repetidas.remove(clave)
+                if not repetidas:
+                    del self._repetidas[nombre]
+        elif nombre in self._repetidas:
+            heredera = self._repetidas[nombre].pop(0)
+            if not self._repetidas[nombre]:
+                del self._repetidas[nombre]
+            self._cambiar_clave(heredera, nombre)
+
+    def _agregar(self, carga, potencia: float, horario):
+        """Agrega una fila al final aunque 'carga' esté vacía o repetida (sin fusionar por nombre)."""
+        fila = self._fila_libre()
+        self._escribir_horario(np.array([fila]), np.asarray(horario, dtype=np.float32).reshape(1, -1))
+        self._potencia[fila] = potencia
+        self._nombres[fila] = carga
+        self._categorias[fila] = categoria_por_nombre([carga]).iloc[0]
+        self._posicion[self._clave_para(carga)] = fila
+        self._aportar(np.array([fila]), 1)
+        self.version += 1
+        return fila
+
+    # ---------- OPERACIONES ----------
+
+    def upsert(self, carga: str, potencia: float, horario):
+        """Agrega o reemplaza una carga (O(1) amortizado). Sin nombre, siempre se agrega una fila nueva."""
+        valida = self.validada
+        fila = None if _sin_nombre(carga) else self._posicion.pop(carga, None)
+        if fila is None:
+            fila = self._agregar(carga, potencia, horario)
+        else:
+            self._aportar(np.array([fila]), -1)
+            self._escribir_horario(np.array([fila]), np.asarray(horario, dtype=np.float32).reshape(1, -1))
+            self._potencia[fila] = potencia
+            self._posicion[carga] = fila
+            self._aportar(np.array([fila]), 1)
+            self.version += 1
+        self._avanzar_validez(valida, [fila])
+
+    def upsert_tabla(self, df: pd.DataFrame):
+        """
+        Agrega o reemplaza las filas de 'df' por 'Carga'. Dentro de 'df' no se fusiona nada: las filas
+        sin nombre y las que repiten uno anterior se agregan como filas propias (la validación las reporta).
+        Si 'df' tiene otra resolución, su horario se remuestrea a la del almacén.
+        """
+        if df.empty:
+            return
+        valida = self.validada
+        df = remuestrear_tabla(df, self.resolucion)
+        nombres = [None if _sin_nombre(n) else n for n in df["Carga"].tolist()]
+        franjas = df[self.columnas_horas]
+        if all(t == np.uint8 for t in franjas.dtypes):
+            # Tabla compacta (ingerir_por_bloques): las horas uint8 se empaquetan a bits sin pasar por float
+            horario = franjas.to_numpy(dtype=np.uint8)
+        else:
+            horario = franjas.apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float32, na_value=np.nan)
+        potencia = pd.to_numeric(df["Potencia (W)"], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+        # Las filas existentes se reutilizan; las nuevas se reservan de una vez
+        filas = np.empty(len(nombres), dtype=np.int64)
+        claves = []
+        nuevas = []
+        existentes = np.ones(len(nombres), dtype=bool)
+        vistas = set()
+        for k, carga in enumerate(nombres):
+            fila = None
+            if carga is None or carga in vistas:
+                clave = _SinClave()
+                if carga is not None:
+                    self._repetidas.setdefault(carga, []).append(clave)
+            else:
+                vistas.add(carga)
+                clave = carga
+                fila = self._posicion.pop(carga, None)
+            claves.append(clave)
+            if fila is None:
+                nuevas.append(k)
+            else:
+                filas[k] = fila
+        existentes[nuevas] = False
+        self._aportar(filas[existentes], -1)
+        reutilizadas = min(len(nuevas), len(self._libres))
+        for k in nuevas[:reutilizadas]:
+            filas[k] = self._libres.pop()
+        restantes = nuevas[reutilizadas:]
+        if restantes:
+            self._asegurar_capacidad(len(restantes))
+            filas[restantes] = np.arange(self._usadas, self._usadas + len(restantes))
+            self._usadas += len(restantes)
+
+        self._escribir_horario(filas, horario)
+        self._potencia[filas] = potencia
+        self._nombres[filas] = np.asarray(nombres, dtype=object)
+        self._categorias[filas] = categoria_por_nombre(nombres).to_numpy(dtype=object)
+        self._posicion.update(zip(claves, filas.tolist()))
+        self._aportar(filas, 1)
+        self.version += 1
+        self._avanzar_validez(valida, filas.tolist())
+
+    def eliminar(self, carga) -> bool:
+        """Elimina una carga (por nombre o por clave, ver claves; O(1)). Devuelve False si no existía."""
+        fila = self._posicion.pop(carga, None)
+        if fila is None:
+            return False
+        valida = self.validada
+        self._aportar(np.array([fila]), -1)
+        self._soltar_clave(carga, self._nombres[fila])
+        self._nombres[fila] = None
+        self._irregulares.pop(fila, None)
+        self._libres.append(fila)
+        self.version += 1
+        # Quitar una fila no invalida las demás
+        self._avanzar_validez(valida, [])
+        return True
+
+    def obtener(self, carga) -> dict:
+        """Fila de una carga (por nombre o por clave) como dict {'Carga', 'Potencia (W)', '0'..'23'}."""
+        fila = self._posicion[carga]
+        registro = {"Carga": self._nombres[fila], "Potencia (W)": float(self._potencia[fila])}
+        horario = self._irregulares.get(fila)
+        if horario is None:
+            horario = horario_bits.desempaquetar(self._bits[fila:fila + 1])[0]
+        registro.update(zip(self.columnas_horas, horario.tolist()))
+        return registro
+
+    def _renombrar(self, clave, nuevo):
+        """
+        Cambia el nombre de la fila de 'clave' sin moverla de su posición en la vista. Si 'nuevo'
+        está vacío o ya lo usa otra carga, la fila se conserva igual (no se fusiona con la otra).
+        """
+        fila = self._posicion[clave]
+        anterior = self._nombres[fila]
+        nueva_clave = self._clave_para(nuevo)
+        self._cambiar_clave(clave, nueva_clave)
+        self._soltar_clave(clave, anterior)
+        self._nombres[fila] = nuevo
+        self._categorias[fila] = categoria_por_nombre([nuevo]).iloc[0]
+
+    def claves(self, posiciones) -> list:
+        """Claves internas de las filas en 'posiciones' de la vista (para aplicar_cambios)."""
+        if self._claves is None or self._claves[0] != self.version:
+            self._claves = (self.version, list(self._posicion))
+        todas = self._claves[1]
+        return [todas[p] for p in posiciones]
+
+    def aplicar_cambios(self, claves: list, cambios: dict) -> bool:
+        """
+        Aplica el delta de st.data_editor ({'edited_rows', 'added_rows', 'deleted_rows'}, con
+        posiciones relativas a la ventana mostrada) sin reconstruir la tabla. 'claves': claves de
+        las filas de esa ventana, en orden (ver claves). Las filas editadas conservan su posición y
+        las agregadas van al final. Nada se fusiona por nombre: una fila nueva o renombrada sin
+        nombre o con un nombre ya usado se conserva, y la validación la reporta. Si la tabla estaba
+        validada, solo se revisan las filas editadas y agregadas (ver _avanzar_validez). Devuelve True si algo cambió.
+        """
+        version, valida = self.version, self.validada
+        tocadas = []
+        eliminadas = {int(k) for k in cambios.get("deleted_rows", [])}
+        for posicion, valores in cambios.get("edited_rows", {}).items():
+            posicion = int(posicion)
+            if posicion in eliminadas or posicion >= len(claves) or claves[posicion] not in self._posicion:
+                continue
+            clave = claves[posicion]
+            registro = self.obtener(clave)
+            nuevo = {**registro, **valores}
+            if nuevo == registro:
+                continue
+            fila = np.array([self._posicion[clave]])
+            self._aportar(fila, -1)
+            if not _mismo_nombre(nuevo["Carga"], registro["Carga"]):
+                self._renombrar(clave, nuevo["Carga"])
+            horario = np.array([[_numero(nuevo[h]) for h in self.columnas_horas]], dtype=np.float32)
+            self._escribir_horario(fila, horario)
+            self._potencia[fila] = _numero(nuevo["Potencia (W)"])
+            self._aportar(fila, 1)
+            self.version += 1
+            tocadas.append(int(fila[0]))
+        for posicion in sorted(eliminadas):
+            if posicion < len(claves):
+                self.eliminar(claves[posicion])
+        for valores in cambios.get("added_rows", []):
+            # Las celdas que no se llenaron quedan vacías (NaN), como en la tabla del editor
+            tocadas.append(self._agregar(
+                valores.get("Carga"),
+                _numero(valores.get("Potencia (W)")),
+                [_numero(valores.get(h)) for h in self.columnas_horas],
+            ))
+        if self.version == version:
+            return False
+        self._avanzar_validez(valida, tocadas)
+        return True
+
+    def reemplazar(self, df: pd.DataFrame):
+        """Sustituye todo el contenido por 'df' (p.ej. tras editar la tabla completa)."""
+        self._posicion.clear()
+        self._repetidas.clear()
+        self._libres.clear()
+        self._irregulares.clear()
+        self._usadas = 0
+        self._recalcular_perfil()
+        self.upsert_tabla(df)
+        self.version += 1
+
+    def cambiar_resolucion(self, resolucion: int):
+        """Remuestrea todos los horarios a 'resolucion' franjas por día (ver remuestrear_horario)."""
+        if resolucion == self.resolucion:
+            return
+        usadas = np.arange(self._usadas)
+        horario = horario_bits.desempaquetar(self._bits[usadas], dtype=np.float32)
+        for fila, valores in self._irregulares.items():
+            horario[fila] = valores
+        valida = self.validada
+        self.resolucion = resolucion
+        self.columnas_horas = columnas_franjas(resolucion)
+        self._bits = np.zeros(len(self._potencia), dtype=horario_bits.dtype_mascara(resolucion))
+        self._irregulares = {}
+        self._escribir_horario(usadas, remuestrear_horario(horario, resolucion).astype(np.float32))
+        self._recalcular_perfil()
+        self.version += 1
+        # Remuestrear horas 0/1 da horas 0/1: una tabla válida lo sigue siendo
+        self._avanzar_validez(valida, [])
+
+    # ---------- VISTAS ----------
+
+    def _filas_en_orden(self) -> np.ndarray:
+        return np.fromiter(self._posicion.values(), dtype=np.int64, count=len(self._posicion))
+
+    def _horario_en_orden(self, filas: np.ndarray) -> np.ndarray:
+        """Matriz N×n (uint8, o float32 si hay filas irregulares) en el orden de 'filas'."""
+        horario = horario_bits.desempaquetar(self._bits[filas])
+        if self._irregulares:
+            posiciones = np.flatnonzero(np.isin(filas, np.fromiter(self._irregulares, dtype=np.int64)))
+            if posiciones.size:
+                horario = horario.astype(np.float32)
+                for k in posiciones.tolist():
+                    horario[k] = self._irregulares[int(filas[k])]
+        return horario
+
+    @property
+    def tiene_irregulares(self) -> bool:
+        """True si alguna carga tiene horas distintas de 0/1 (la tabla aún no es válida)."""
+        return bool(self._irregulares)
+
+    def perfil_horario(self) -> np.ndarray:
+        """Potencia total por franja (W) en O(n): la suma que mantienen upsert, edición y eliminación."""
+        if self._filas_restadas > RECALCULO_PERFIL_CADA:
+            self._recalcular_perfil()
+        return np.round(self._perfil, DECIMALES_PERFIL)
+
+    def subtotales_categoria(self) -> pd.DataFrame:
+        """Potencia por franja de cada categoría (filas) con su número de cargas en la columna 'Cargas'."""
+        if self._filas_restadas > RECALCULO_PERFIL_CADA:
+            self._recalcular_perfil()
+        categorias = list(self._subtotales)
+        tabla = pd.DataFrame(
+            np.round([self._subtotales[c][0] for c in categorias], DECIMALES_PERFIL).reshape(len(categorias), -1),
+            index=pd.Index(categorias, name="Categoría"), columns=self.columnas_horas,
+        )
+        tabla.insert(0, "Cargas", [self._subtotales[c][1] for c in categorias])
+        return tabla
+
+    def mascaras(self):
+        """(máscaras N, potencia N) en el orden de la vista; forma compacta para el motor."""
+        filas = self._filas_en_orden()
+        return self._bits[filas], self._potencia[filas]
+
+    def matrices(self):
+        """(horario N×n float64, potencia N) en el orden de la vista, para el motor de cálculo."""
+        filas = self._filas_en_orden()
+        return self._horario_en_orden(filas).astype(np.float64), self._potencia[filas]
+
+    def compacto(self):
+        """
+        (nombres, potencia, máscaras, {posición: horario float32} de las filas irregulares) en el orden
+        de la vista: la forma en que se guarda un proyecto (ver proyectos.py), sin desempaquetar horarios.
+        """
+        filas = self._filas_en_orden()
+        irregulares = {}
+        if self._irregulares:
+            posicion = {fila: k for k, fila in enumerate(filas.tolist())}
+            irregulares = {posicion[f]: horario for f, horario in self._irregulares.items() if f in posicion}
+        return self._nombres[filas], self._potencia[filas], self._bits[filas], irregulares
+
+    def nombres(self) -> np.ndarray:
+        """Nombres de las cargas en el orden de la vista (sin materializar la tabla)."""
+        return self._nombres[self._filas_en_orden()]
+
+    def _tabla(self, filas: np.ndarray, items: np.ndarray) -> pd.DataFrame:
+        # uint8 si todas las horas son 0/1; float32 (con NaN / valores originales) si hay filas irregulares,
+        # en toda la tabla para que cada ventana del editor tenga los mismos tipos
+        horario = self._horario_en_orden(filas)
+        if self._irregulares:
+            horario = horario.astype(np.float32, copy=False)
+        datos = {
+            "Item": pd.array(items, dtype="Int64"),
+            "Carga": self._nombres[filas],
+            "Potencia (W)": self._potencia[filas],
+        }
+        datos.update({h: horario[:, j] for j, h in enumerate(self.columnas_horas)})
+        return pd.DataFrame(datos, columns=columnas_tabla(self.resolucion))
+
+    def vista(self, posiciones) -> pd.DataFrame:
+        """Filas 'posiciones' de la vista (p.ej. una página del editor) con su 'Item', sin materializar las demás."""
+        posiciones = np.asarray(posiciones, dtype=np.int64)
+        return self._tabla(self._filas_en_orden()[posiciones], posiciones + 1)
+
+    def a_dataframe(self) -> pd.DataFrame:
+        """Vista completa (Item, Carga, Potencia (W), franjas), construida al pedirla (descargas, validación)."""
+        filas = self._filas_en_orden()
+        return self._tabla(filas, np.arange(1, len(filas) + 1))
+
+    @classmethod
+    def desde_compacto(cls, nombres, potencia, mascaras, irregulares: dict = None,
+                       resolucion: int = RESOLUCION_BASE) -> "AlmacenCargas":
+        """
+        Almacén con filas ya compactas (ver compacto), sin pasar por la matriz N×n. Las filas de
+        'irregulares' toman ese horario en vez de su máscara; los nombres vacíos o repetidos se
+        conservan con clave interna, como en upsert_tabla.
+        """
+        n = len(nombres)
+        almacen = cls(capacidad=max(n, CAPACIDAD_INICIAL), resolucion=resolucion)
+        almacen._bits[:n] = mascaras
+        almacen._potencia[:n] = potencia
+        almacen._nombres[:n] = [None if _sin_nombre(nombre) else nombre for nombre in nombres]
+        almacen._categorias[:n] = categoria_por_nombre(almacen._nombres[:n]).to_numpy(dtype=object)
+        almacen._usadas = n
+        for fila, horario in (irregulares or {}).items():
+            almacen._bits[fila] = np.zeros(1, dtype=almacen._bits.dtype)[0]
+            almacen._irregulares[int(fila)] = np.asarray(horario, dtype=np.float32)
+        for fila, nombre in enumerate(almacen._nombres[:n].tolist()):
+            almacen._posicion[almacen._clave_para(nombre)] = fila
+        almacen._recalcular_perfil()
+        almacen.version += 1
+        return almacen
+
+    @classmethod
+    def desde_dataframe(cls, df: pd.DataFrame, resolucion: int = None) -> "AlmacenCargas":
+        """Almacén con el contenido de 'df' (con su misma resolución, salvo que se indique otra)."""
+        resolucion = resolucion or detectar_resolucion(df.columns)
+        almacen = cls(capacidad=max(len(df), CAPACIDAD_INICIAL), resolucion=resolucion)
+        almacen.upsert_tabla(df.reindex(columns=columnas_tabla(detectar_resolucion(df.columns), item=False)))
+        return almacen
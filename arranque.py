@@ -0,0 +1,89 @@
+# arranque.py
+# -*- coding: utf-8 -*-
+"""
+Medición y optimización del arranque en frío.
+
+La aplicación importa los módulos pesados (altair, los mapas de calor,
+matplotlib/fpdf2) solo cuando la pestaña 2 tiene datos que mostrar; aquí se
+registra cuánto cuesta cada etapa la primera vez en el proceso (importaciones,
+primer render) para vigilar la latencia de los contenedores recién creados.
+
+Variables de entorno:
+- CUADRO_CARGA_TIEMPOS=1: muestra los tiempos en la barra lateral y los escribe en stderr.
+- CUADRO_CARGA_PRECARGA=1: importa los módulos pesados en un hilo en segundo plano
+  tras el primer render, para que la pestaña 2 ya los encuentre cargados.
+"""
+import importlib
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Se importa antes que nada en LDC_main.py: referencia para "desde el inicio"
+INICIO = time.perf_counter()
+
+MOSTRAR_TIEMPOS = os.environ.get("CUADRO_CARGA_TIEMPOS", "") not in ("", "0")
+PRECARGA = os.environ.get("CUADRO_CARGA_PRECARGA", "") not in ("", "0")
+MODULOS_PESADOS = (
+    "altair",
+    "streamlit.components.v1",
+    "cache_graficos",
+    "accesibilidad_heatmaps",
+    "graficos_raster",
+    "informe_pdf",
+    "matplotlib.figure",
+    "fpdf",
+)
+
+_TIEMPOS = {}
+_LOCK = threading.Lock()
+
+
+def registrar(etapa: str, segundos: float):
+    """Guarda la duración de 'etapa' solo la primera vez en el proceso (la que paga el arranque en frío)."""
+    with _LOCK:
+        if etapa in _TIEMPOS:
+            return
+        _TIEMPOS[etapa] = segundos
+    if MOSTRAR_TIEMPOS:
+        print(f"[arranque] {etapa}: {segundos:.3f} s", file=sys.stderr)
+
+
+def desde_inicio(etapa: str):
+    """Registra el tiempo transcurrido desde la importación de este módulo."""
+    registrar(etapa, time.perf_counter() - INICIO)
+
+
+@contextmanager
+def medir(etapa: str):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registrar(etapa, time.perf_counter() - inicio)
+
+
+def importar(nombre: str):
+    """importlib.import_module registrando el tiempo de la primera importación."""
+    if nombre in sys.modules:
+        return sys.modules[nombre]
+    with medir(f"import {nombre}"):
+        return importlib.import_module(nombre)
+
+
+def precargar(modulos=MODULOS_PESADOS) -> threading.Thread:
+    """Importa 'modulos' en un hilo daemon (el lock de importación de Python evita cargas dobles)."""
+    def _precargar():
+        for nombre in modulos:
+            importar(nombre)
+
+    hilo = threading.Thread(target=_precargar, name="precarga-modulos", daemon=True)
+    hilo.start()
+    return hilo
+
+
+def tiempos() -> dict:
+    """{etapa: segundos} registrados hasta ahora en el proceso."""
+    with _LOCK:
+        return dict(_TIEMPOS)
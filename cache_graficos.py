@@ -0,0 +1,41 @@
+# cache_graficos.py
+# -*- coding: utf-8 -*-
+"""
+Caché de especificaciones Vega-Lite de los gráficos.
+
+Lo caro de un gráfico Altair no es armar el objeto sino 'to_dict()'
+(validación del esquema y conversión de los datos a JSON), que
+st.altair_chart repite en cada rerun. Aquí se guarda la especificación ya
+terminada, con clave = huella de los datos, la paleta, el tamaño y demás
+parámetros que afecten al gráfico, y se entrega tal cual a st.vega_lite_chart.
+"""
+import streamlit as st
+
+from cache_resultados import CacheResultados, huella
+
+MAX_GRAFICOS = 128
+
+# Compartida por todas las sesiones del proceso (los gráficos iguales se reutilizan entre usuarios)
+_ESPECIFICACIONES = CacheResultados(max_elementos=MAX_GRAFICOS)
+
+
+def especificacion(grafico, *claves) -> dict:
+    """
+    Especificación Vega-Lite de 'grafico' (objeto Altair, o función que lo construye y
+    que solo se llama si la especificación no está en caché).
+    'claves': todo lo que determina el gráfico (nombre, datos, paleta, tamaño, títulos variables...).
+    """
+    def _construir():
+        return (grafico if hasattr(grafico, "to_dict") else grafico()).to_dict()
+
+    return _ESPECIFICACIONES.obtener_o_calcular(huella("grafico", *claves), _construir)
+
+
+def mostrar_grafico(grafico, *claves, use_container_width: bool = True):
+    """Como st.altair_chart, pero reutilizando la especificación si las claves no cambiaron."""
+    st.vega_lite_chart(especificacion(grafico, *claves), use_container_width=use_container_width)
+
+
+def estadisticas() -> dict:
+    """Aciertos, fallos y tamaño de la caché de gráficos (diagnóstico)."""
+    return {"aciertos": _ESPECIFICACIONES.aciertos, "fallos": _ESPECIFICACIONES.fallos, "graficos": len(_ESPECIFICACIONES)}
@@ -0,0 +1,158 @@
+# cache_resultados.py
+# -*- coding: utf-8 -*-
+"""
+Caché de resultados direccionada por contenido.
+
+La clave es una huella estable (SHA-256) de los datos validados y de los
+parámetros de segmentación y multiplicadores, por lo que dos sesiones que
+suben la misma tabla comparten resultados. Se mantiene en memoria con
+desalojo LRU y, opcionalmente, se persiste en un directorio local para
+sobrevivir a reinicios del servidor.
+"""
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Incrementar si cambia el formato de los resultados guardados en disco
+VERSION_CACHE = 1
+
+
+# ---------- HUELLAS ----------
+
+def _actualizar_hash(h, valor):
+    """Alimenta el hash con una representación estable de 'valor'."""
+    if isinstance(valor, pd.DataFrame):
+        h.update(b"DF")
+        h.update(json.dumps([str(c) for c in valor.columns]).encode("utf-8"))
+        h.update(json.dumps([str(t) for t in valor.dtypes]).encode("utf-8"))
+        h.update(pd.util.hash_pandas_object(valor, index=False).to_numpy().tobytes())
+    elif isinstance(valor, pd.Series):
+        h.update(b"SR")
+        h.update(str(valor.name).encode("utf-8"))
+        h.update(pd.util.hash_pandas_object(valor, index=True).to_numpy().tobytes())
+    elif isinstance(valor, np.ndarray):
+        h.update(b"ND")
+        h.update(str(valor.dtype).encode("utf-8"))
+        h.update(str(valor.shape).encode("utf-8"))
+        h.update(np.ascontiguousarray(valor).tobytes())
+    elif isinstance(valor, dict):
+        h.update(b"DC")
+        for k in sorted(valor, key=str):
+            _actualizar_hash(h, str(k))
+            _actualizar_hash(h, valor[k])
+    elif isinstance(valor, (list, tuple)):
+        h.update(b"LS")
+        for v in valor:
+            _actualizar_hash(h, v)
+    else:
+        h.update(type(valor).__name__.encode("utf-8"))
+        h.update(repr(valor).encode("utf-8"))
+
+
+def huella(*valores) -> str:
+    """Huella hexadecimal estable de uno o varios valores (DataFrame, arrays, dicts, escalares)."""
+    h = hashlib.sha256(f"v{VERSION_CACHE}".encode("utf-8"))
+    for valor in valores:
+        _actualizar_hash(h, valor)
+    return h.hexdigest()
+
+
+# ---------- CACHÉ ----------
+
+class CacheResultados:
+    """
+    Caché LRU en memoria con volcado opcional a disco.
+    - 'max_elementos': número máximo de resultados en memoria.
+    - 'directorio': si se indica, cada resultado se guarda también como <clave>.pkl
+      y se recupera de ahí tras un reinicio o un desalojo.
+    Es segura para varios hilos (Streamlit atiende cada sesión en un hilo).
+    """
+
+    def __init__(self, max_elementos: int = 256, directorio: str = None):
+        self.max_elementos = max_elementos
+        self.directorio = directorio
+        self._memoria = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+    def _ruta(self, clave: str) -> str:
+        return os.path.join(self.directorio, f"{clave}.pkl")
+
+    def __contains__(self, clave: str) -> bool:
+        with self._lock:
+            if clave in self._memoria:
+                return True
+        return bool(self.directorio) and os.path.exists(self._ruta(clave))
+
+    def __len__(self) -> int:
+        return len(self._memoria)
+
+    def obtener(self, clave: str, defecto=None):
+        with self._lock:
+            if clave in self._memoria:
+                self._memoria.move_to_end(clave)
+                self.aciertos += 1
+                return self._memoria[clave]
+
+        if self.directorio:
+            try:
+                with open(self._ruta(clave), "rb") as f:
+                    valor = pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError):
+                pass
+            else:
+                self._en_memoria(clave, valor)
+                with self._lock:
+                    self.aciertos += 1
+                return valor
+
+        with self._lock:
+            self.fallos += 1
+        return defecto
+
+    def guardar(self, clave: str, valor):
+        self._en_memoria(clave, valor)
+        if self.directorio:
+            # Escritura atómica: archivo temporal + os.replace
+            fd, tmp = tempfile.mkstemp(dir=self.directorio, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    pickle.dump(valor, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp, self._ruta(clave))
+            except OSError:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+
+    def _en_memoria(self, clave: str, valor):
+        with self._lock:
+            self._memoria[clave] = valor
+            self._memoria.move_to_end(clave)
+            while len(self._memoria) > self.max_elementos:
+                self._memoria.popitem(last=False)
+
+    def obtener_o_calcular(self, clave: str, funcion):
+        """Devuelve el valor en caché o lo calcula con 'funcion()' y lo guarda."""
+        centinela = object()
+        valor = self.obtener(clave, centinela)
+        if valor is centinela:
+            valor = funcion()
+            self.guardar(clave, valor)
+        return valor
+
+    def limpiar(self, disco: bool = False):
+        with self._lock:
+            self._memoria.clear()
+        if disco and self.directorio:
+            for nombre in os.listdir(self.directorio):
+                if nombre.endswith(".pkl"):
+                    os.remove(os.path.join(self.directorio, nombre))
@@ -0,0 +1,101 @@
+# constructor_ldc.py
+# -*- coding: utf-8 -*-
+"""
+Construcción escalable del cuadro de carga (LDC).
+
+Para perfiles largos (8760 h o más por sitio) no hace falta ordenar todo ni
+graficar cada punto. El constructor ofrece tres métodos:
+- 'completo': orden total (exacto, O(n log n)).
+- 'top_k': solo las K horas de mayor demanda se ordenan (np.argpartition,
+  O(n + K log K)); el resto de la curva sale de un histograma.
+- 'histograma': histograma de bins fijos (O(n), sin ordenar); la curva es
+  exacta en los bordes de los bins y el error es como mucho un bin.
+Pico, mínimo, media, energía y percentiles son siempre exactos (O(n)), y la
+curva se entrega ya reducida a unos cientos de puntos para el gráfico.
+"""
+import numpy as np
+import pandas as pd
+
+METODOS = ("auto", "completo", "top_k", "histograma")
+# Por encima de este número de valores, 'auto' usa el histograma en vez del orden total
+UMBRAL_AUTO = 200_000
+PUNTOS_GRAFICO = 500
+BINS = 1024
+FRACCION_TOP_K = 0.1
+PERCENTILES = (50, 90, 95, 99)
+
+
+def _indices_muestreo(n: int, puntos: int) -> np.ndarray:
+    """Índices a conservar de una curva de n puntos: uniformes + logarítmicos (más detalle en el pico)."""
+    if n <= puntos:
+        return np.arange(n)
+    uniformes = np.linspace(0, n - 1, puntos - puntos // 4)
+    cabeza = np.geomspace(1, n, puntos // 4) - 1
+    return np.unique(np.concatenate([uniformes, cabeza, [0, n - 1]]).astype(np.int64))
+
+
+def _curva(potencias: np.ndarray, duraciones: np.ndarray, puntos: int) -> pd.DataFrame:
+    idx = _indices_muestreo(len(potencias), puntos)
+    return pd.DataFrame({"Potencia Total (W)": potencias[idx], "Duración (horas)": duraciones[idx]})
+
+
+def _curva_histograma(valores: np.ndarray, paso_horas, bins: int, horas_previas=0.0):
+    """(potencias, duraciones) desde un histograma: para cada borde, horas con demanda ≥ borde."""
+    if valores.size == 0:
+        return np.empty(0), np.empty(0)
+    conteos, bordes = np.histogram(valores, bins=bins, range=(float(valores.min()), float(valores.max())))
+    # De mayor a menor: al cerrar el bin j se acumulan las horas con demanda ≥ bordes[j]
+    duraciones = horas_previas + np.cumsum(conteos[::-1]) * paso_horas
+    return bordes[:-1][::-1], duraciones
+
+
+def construir_ldc(
+    valores,
+    paso_horas=1,
+    metodo: str = "auto",
+    k: int = None,
+    bins: int = BINS,
+    puntos: int = PUNTOS_GRAFICO,
+    percentiles=PERCENTILES,
+) -> dict:
+    """
+    LDC de 'valores' (W), cada uno de 'paso_horas' horas de duración.
+    Devuelve {"metodo", "n", "exacta", "pico_w", "minimo_w", "media_w", "energia_kwh",
+    "horas_totales", "percentiles": {p: W}, "curva": DataFrame reducido para el gráfico}.
+    """
+    if metodo not in METODOS:
+        raise ValueError(f"Método de LDC desconocido: '{metodo}' (use {', '.join(METODOS)}).")
+    valores = np.asarray(valores, dtype=np.float64).reshape(-1)
+    n = valores.size
+    if metodo == "auto":
+        metodo = "completo" if n <= UMBRAL_AUTO else "histograma"
+
+    if metodo == "completo" or n == 0:
+        ordenado = np.sort(valores)[::-1]
+        potencias, duraciones = ordenado, np.arange(1, n + 1) * paso_horas
+    elif metodo == "top_k":
+        k = min(n, max(1, int(k or np.ceil(n * FRACCION_TOP_K))))
+        particion = np.argpartition(valores, n - k)
+        cabeza = np.sort(valores[particion[n - k:]])[::-1]
+        cola_potencias, cola_duraciones = _curva_histograma(valores[particion[: n - k]], paso_horas, bins, k * paso_horas)
+        potencias = np.concatenate([cabeza, cola_potencias])
+        duraciones = np.concatenate([np.arange(1, k + 1) * paso_horas, cola_duraciones])
+    else:
+        potencias, duraciones = _curva_histograma(valores, paso_horas, bins)
+        potencias = np.concatenate([[valores.max()], potencias])
+        duraciones = np.concatenate([[paso_horas], duraciones])
+
+    media = float(valores.mean()) if n else 0.0
+    return {
+        "metodo": metodo,
+        "n": n,
+        "exacta": metodo == "completo" or (metodo == "top_k" and k == n),
+        "pico_w": float(valores.max()) if n else 0.0,
+        "minimo_w": float(valores.min()) if n else 0.0,
+        "media_w": media,
+        "energia_kwh": float(valores.sum()) * paso_horas / 1000.0,
+        "horas_totales": n * paso_horas,
+        # np.percentile usa selección parcial (O(n)): valores exactos sin ordenar todo
+        "percentiles": dict(zip(percentiles, np.percentile(valores, percentiles).tolist())) if n else {},
+        "curva": _curva(potencias, duraciones, puntos),
+    }
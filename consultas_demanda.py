@@ -0,0 +1,97 @@
+# consultas_demanda.py
+# -*- coding: utf-8 -*-
+"""
+Consultas de umbral sobre el cuadro de carga (LDC).
+
+La demanda se ordena una sola vez y se guardan sus sumas acumuladas de
+energía; con eso, "¿cuántas horas se supera X?", "¿cuál es el P95?" o
+"¿cuánta energía queda por encima de un tope?" son búsquedas binarias
+(O(log n)) que aceptan vectores completos de umbrales.
+"""
+import numpy as np
+import pandas as pd
+
+
+class IndiceDemanda:
+    """
+    Índice sobre un perfil de demanda (W) con valores de 'paso_horas' horas cada uno.
+    - 'horas_sobre(umbrales)': horas con demanda estrictamente mayor que cada umbral.
+    - 'percentiles(p)': demanda del percentil p (0..100, misma interpolación lineal que np.percentile).
+    - 'energia_sobre(umbrales)': energía (kWh) por encima de cada tope, Σ max(demanda − tope, 0) · paso.
+    - 'consultar(umbrales)': las tres magnitudes juntas como tabla.
+    """
+
+    def __init__(self, valores, paso_horas=1):
+        self._ordenado = np.sort(np.asarray(valores, dtype=np.float64).reshape(-1))
+        # _acumulada[i] = suma de los i valores más pequeños
+        self._acumulada = np.concatenate([[0.0], np.cumsum(self._ordenado)])
+        self.paso_horas = paso_horas
+
+    def __len__(self) -> int:
+        return len(self._ordenado)
+
+    def __eq__(self, otro) -> bool:
+        return (
+            isinstance(otro, IndiceDemanda)
+            and self.paso_horas == otro.paso_horas
+            and np.array_equal(self._ordenado, otro._ordenado)
+        )
+
+    __hash__ = None
+
+    @property
+    def horas_totales(self):
+        return len(self._ordenado) * self.paso_horas
+
+    @property
+    def energia_total_kwh(self) -> float:
+        return float(self._acumulada[-1]) * self.paso_horas / 1000.0
+
+    def _sobre(self, umbrales: np.ndarray) -> np.ndarray:
+        """Posición del primer valor > umbral (los valores por encima son _ordenado[pos:])."""
+        return np.searchsorted(self._ordenado, umbrales, side="right")
+
+    def horas_sobre(self, umbrales) -> np.ndarray:
+        umbrales = np.asarray(umbrales, dtype=np.float64)
+        return (len(self._ordenado) - self._sobre(umbrales)) * self.paso_horas
+
+    def energia_sobre(self, umbrales) -> np.ndarray:
+        umbrales = np.asarray(umbrales, dtype=np.float64)
+        posicion = self._sobre(umbrales)
+        encima = self._acumulada[-1] - self._acumulada[posicion]
+        return (encima - (len(self._ordenado) - posicion) * umbrales) * self.paso_horas / 1000.0
+
+    def percentiles(self, p) -> np.ndarray:
+        p = np.asarray(p, dtype=np.float64)
+        if not len(self._ordenado):
+            return np.full(p.shape, np.nan)
+        if ((p < 0) | (p > 100)).any():
+            raise ValueError("Los percentiles deben estar entre 0 y 100.")
+        # Acceso directo al arreglo ordenado: O(1) por percentil
+        posicion = p / 100.0 * (len(self._ordenado) - 1)
+        abajo = np.floor(posicion).astype(np.int64)
+        arriba = np.minimum(abajo + 1, len(self._ordenado) - 1)
+        fraccion = posicion - abajo
+        return self._ordenado[abajo] * (1 - fraccion) + self._ordenado[arriba] * fraccion
+
+    def consultar(self, umbrales) -> pd.DataFrame:
+        """Tabla con horas y energía por encima de cada umbral (W)."""
+        umbrales = np.atleast_1d(np.asarray(umbrales, dtype=np.float64))
+        horas = self.horas_sobre(umbrales)
+        energia = self.energia_sobre(umbrales)
+        total_horas, total_energia = self.horas_totales, self.energia_total_kwh
+        return pd.DataFrame({
+            "Umbral (W)": umbrales,
+            "Horas sobre el umbral": horas,
+            "% del tiempo": horas / total_horas * 100 if total_horas else 0.0,
+            "Energía sobre el umbral (kWh)": energia,
+            "% de la energía": energia / total_energia * 100 if total_energia > 0 else 0.0,
+        })
+
+
+def parsear_valores(texto: str):
+    """Números separados por comas, punto y coma o saltos de línea. Devuelve (valores, entradas no reconocidas)."""
+    entradas = [e.strip() for e in (texto or "").replace(";", ",").replace("\n", ",").split(",") if e.strip()]
+    numeros = pd.to_numeric(pd.Series(entradas, dtype=object), errors="coerce")
+    invalidas = [e for e, v in zip(entradas, numeros) if pd.isna(v)]
+    return numeros.dropna().to_numpy(dtype=np.float64), invalidas
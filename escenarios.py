@@ -0,0 +1,113 @@
+# escenarios.py
+# -*- coding: utf-8 -*-
+"""
+Barrido de escenarios de ajuste estacional.
+
+Cada escenario es un juego de 12 multiplicadores mensuales y, opcionalmente,
+su propia ventana diurna y sus días por mes. Como el perfil ajustado es el
+perfil base escalado, todos los escenarios se evalúan en una sola pasada
+NumPy (matrices S×12) sobre la tabla de segmentos del perfil base
+(ver tabla_segmentos.py), sin recalcular nada por escenario.
+"""
+import numpy as np
+import pandas as pd
+
+from motor_calculo import DIAS_POR_MES, ORDEN_MESES
+
+# Variación por defecto de los escenarios generados alrededor de los multiplicadores actuales
+VARIACION_ESCENARIOS = 0.1
+COLUMNAS_VENTANA = ["Inicio diurno", "Fin diurno"]
+
+
+def generar_escenarios(multiplicadores: dict, cantidad: int, variacion: float = VARIACION_ESCENARIOS, semilla: int = 0) -> pd.DataFrame:
+    """
+    Escenarios de sensibilidad: los multiplicadores actuales × un factor uniforme en
+    [1 − variacion, 1 + variacion] por mes y escenario. El primer escenario es el actual.
+    """
+    base = np.array([multiplicadores.get(mes, 1.0) for mes in ORDEN_MESES], dtype=np.float64)
+    rng = np.random.default_rng(semilla)
+    factores = rng.uniform(1 - variacion, 1 + variacion, size=(cantidad, len(ORDEN_MESES)))
+    factores[0] = 1.0
+    df = pd.DataFrame(base * factores, columns=ORDEN_MESES)
+    df.insert(0, "Escenario", [f"E{k + 1}" for k in range(cantidad)])
+    return df
+
+
+def leer_escenarios(df: pd.DataFrame) -> dict:
+    """
+    Tabla de escenarios (una fila por escenario, columnas 'Enero'..'Diciembre' y,
+    opcionalmente, 'Escenario', 'Inicio diurno' y 'Fin diurno') → entradas del barrido.
+    """
+    faltantes = [mes for mes in ORDEN_MESES if mes not in df.columns]
+    if faltantes:
+        raise ValueError(f"Faltan columnas de meses en la tabla de escenarios: {', '.join(faltantes)}.")
+    multiplicadores = df[ORDEN_MESES].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+    if np.isnan(multiplicadores).any() or (multiplicadores < 0).any():
+        raise ValueError("Los multiplicadores deben ser números no negativos.")
+    nombres = df["Escenario"].astype(str).tolist() if "Escenario" in df.columns else None
+    ventanas = None
+    if all(c in df.columns for c in COLUMNAS_VENTANA):
+        ventanas = df[COLUMNAS_VENTANA].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+        if np.isnan(ventanas).any() or (ventanas < 0).any() or (ventanas > 24).any():
+            raise ValueError("'Inicio diurno' y 'Fin diurno' deben ser horas entre 0 y 24.")
+    return {"multiplicadores": multiplicadores, "ventanas": ventanas, "nombres": nombres}
+
+
+def barrido_escenarios(tabla, multiplicadores, ventanas=None, dias_por_mes=None, nombres=None) -> dict:
+    """
+    Evalúa S escenarios sobre el perfil base de 'tabla' (TablaSegmentos).
+    'multiplicadores': matriz S×12; 'ventanas': S×2 (inicio, fin en horas) o un par para todos;
+    'dias_por_mes': dict, vector de 12 o matriz S×12 (por defecto, DIAS_POR_MES).
+    Devuelve {"resumen": una fila por escenario, "mensual": tabla larga Escenario × Mes}.
+    """
+    multiplicadores = np.atleast_2d(np.asarray(multiplicadores, dtype=np.float64))
+    s = len(multiplicadores)
+    if dias_por_mes is None:
+        dias_por_mes = DIAS_POR_MES
+    if isinstance(dias_por_mes, dict):
+        dias_por_mes = [dias_por_mes[mes] for mes in ORDEN_MESES]
+    dias = np.broadcast_to(np.asarray(dias_por_mes, dtype=np.float64), multiplicadores.shape)
+    ventanas = np.broadcast_to(np.asarray((6, 18) if ventanas is None else ventanas, dtype=np.float64), (s, 2))
+    nombres = nombres if nombres is not None else [f"E{k + 1}" for k in range(s)]
+
+    # Energía diaria del perfil base: total y de cada ventana diurna (consultas O(1) vectorizadas)
+    inicio, longitud = tabla.ventana(ventanas[:, 0], ventanas[:, 1])
+    dia = tabla.resumen(inicio, longitud)
+    noche = tabla.resumen(*tabla.complemento(inicio, longitud))
+    energia_dia = float(tabla.energia(0, tabla.n))
+    pico_base = float(tabla.perfil.max())
+
+    # Una pasada S×12 para todos los escenarios
+    peso = multiplicadores * dias
+    energia_mensual = peso * energia_dia
+    energia_anual = energia_mensual.sum(axis=1)
+    pico_mensual = multiplicadores * pico_base
+    mes_pico = np.argmax(pico_mensual, axis=1)
+    pico_anual = pico_mensual[np.arange(s), mes_pico]
+    horas_anio = dias.sum(axis=1) * 24
+    with np.errstate(divide="ignore", invalid="ignore"):
+        media_anual = np.where(horas_anio > 0, energia_anual * 1000 / horas_anio, 0.0)
+        factor_anual = np.where(pico_anual > 0, media_anual / pico_anual * 100, 0.0)
+
+    resumen = pd.DataFrame({
+        "Escenario": nombres,
+        "Inicio diurno": ventanas[:, 0],
+        "Fin diurno": ventanas[:, 1],
+        "Energía anual (kWh)": energia_anual,
+        "Energía diurna (kWh)": peso.sum(axis=1) * dia["energia_kwh"],
+        "Energía nocturna (kWh)": peso.sum(axis=1) * noche["energia_kwh"],
+        "Pico anual ajustado (W)": pico_anual,
+        "Mes del pico": np.asarray(ORDEN_MESES, dtype=object)[mes_pico],
+        "Potencia media anual (W)": media_anual,
+        "Factor de carga anual (%)": factor_anual,
+        "Factor de carga diurno (%)": dia["factor_carga"],
+        "Factor de carga nocturno (%)": noche["factor_carga"],
+    })
+    mensual = pd.DataFrame({
+        "Escenario": np.repeat(np.asarray(nombres, dtype=object), len(ORDEN_MESES)),
+        "Mes": pd.Categorical(np.tile(ORDEN_MESES, s), categories=ORDEN_MESES, ordered=True),
+        "Multiplicador": multiplicadores.reshape(-1),
+        "Energía (kWh)": energia_mensual.reshape(-1),
+        "Pico ajustado (W)": pico_mensual.reshape(-1),
+    })
+    return {"resumen": resumen, "mensual": mensual}
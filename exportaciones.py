@@ -0,0 +1,145 @@
+# exportaciones.py
+# -*- coding: utf-8 -*-
+"""
+Exportaciones (CSV/XLSX/Parquet/Arrow) bajo demanda y memoizadas.
+
+Serializar una tabla a Excel con openpyxl es de lo más lento de un rerun, y
+antes se hacía para todos los botones de descarga aunque nadie los pulsara.
+Aquí cada botón recibe un proveedor diferido (st.download_button acepta una
+función en 'data') que solo serializa al pulsarlo, y los bytes se guardan en
+caché por huella de los datos y formato: la segunda descarga de la misma
+tabla, en cualquier sesión, no vuelve a serializar.
+
+El informe completo (cargas, perfil horario, LDC, proyección mensual y
+métricas en un solo libro) se escribe con xlsxwriter en modo
+'constant_memory'; Parquet y Arrow IPC (vía pyarrow, dependencia de
+Streamlit) sirven para llevar las tablas grandes a otras herramientas.
+"""
+import io
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from cache_resultados import CacheResultados, huella
+
+MAX_EXPORTACIONES = 16
+FILAS_POR_BLOQUE = 10_000
+ANCHO_MINIMO_COLUMNA = 10
+
+MIME = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file",
+}
+
+_EXPORTACIONES = CacheResultados(max_elementos=MAX_EXPORTACIONES)
+
+
+def a_csv(df: pd.DataFrame) -> bytes:
+    return df.to_csv(index=False).encode("utf-8")
+
+
+def a_excel(df: pd.DataFrame) -> bytes:
+    output = io.BytesIO()
+    df.to_excel(output, index=False)
+    return output.getvalue()
+
+
+def a_parquet(df: pd.DataFrame) -> bytes:
+    output = io.BytesIO()
+    df.to_parquet(output, index=False)
+    return output.getvalue()
+
+
+def a_arrow(df: pd.DataFrame) -> bytes:
+    """Formato de archivo Arrow IPC (Feather v2)."""
+    output = io.BytesIO()
+    df.reset_index(drop=True).to_feather(output)
+    return output.getvalue()
+
+
+SERIALIZADORES = {"csv": a_csv, "xlsx": a_excel, "parquet": a_parquet, "arrow": a_arrow}
+
+
+@lru_cache(maxsize=8)
+def plantilla(texto: str, formato: str = "csv") -> bytes:
+    """Plantilla CSV de texto fijo en 'formato': se genera una sola vez por proceso (al primer clic)."""
+    if formato == "csv":
+        return texto.encode("utf-8")
+    return SERIALIZADORES[formato](pd.read_csv(io.StringIO(texto)))
+
+
+def exportar(datos, formato: str = "csv", *args) -> bytes:
+    """
+    Bytes de 'datos' en 'formato' ('csv' o 'xlsx'), memoizados.
+    'datos': un DataFrame, o una función con nombre que lo construye a partir de 'args'
+    (la huella usa entonces el nombre y los argumentos, sin construir la tabla).
+    """
+    serializar = SERIALIZADORES[formato]
+    if callable(datos):
+        clave = huella("exportacion", formato, datos.__module__, datos.__qualname__, *args)
+        return _EXPORTACIONES.obtener_o_calcular(clave, lambda: serializar(datos(*args)))
+    return _EXPORTACIONES.obtener_o_calcular(huella("exportacion", formato, datos), lambda: serializar(datos))
+
+
+def diferida(datos, formato: str = "csv", *args):
+    """Proveedor sin argumentos para st.download_button(data=...): serializa solo al pulsar el botón."""
+    return lambda: exportar(datos, formato, *args)
+
+
+def diferida_tabla(construir, formato: str = "csv"):
+    """Como diferida, pero la tabla la construye 'construir()' al pulsar: no hace falta tenerla materializada."""
+    return lambda: exportar(construir(), formato)
+
+
+def tabla_metricas(metricas: dict) -> pd.DataFrame:
+    """Métricas escalares de un dict (números y textos; se omiten arrays y tablas) → tabla Métrica/Valor."""
+    filas = [(str(k), v) for k, v in metricas.items() if isinstance(v, (int, float, str, np.number))]
+    return pd.DataFrame(filas, columns=["Métrica", "Valor"])
+
+
+def libro_excel(hojas: dict) -> bytes:
+    """
+    Libro .xlsx con una hoja por tabla ({nombre de hoja: DataFrame}), en el orden del dict.
+    xlsxwriter en modo 'constant_memory' vuelca cada fila a disco al pasar a la siguiente,
+    por eso se escribe fila a fila (en bloques de FILAS_POR_BLOQUE) y no con DataFrame.to_excel,
+    que escribe por columnas.
+    """
+    import xlsxwriter
+
+    output = io.BytesIO()
+    libro = xlsxwriter.Workbook(output, {"constant_memory": True, "default_date_format": "dd/mm/yyyy hh:mm"})
+    encabezado = libro.add_format({"bold": True})
+    for nombre, df in hojas.items():
+        hoja = libro.add_worksheet(nombre[:31])
+        columnas = [str(c) for c in df.columns]
+        for j, columna in enumerate(columnas):
+            hoja.set_column(j, j, max(ANCHO_MINIMO_COLUMNA, len(columna) + 2))
+        hoja.freeze_panes(1, 0)
+        hoja.write_row(0, 0, columnas, encabezado)
+        for inicio in range(0, len(df), FILAS_POR_BLOQUE):
+            bloque = df.iloc[inicio:inicio + FILAS_POR_BLOQUE].astype(object)
+            for fila, valores in enumerate(bloque.where(bloque.notna(), None).to_numpy().tolist(), start=inicio + 1):
+                hoja.write_row(fila, 0, valores)
+    libro.close()
+    return output.getvalue()
+
+
+def informe(hojas: dict) -> bytes:
+    """Informe completo (ver libro_excel), memoizado por huella de las hojas y su orden."""
+    return _EXPORTACIONES.obtener_o_calcular(huella("informe", list(hojas), hojas), lambda: libro_excel(hojas))
+
+
+def informe_diferido(hojas: dict):
+    """
+    Proveedor sin argumentos del informe completo para st.download_button(data=...).
+    Una hoja puede ser una función sin argumentos que construye su tabla: solo se llama al pulsar.
+    """
+    return lambda: informe({nombre: hoja() if callable(hoja) else hoja for nombre, hoja in hojas.items()})
+
+
+def estadisticas() -> dict:
+    """Aciertos, fallos y tamaño de la caché de exportaciones (diagnóstico)."""
+    return {"aciertos": _EXPORTACIONES.aciertos, "fallos": _EXPORTACIONES.fallos, "exportaciones": len(_EXPORTACIONES)}
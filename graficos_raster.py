@@ -0,0 +1,171 @@
+# graficos_raster.py
+# -*- coding: utf-8 -*-
+"""
+Renderizado en el servidor (PNG/SVG con matplotlib/seaborn) de gráficos grandes.
+
+Un gráfico Altair envía todos sus datos al navegador, que los dibuja: con
+decenas de miles de celdas o puntos, la página se vuelve lenta. Por encima
+de UMBRAL_RASTER elementos los mapas de calor y las nubes de puntos se
+dibujan aquí como imagen, con las mismas paletas de accesibilidad
+(CB_PALETTES), de modo que lo que viaja al navegador no crece con los datos.
+Las imágenes se guardan en caché por huella de datos, paleta y tamaño.
+"""
+import io
+
+import numpy as np
+
+from cache_resultados import CacheResultados, huella
+
+# Celdas o puntos a partir de los cuales se usa imagen en vez de Vega-Lite
+UMBRAL_RASTER = 20_000
+MAX_IMAGENES = 64
+DPI = 100
+ANCHO_PULGADAS = 12
+MAX_ETIQUETAS_Y = 40
+
+# Paletas de Vega (las de CB_PALETTES) → mapas de color de matplotlib
+PALETAS_MATPLOTLIB = {
+    "blues": "Blues",
+    "greys": "Greys",
+    "cividis": "cividis",
+    "plasma": "plasma",
+    "magma": "magma",
+    "viridis": "viridis",
+}
+
+_IMAGENES = CacheResultados(max_elementos=MAX_IMAGENES)
+
+
+def usar_raster(elementos: int) -> bool:
+    """True si un gráfico con 'elementos' celdas/puntos debe dibujarse como imagen."""
+    return elementos > UMBRAL_RASTER
+
+
+def _mapa_color(scheme: str) -> str:
+    return PALETAS_MATPLOTLIB.get(scheme, scheme)
+
+
+def _figura(alto_px: int):
+    # matplotlib se importa al dibujar la primera imagen, no al importar el módulo (arranque en frío)
+    import matplotlib
+
+    matplotlib.use("Agg")
+    from matplotlib.figure import Figure  # API orientada a objetos: segura entre hilos, sin pyplot
+
+    return Figure(figsize=(ANCHO_PULGADAS, max(alto_px, 200) / DPI), dpi=DPI, layout="constrained")
+
+
+def _a_bytes(fig, formato: str) -> bytes:
+    salida = io.BytesIO()
+    fig.savefig(salida, format=formato)
+    return salida.getvalue()
+
+
+def _en_cache(funcion, *claves):
+    return _IMAGENES.obtener_o_calcular(huella("raster", funcion.__name__, *claves), lambda: funcion(*claves))
+
+
+def _heatmap(tabla, scheme, titulo, titulo_filas, alto_px, marcas_y, formato) -> bytes:
+    import seaborn as sns  # solo se importa cuando hace falta una imagen
+
+    fig = _figura(alto_px)
+    ax = fig.subplots()
+    sns.heatmap(
+        tabla.to_numpy(dtype="float64"), ax=ax, cmap=_mapa_color(scheme),
+        cbar_kws={"label": "Potencia (W)"}, xticklabels=False, yticklabels=False,
+        rasterized=True,  # en SVG, la malla va como imagen embebida (no una figura por celda)
+    )
+    # Eje X: solo las horas en punto; eje Y: las marcas indicadas o, como mucho, MAX_ETIQUETAS_Y filas
+    filas, franjas = tabla.shape
+    por_hora = franjas // 24
+    ax.set_xticks([h * por_hora + 0.5 for h in range(24)], [str(h) for h in range(24)], rotation=0)
+    etiquetas = list(tabla.index)
+    if marcas_y is None:
+        paso = max(1, -(-filas // MAX_ETIQUETAS_Y))
+        posiciones = list(range(0, filas, paso))
+    else:
+        marcas = set(marcas_y)
+        posiciones = [k for k, e in enumerate(etiquetas) if e in marcas]
+    ax.set_yticks([k + 0.5 for k in posiciones], [str(etiquetas[k]) for k in posiciones], rotation=0)
+    ax.set_xlabel("Hora del Día")
+    ax.set_ylabel(titulo_filas)
+    ax.set_title(titulo)
+    return _a_bytes(fig, formato)
+
+
+def heatmap(tabla, scheme: str, titulo: str, titulo_filas: str, alto_px: int = 420, marcas_y=None,
+            formato: str = "png") -> bytes:
+    """Mapa de calor filas × franjas (tabla de matriz_heatmap) como imagen; 'marcas_y': filas rotuladas."""
+    marcas_y = None if marcas_y is None else tuple(marcas_y)
+    return _en_cache(_heatmap, tabla, scheme, titulo, titulo_filas, alto_px, marcas_y, formato)
+
+
+def _linea(df, x, y, color, titulo, alto_px, formato) -> bytes:
+    fig = _figura(alto_px)
+    ax = fig.subplots()
+    ax.plot(df[x].to_numpy(), df[y].to_numpy(), color=color, linewidth=1.2)
+    ax.set_xlabel(x)
+    ax.set_ylabel(y)
+    ax.set_title(titulo)
+    ax.grid(alpha=0.3)
+    return _a_bytes(fig, formato)
+
+
+def linea(df, x: str, y: str, color: str = "#007F5F", titulo: str = "", alto_px: int = 350,
+          formato: str = "png") -> bytes:
+    """Curva con todos los puntos de 'df' (p.ej. la LDC anual completa) como imagen."""
+    return _en_cache(_linea, df[[x, y]], x, y, color, titulo, alto_px, formato)
+
+
+def _barras(df, x, y, grupo, colores, titulo, alto_px, media, formato) -> bytes:
+    fig = _figura(alto_px)
+    ax = fig.subplots()
+    posiciones = np.arange(len(df))
+    if grupo is None:
+        ax.bar(posiciones, df[y].to_numpy(), color=colores)
+    else:
+        # Una serie de barras por grupo (misma posición) para que la leyenda salga sola
+        for nombre, color in colores.items():
+            filas = (df[grupo] == nombre).to_numpy()
+            ax.bar(posiciones[filas], df[y].to_numpy()[filas], color=color, label=nombre)
+    if media:
+        promedio = float(df[y].mean())
+        ax.axhline(promedio, color="red", linestyle="--", linewidth=1.2, label=f"Promedio: {promedio:,.2f}")
+    if grupo is not None or media:
+        ax.legend(loc="upper right")
+    etiquetas = df[x].astype(str).to_numpy()
+    paso = max(1, len(df) // 24)  # con franjas subhorarias, solo se rotulan las horas
+    ax.set_xticks(posiciones[::paso], etiquetas[::paso], rotation=0 if len(df) <= 24 else 90)
+    ax.set_ylabel(y)
+    ax.set_title(titulo)
+    ax.grid(axis="y", alpha=0.3)
+    return _a_bytes(fig, formato)
+
+
+def barras(df, x: str, y: str, grupo: str = None, colores="#0AC999", titulo: str = "", alto_px: int = 350,
+           media: bool = False, formato: str = "png") -> bytes:
+    """
+    Barras de 'y' por 'x'. Con 'grupo', 'colores' es un dict {valor del grupo: color};
+    'media' añade la línea punteada del promedio.
+    """
+    return _en_cache(_barras, df, x, y, grupo, colores, titulo, alto_px, media, formato)
+
+
+def _dispersion(df, x, y, color, scheme, titulo, alto_px, formato) -> bytes:
+    fig = _figura(alto_px)
+    ax = fig.subplots()
+    puntos = ax.scatter(
+        df[x], df[y], c=df[color], cmap=_mapa_color(scheme), s=6, alpha=0.6, linewidths=0, rasterized=True,
+    )
+    fig.colorbar(puntos, ax=ax, label=color)
+    ax.set_xlabel(x)
+    ax.set_ylabel(y)
+    ax.set_title(titulo)
+    ax.grid(alpha=0.3)
+    return _a_bytes(fig, formato)
+
+
+def dispersion(df, x: str, y: str, color: str, scheme: str = "viridis", titulo: str = "", alto_px: int = 350,
+               formato: str = "png") -> bytes:
+    """Nube de puntos de todas las filas de 'df' (sin muestreo) coloreada por la columna 'color'."""
+    return _en_cache(_dispersion, df[[x, y, color]], x, y, color, scheme, titulo, alto_px, formato)
@@ -0,0 +1,302 @@
+# grafo_calculo.py
+# -*- coding: utf-8 -*-
+"""
+Grafo de dependencias reactivo para la pestaña de análisis.
+
+Cada nodo declara sus entradas y solo se recalcula cuando alguna de ellas
+cambia. Mover un slider de multiplicador mensual, por ejemplo, no vuelve a
+calcular la potencia horaria (producto N×24), solo los nodos que dependen
+del multiplicador.
+"""
+import numpy as np
+import pandas as pd
+
+import horario_bits
+import motor_calculo as motor
+import simulacion_anual as anual
+from constructor_ldc import construir_ldc
+from consultas_demanda import IndiceDemanda
+from escenarios import barrido_escenarios, leer_escenarios
+from matriz_heatmap import tabla_anual
+from tabla_segmentos import TablaSegmentos
+from cache_resultados import huella
+from ingesta import remuestrear_tabla
+
+
+def _son_iguales(a, b) -> bool:
+    """Comparación barata de valores de entrada (identidad primero)."""
+    if a is b:
+        return True
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, np.ndarray):
+        return a.shape == b.shape and bool(np.array_equal(a, b))
+    if isinstance(a, (pd.DataFrame, pd.Series)):
+        return a.equals(b)
+    try:
+        return bool(a == b)
+    except (TypeError, ValueError):
+        return False
+
+
+class GrafoCalculo:
+    """
+    DAG perezoso de cálculos.
+    - 'fijar_entrada(nombre, valor)': actualiza una entrada; si no cambió, no invalida nada.
+    - 'definir_nodo(nombre, funcion, dependencias)': la función recibe los valores de las dependencias en orden.
+    - 'obtener(nombre)': devuelve el valor, recalculando solo los nodos sucios.
+    Con 'cache' (CacheResultados), los nodos sucios se buscan primero por huella de
+    contenido, de modo que otras sesiones (o un reinicio) reutilizan sus resultados.
+    """
+
+    def __init__(self, cache=None):
+        self._entradas = {}     # nombre -> valor
+        self._versiones = {}    # nombre -> contador de cambios (entradas y nodos)
+        self._nodos = {}        # nombre -> (funcion, dependencias, cacheable)
+        self._cache = {}        # nombre -> (versiones de dependencias vistas, valor)
+        self._huellas = {}      # nombre -> huella de contenido (solo con caché compartida)
+        self.cache_compartida = cache
+        self.recalculos = {}    # nombre -> número de veces que se ha ejecutado (diagnóstico)
+
+    def fijar_entrada(self, nombre: str, valor) -> bool:
+        """Fija una entrada. Devuelve True si el valor cambió."""
+        if nombre in self._nodos:
+            raise ValueError(f"'{nombre}' es un nodo calculado, no una entrada.")
+        if nombre in self._entradas and _son_iguales(self._entradas[nombre], valor):
+            return False
+        self._entradas[nombre] = valor
+        self._versiones[nombre] = self._versiones.get(nombre, 0) + 1
+        if self.cache_compartida is not None:
+            self._huellas[nombre] = huella(valor)
+        return True
+
+    def definir_nodo(self, nombre: str, funcion, dependencias, cacheable: bool = True):
+        """'cacheable=False' excluye el nodo de la caché compartida (p.ej. matrices N×24 intermedias)."""
+        if nombre in self._entradas:
+            raise ValueError(f"'{nombre}' ya está definido como entrada.")
+        self._nodos[nombre] = (funcion, tuple(dependencias), cacheable)
+        self._cache.pop(nombre, None)
+
+    def obtener(self, nombre: str):
+        if nombre in self._entradas:
+            return self._entradas[nombre]
+        if nombre not in self._nodos:
+            raise KeyError(f"Nodo o entrada desconocido: '{nombre}'.")
+
+        funcion, dependencias, cacheable = self._nodos[nombre]
+        valores = [self.obtener(dep) for dep in dependencias]
+        firma = tuple(self._versiones.get(dep, 0) for dep in dependencias)
+
+        en_cache = self._cache.get(nombre)
+        if en_cache is not None and en_cache[0] == firma:
+            return en_cache[1]
+
+        compartida = self.cache_compartida
+        if compartida is not None:
+            # La huella del nodo depende solo de su nombre y de las huellas de sus entradas
+            self._huellas[nombre] = huella(nombre, [self._huellas.get(dep) for dep in dependencias])
+        if compartida is not None and cacheable:
+            valor = compartida.obtener_o_calcular(self._huellas[nombre], lambda: self._calcular(nombre, funcion, valores))
+        else:
+            valor = self._calcular(nombre, funcion, valores)
+
+        # Corte temprano: si el resultado no cambió, los dependientes siguen limpios
+        if en_cache is None or not _son_iguales(en_cache[1], valor):
+            self._versiones[nombre] = self._versiones.get(nombre, 0) + 1
+        self._cache[nombre] = (firma, valor)
+        return valor
+
+    def _calcular(self, nombre: str, funcion, valores):
+        self.recalculos[nombre] = self.recalculos.get(nombre, 0) + 1
+        return funcion(*valores)
+
+    def esta_sucio(self, nombre: str) -> bool:
+        """True si 'obtener(nombre)' provocaría un recálculo."""
+        if nombre in self._entradas:
+            return False
+        funcion, dependencias, _ = self._nodos[nombre]
+        if any(self.esta_sucio(dep) for dep in dependencias):
+            return True
+        en_cache = self._cache.get(nombre)
+        firma = tuple(self._versiones.get(dep, 0) for dep in dependencias)
+        return en_cache is None or en_cache[0] != firma
+
+
+# ---------- GRAFO ESTÁNDAR DEL CUADRO DE CARGA ----------
+
+def _horario_compacto(datos: pd.DataFrame, resolucion: int):
+    """(máscaras, potencia): el grafo guarda n/8 bytes por carga (4 con 24 franjas) en vez de la matriz N×n."""
+    return motor.como_compacto(datos[motor.columnas_franjas(resolucion)].to_numpy(), datos["Potencia (W)"])
+
+
+def _resolucion(perfil, datos: pd.DataFrame) -> int:
+    """Franjas por día: las del perfil mantenido, si se recibió; si no, las de las columnas de 'datos'."""
+    if perfil is not None:
+        return len(perfil)
+    return motor.detectar_resolucion(datos.columns)
+
+
+def _potencia_horaria(perfil, datos: pd.DataFrame, resolucion: int) -> np.ndarray:
+    """El perfil mantenido por el almacén de cargas, si se recibió; si no, potencia · horario de 'datos'."""
+    if perfil is not None:
+        return np.asarray(perfil, dtype=np.float64)
+    return motor.potencia_horaria(*_horario_compacto(datos, resolucion))
+
+
+def _perfiles_tipo_dia(perfil_laborable: np.ndarray, datos_fin_de_semana, datos_festivo, resolucion: int) -> np.ndarray:
+    """Matriz 3×n de perfiles diarios (laborable, fin de semana, festivo); None = igual que laborable."""
+    perfiles = [perfil_laborable]
+    for datos in (datos_fin_de_semana, datos_festivo):
+        if datos is None:
+            perfiles.append(perfil_laborable)
+        else:
+            datos = remuestrear_tabla(datos, resolucion)
+            perfiles.append(motor.potencia_horaria(*_horario_compacto(datos, resolucion)))
+    return np.vstack(perfiles)
+
+
+def _tabla_horaria(perfil_ajustado: np.ndarray, mascara_diurna: np.ndarray) -> pd.DataFrame:
+    """DataFrame del gráfico 3.2 (Hora, Potencia (W), Segmento; y 'Franja' 'HH:MM' si es subhorario)."""
+    n = len(perfil_ajustado)
+    tabla = pd.DataFrame({
+        "Hora": np.arange(n) * motor.horas_por_franja(n),
+        "Potencia (W)": perfil_ajustado,
+        "Segmento": np.where(mascara_diurna, "Diurno ☀️", "Nocturno 🌙"),
+    })
+    if n != motor.RESOLUCION_BASE:
+        tabla.insert(1, "Franja", [motor.formato_hora(h) for h in tabla["Hora"]])
+    return tabla
+
+
+def _tabla_mensual(proyeccion: dict, multiplicadores: dict, dias_por_mes: dict) -> pd.DataFrame:
+    """DataFrame del gráfico 3.3 (Mes, Días, Multiplicador, Energía (kWh))."""
+    meses = list(dias_por_mes.keys())
+    df_mensual = pd.DataFrame({
+        "Mes": pd.Categorical(meses, categories=meses, ordered=True),
+        "Días": list(dias_por_mes.values()),
+        "Multiplicador": [multiplicadores[mes] for mes in meses],
+        "Energía (kWh)": proyeccion["energia_mensual_kwh"],
+    })
+    return df_mensual
+
+
+def _barrido(tabla, escenarios: pd.DataFrame, diurno_inicio, diurno_fin, dias_por_mes) -> dict:
+    """Barrido de la tabla de escenarios; sin columnas de ventana, todos usan la ventana diurna actual."""
+    entradas = leer_escenarios(escenarios)
+    if entradas["ventanas"] is None:
+        entradas["ventanas"] = (diurno_inicio, diurno_fin)
+    return barrido_escenarios(tabla, dias_por_mes=dias_por_mes, **entradas)
+
+
+def construir_grafo_cuadro_carga(cache=None) -> GrafoCalculo:
+    """
+    Grafo con los nodos de la pestaña 2:
+    datos → potencia_horaria → tabla_segmentos → segmentos → metricas_ajustadas → ldc → proyeccion_mensual.
+    Entradas: 'datos', 'diurno_inicio', 'diurno_fin', 'multiplicadores', 'mes_referencia', 'dias_por_mes'.
+    'perfil_horario' (opcional, None por defecto): potencia por franja ya sumada
+    (AlmacenCargas.perfil_horario, mantenida al editar); evita el producto N×n y, si se
+    fija, 'datos' puede quedar en None (la sesión no necesita la tabla materializada).
+    La resolución (24/48/96/288 franjas) es la del perfil, o la de las columnas de 'datos'.
+    La ventana diurna es una máscara de bits ('segmento_diurno', ver horario_bits.py);
+    'mascara_diurna' es su versión booleana y 'franjas_diurnas' su popcount.
+    Las tablas de los gráficos también son nodos; sus exportaciones se generan bajo demanda
+    (ver exportaciones.py), fuera del grafo.
+    La simulación anual (nodos *_anual) usa además 'anio', 'festivos', 'dias_fin_de_semana',
+    'datos_fin_de_semana' y 'datos_festivo' (estas dos, None = mismo horario que los laborables).
+    'escenarios' (tabla de multiplicadores por escenario) alimenta el barrido de escenarios.
+    'metodo_ldc_anual' elige cómo se construye la LDC anual (ver constructor_ldc.METODOS).
+    'cache': CacheResultados opcional compartida entre sesiones.
+    """
+    g = GrafoCalculo(cache=cache)
+    g.fijar_entrada("perfil_horario", None)
+    g.fijar_entrada("datos", None)
+    g.definir_nodo("resolucion", _resolucion, ["perfil_horario", "datos"])
+    g.definir_nodo("potencia_horaria", _potencia_horaria, ["perfil_horario", "datos", "resolucion"])
+    g.definir_nodo(
+        "segmento_diurno", horario_bits.mascara_segmento_bits, ["diurno_inicio", "diurno_fin", "resolucion"]
+    )
+    g.definir_nodo("mascara_diurna", horario_bits.segmento_booleano, ["segmento_diurno", "resolucion"])
+    g.definir_nodo("franjas_diurnas", horario_bits.franjas_segmento, ["segmento_diurno", "resolucion"])
+    # Sumas acumuladas + tabla dispersa: mover los sliders diurnos solo hace consultas O(1)
+    g.definir_nodo("tabla_segmentos", TablaSegmentos, ["potencia_horaria"])
+    g.definir_nodo("segmentos", lambda t, ini, fin: t.metricas(ini, fin), ["tabla_segmentos", "diurno_inicio", "diurno_fin"])
+    g.definir_nodo("matriz_ventanas", lambda t: t.matriz_ventanas(), ["tabla_segmentos"])
+    g.definir_nodo(
+        "multiplicadores_normalizados",
+        lambda mult, dias: motor.normalizar_multiplicadores(mult, dias),
+        ["multiplicadores", "dias_por_mes"],
+    )
+    g.definir_nodo(
+        "multiplicador_actual",
+        lambda mult, mes: float(mult.get(mes, 1.0)),
+        ["multiplicadores_normalizados", "mes_referencia"],
+    )
+    g.definir_nodo(
+        "potencia_horaria_ajustada",
+        lambda perfil, mult: perfil * mult,
+        ["potencia_horaria", "multiplicador_actual"],
+    )
+    g.definir_nodo("tabla_segmentos_ajustada", TablaSegmentos, ["potencia_horaria_ajustada"])
+    g.definir_nodo(
+        "metricas_ajustadas",
+        lambda t, ini, fin: t.metricas(ini, fin, sufijo="_ajustada", sufijo_factor="_ajustado"),
+        ["tabla_segmentos_ajustada", "diurno_inicio", "diurno_fin"],
+    )
+    g.definir_nodo("ldc", motor.curva_duracion, ["potencia_horaria_ajustada"])
+    g.definir_nodo(
+        "resumen_ldc",
+        lambda perfil: construir_ldc(perfil, motor.horas_por_franja(len(perfil)), metodo="completo"),
+        ["potencia_horaria_ajustada"],
+    )
+    g.definir_nodo(
+        "indice_demanda",
+        lambda perfil: IndiceDemanda(perfil, motor.horas_por_franja(len(perfil))),
+        ["potencia_horaria_ajustada"],
+    )
+    g.definir_nodo(
+        "proyeccion_mensual",
+        lambda seg, mult, dias: motor.proyeccion_mensual(
+            seg["energia_total_dia"], seg["energia_diurna_dia"], seg["energia_nocturna_dia"], mult, dias
+        ),
+        ["segmentos", "multiplicadores_normalizados", "dias_por_mes"],
+    )
+
+    # Tablas de los gráficos
+    g.definir_nodo("tabla_horaria", _tabla_horaria, ["potencia_horaria_ajustada", "mascara_diurna"])
+    g.definir_nodo(
+        "tabla_mensual",
+        _tabla_mensual,
+        ["proyeccion_mensual", "multiplicadores_normalizados", "dias_por_mes"],
+    )
+
+    # Barrido de escenarios (entrada 'escenarios': una fila por escenario, ver escenarios.leer_escenarios)
+    g.definir_nodo(
+        "barrido_escenarios",
+        _barrido,
+        ["tabla_segmentos", "escenarios", "diurno_inicio", "diurno_fin", "dias_por_mes"],
+    )
+
+    # Simulación anual (8760/8784 h): tres perfiles diarios + calendario, nunca N×8760
+    g.definir_nodo(
+        "perfiles_tipo_dia",
+        _perfiles_tipo_dia,
+        ["potencia_horaria", "datos_fin_de_semana", "datos_festivo", "resolucion"],
+    )
+    g.definir_nodo("calendario_anual", anual.calendario, ["anio", "festivos", "dias_fin_de_semana"])
+    g.definir_nodo(
+        "perfil_anual",
+        anual.perfil_anual,
+        ["perfiles_tipo_dia", "calendario_anual", "multiplicadores_normalizados"],
+    )
+    g.definir_nodo("resumen_anual", anual.resumen_anual, ["perfil_anual", "calendario_anual"])
+    g.definir_nodo("ldc_anual", anual.curva_duracion_anual, ["perfil_anual", "metodo_ldc_anual"])
+    g.definir_nodo("ldc_anual_completa", anual.curva_duracion_completa, ["perfil_anual"])
+    g.definir_nodo(
+        "indice_demanda_anual",
+        lambda perfil: IndiceDemanda(perfil, motor.horas_por_franja(perfil.shape[1])),
+        ["perfil_anual"],
+    )
+    g.definir_nodo("heatmap_anual", tabla_anual, ["perfil_anual", "calendario_anual"])
+    g.definir_nodo("tabla_mensual_anual", anual.tabla_mensual_anual, ["resumen_anual", "calendario_anual"])
+    g.definir_nodo("serie_anual", anual.serie_anual, ["perfil_anual", "calendario_anual"], cacheable=False)
+    return g
@@ -0,0 +1,148 @@
+# horario_bits.py
+# -*- coding: utf-8 -*-
+"""
+Representación compacta del horario diario: una máscara de bits por carga.
+
+Con resolución horaria (24 franjas) el bit h vale 1 si la carga está
+encendida a la hora h y cada carga ocupa un uint32. Con resolución
+subhoraria (48, 96 o 288 franjas) cada carga ocupa un elemento de tipo
+'void' de n/8 bytes (np.packbits, bit menos significativo primero), de modo
+que el horario sigue siendo un vector de N elementos. Las ventanas
+diurna/nocturna (ver motor_calculo.get_horas_segmento) también son
+máscaras, y las franjas activas y la energía de cada carga en un segmento
+salen de un popcount.
+"""
+import numpy as np
+
+N_HORAS = 24
+TODAS_LAS_HORAS = (1 << N_HORAS) - 1
+_PESOS = (np.uint32(1) << np.arange(N_HORAS, dtype=np.uint32)).astype(np.uint32)
+_BLOQUE = 65_536  # filas por bloque al desempaquetar (acota la memoria temporal)
+
+# Tabla de popcount por byte (respaldo si NumPy no tiene bitwise_count)
+_POPCOUNT_BYTE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def dtype_mascara(n_franjas: int = N_HORAS) -> np.dtype:
+    """Tipo de un elemento del vector de máscaras: uint32 (24 franjas) o void de n/8 bytes."""
+    if n_franjas == N_HORAS:
+        return np.dtype(np.uint32)
+    if n_franjas % 8:
+        raise ValueError("El número de franjas debe ser múltiplo de 8.")
+    return np.dtype((np.void, n_franjas // 8))
+
+
+def n_franjas(mascaras) -> int:
+    """Número de franjas diarias representado por un vector de máscaras."""
+    dtype = np.asarray(mascaras).dtype
+    return N_HORAS if dtype.kind in "iu" else dtype.itemsize * 8
+
+
+def _como_bytes(mascaras) -> np.ndarray:
+    """Vector de máscaras subhorarias → matriz N×(n/8) uint8 (vista, sin copia)."""
+    mascaras = np.ascontiguousarray(mascaras)
+    return mascaras.view(np.uint8).reshape(len(mascaras), mascaras.dtype.itemsize)
+
+
+def empaquetar(horario) -> np.ndarray:
+    """Matriz N×n de 0/1 → vector de N máscaras de bits (uint32 si n = 24)."""
+    matriz = np.asarray(horario)
+    if matriz.ndim != 2:
+        raise ValueError("El horario debe tener forma N×franjas.")
+    n = matriz.shape[1]
+    if n == N_HORAS:
+        return (matriz != 0).astype(np.uint32) @ _PESOS
+    dtype = dtype_mascara(n)
+    return np.ascontiguousarray(np.packbits(matriz != 0, axis=1, bitorder="little")).view(dtype).reshape(-1)
+
+
+def desempaquetar(mascaras, dtype=np.uint8) -> np.ndarray:
+    """Vector de máscaras → matriz N×n de 0/1."""
+    mascaras = np.asarray(mascaras)
+    if mascaras.dtype.kind in "iu":
+        mascaras = mascaras.astype(np.uint32, copy=False)
+        return ((mascaras[:, None] >> np.arange(N_HORAS, dtype=np.uint32)) & 1).astype(dtype)
+    return np.unpackbits(_como_bytes(mascaras), axis=1, bitorder="little").astype(dtype, copy=False)
+
+
+def mascara_segmento_bits(inicio: float, fin: float, n_franjas: int = N_HORAS):
+    """
+    Ventana [inicio, fin) (en horas, incluso si cruza la medianoche; inicio == fin es el día
+    completo) como máscara: un int para 24 franjas, un escalar void para resoluciones subhorarias.
+    """
+    if n_franjas == N_HORAS and float(inicio).is_integer() and float(fin).is_integer():
+        inicio, fin = int(inicio), int(fin)
+        if inicio < fin:
+            return ((1 << fin) - 1) & ~((1 << inicio) - 1)
+        return (TODAS_LAS_HORAS & ~((1 << inicio) - 1)) | ((1 << fin) - 1)
+    horas = np.arange(n_franjas) * (N_HORAS / n_franjas)
+    dentro = (horas >= inicio) & (horas < fin) if inicio < fin else (horas >= inicio) | (horas < fin)
+    mascara = empaquetar(dentro[None, :])[0]
+    return int(mascara) if n_franjas == N_HORAS else mascara
+
+
+def segmento_booleano(segmento, n_franjas: int = N_HORAS) -> np.ndarray:
+    """Máscara de un segmento (ver mascara_segmento_bits) → vector booleano de n franjas."""
+    if n_franjas == N_HORAS:
+        return desempaquetar(np.array([segmento], dtype=np.uint32))[0].astype(bool)
+    return desempaquetar(np.atleast_1d(segmento))[0].astype(bool)
+
+
+def contar_bits(mascaras) -> np.ndarray:
+    """Popcount por elemento (número de franjas activas)."""
+    mascaras = np.asarray(mascaras)
+    if mascaras.dtype.kind in "iu":
+        mascaras = mascaras.astype(np.uint32, copy=False)
+        if hasattr(np, "bitwise_count"):
+            return np.bitwise_count(mascaras).astype(np.uint8)
+        bytes_ = mascaras.view(np.uint8).reshape(*mascaras.shape, 4)
+        return _POPCOUNT_BYTE[bytes_].sum(axis=-1, dtype=np.uint8)
+    bytes_ = _como_bytes(mascaras)
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(bytes_).sum(axis=1, dtype=np.uint16)
+    return _POPCOUNT_BYTE[bytes_].sum(axis=1, dtype=np.uint16)
+
+
+def _interseccion(mascaras, segmento) -> np.ndarray:
+    mascaras = np.asarray(mascaras)
+    if mascaras.dtype.kind in "iu":
+        return mascaras.astype(np.uint32, copy=False) & np.uint32(segmento)
+    segmento_bytes = np.frombuffer(np.asarray(segmento, dtype=mascaras.dtype).tobytes(), dtype=np.uint8)
+    return np.ascontiguousarray(_como_bytes(mascaras) & segmento_bytes).view(mascaras.dtype).reshape(-1)
+
+
+def horas_activas(mascaras, segmento=None) -> np.ndarray:
+    """Franjas encendidas de cada carga dentro de 'segmento' (todo el día si es None)."""
+    if segmento is None:
+        return contar_bits(mascaras)
+    return contar_bits(_interseccion(mascaras, segmento))
+
+
+def franjas_segmento(segmento, n_franjas: int = N_HORAS) -> int:
+    """Número de franjas de un segmento (popcount de su máscara)."""
+    dtype = dtype_mascara(n_franjas)
+    return int(contar_bits(np.array([segmento], dtype=dtype))[0])
+
+
+def energia_por_carga(mascaras, potencia, segmento=None) -> np.ndarray:
+    """Energía diaria (Wh) de cada carga en el segmento: potencia_i · popcount(máscara_i & segmento) · horas por franja."""
+    potencia = np.asarray(potencia, dtype=np.float64)
+    horas_por_franja = N_HORAS / n_franjas(mascaras)
+    return potencia * horas_activas(mascaras, segmento) * horas_por_franja
+
+
+def potencia_horaria(mascaras, potencia) -> np.ndarray:
+    """Potencia total por franja (W) sin materializar la matriz N×n completa."""
+    mascaras = np.asarray(mascaras)
+    potencia = np.asarray(potencia, dtype=np.float64)
+    perfil = np.zeros(n_franjas(mascaras), dtype=np.float64)
+    for inicio in range(0, len(mascaras), _BLOQUE):
+        bloque = desempaquetar(mascaras[inicio:inicio + _BLOQUE], dtype=np.float64)
+        perfil += potencia[inicio:inicio + _BLOQUE] @ bloque
+    return perfil
+
+
+def es_binario(horario) -> np.ndarray:
+    """True por fila si todas sus horas son exactamente 0 o 1 (representable en bits)."""
+    matriz = np.asarray(horario, dtype=np.float64)
+    return ((matriz == 0) | (matriz == 1)).all(axis=1)
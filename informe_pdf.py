@@ -0,0 +1,178 @@
+# informe_pdf.py
+# -*- coding: utf-8 -*-
+"""
+Informe PDF del cuadro de carga generado en el servidor con fpdf2.
+
+A diferencia del botón de impresión (diálogo del navegador), el informe se
+arma aquí: métricas clave, LDC, perfil horario diurno/nocturno, proyección
+mensual y mapas de calor, con páginas de tamaño fijo. Las imágenes salen de
+graficos_raster (matplotlib, en caché por huella), así que no hace falta un
+navegador ni Streamlit: procesamiento_lote.py lo usa con --pdf para generar
+un informe por archivo en paralelo.
+"""
+import datetime
+import io
+
+import numpy as np
+import pandas as pd
+
+import graficos_raster
+from cache_resultados import CacheResultados, huella
+from matriz_heatmap import tabla_mensual
+from motor_calculo import DIAS_POR_MES, curva_duracion, formato_hora, horas_por_franja, normalizar_multiplicadores
+
+MAX_INFORMES = 16
+MARGEN_MM = 12
+ALTO_GRAFICO_PX = 330
+ALTO_HEATMAP_PX = 420
+COLORES_SEGMENTO = {"Diurno": "#ffcc66", "Nocturno": "#4c78a8"}
+
+_INFORMES = CacheResultados(max_elementos=MAX_INFORMES)
+
+
+def _nuevo_documento():
+    """FPDF A4 vertical con pie de página 'Página i de n'."""
+    # fpdf2 tarda unas décimas en importarse: solo se carga al generar el primer informe
+    from fpdf import FPDF
+
+    class _DocumentoInforme(FPDF):
+        def footer(self):
+            self.set_y(-10)
+            self.set_font("Helvetica", "I", 8)
+            self.set_text_color(120)
+            self.cell(0, 5, f"Página {self.page_no()} de {{nb}}", align="C")
+
+    return _DocumentoInforme(orientation="portrait", unit="mm", format="A4")
+
+
+def _latin1(texto: str) -> str:
+    """Las fuentes básicas de PDF solo cubren latin-1: los demás caracteres (emojis...) se reemplazan."""
+    return str(texto).encode("latin-1", "replace").decode("latin-1")
+
+
+def _hora(h) -> str:
+    return h if isinstance(h, str) else f"{formato_hora(h)} h"
+
+
+def filas_metricas(m: dict) -> list:
+    """(etiqueta, valor) de las métricas clave ajustadas (mismos nombres que motor.calcular_metricas)."""
+    return [
+        ("Potencia pico", f"{m['potencia_max_w_ajustada']:,.0f} W a las {_hora(m['hora_max_ajustada'])}"),
+        ("Potencia base", f"{m['potencia_min_w_ajustada']:,.0f} W a las {_hora(m['hora_min_ajustada'])}"),
+        ("Pico diurno", f"{m['potencia_max_diurna_w_ajustada']:,.0f} W a las {_hora(m['hora_max_diurna_ajustada'])}"),
+        ("Pico nocturno", f"{m['potencia_max_nocturna_w_ajustada']:,.0f} W a las {_hora(m['hora_max_nocturna_ajustada'])}"),
+        ("Potencia media (total / diurna / nocturna)",
+         f"{m['potencia_media_total_w_ajustada']:,.0f} / {m['potencia_media_diurna_w_ajustada']:,.0f} / "
+         f"{m['potencia_media_nocturna_w_ajustada']:,.0f} W"),
+        ("Factor de carga (general / diurno / nocturno)",
+         f"{m['factor_carga_general_ajustado']:,.2f} / {m['factor_carga_diurno_ajustado']:,.2f} / "
+         f"{m['factor_carga_nocturno_ajustado']:,.2f} %"),
+        ("Energía diaria (total / diurna / nocturna)",
+         f"{m['energia_total_dia_ajustada']:,.2f} / {m['energia_diurna_dia_ajustada']:,.2f} / "
+         f"{m['energia_nocturna_dia_ajustada']:,.2f} kWh"),
+        ("Energía anual proyectada", f"{m['energia_anual_kwh']:,.2f} kWh"),
+    ]
+
+
+def _titulo_seccion(pdf, texto: str, alto_siguiente: float = 0):
+    # El título no se queda solo al pie de una página: salta si no cabe también lo que sigue
+    if pdf.get_y() + 10 + alto_siguiente > pdf.page_break_trigger:
+        pdf.add_page()
+    pdf.ln(3)
+    pdf.set_font("Helvetica", "B", 12)
+    pdf.set_text_color(0)
+    pdf.cell(0, 7, texto, new_x="LMARGIN", new_y="NEXT")
+
+
+def _imagen(pdf, titulo: str, png: bytes, alto_px: int):
+    ancho = pdf.epw
+    alto = ancho * alto_px / (graficos_raster.ANCHO_PULGADAS * graficos_raster.DPI)
+    _titulo_seccion(pdf, titulo, alto)
+    pdf.image(io.BytesIO(png), w=ancho)
+
+
+def _tabla(pdf, filas: list):
+    pdf.set_font("Helvetica", "", 10)
+    ancho_etiqueta = pdf.epw * 0.5
+    for etiqueta, valor in filas:
+        pdf.cell(ancho_etiqueta, 6.5, etiqueta, border=1)
+        pdf.cell(0, 6.5, valor, border=1, new_x="LMARGIN", new_y="NEXT")
+
+
+def _generar(metricas, titulo, subtitulo, multiplicadores, dias_por_mes, scheme, tabla_anual) -> bytes:
+    perfil = np.asarray(metricas["potencia_horaria_ajustada"], dtype=np.float64)
+    n = len(perfil)
+    paso = horas_por_franja(n)
+    mascara_diurna = np.asarray(metricas["mascara_diurna"], dtype=bool)
+
+    pdf = _nuevo_documento()
+    pdf.set_margins(MARGEN_MM, MARGEN_MM, MARGEN_MM)
+    pdf.set_auto_page_break(True, margin=MARGEN_MM + 4)
+    titulo, subtitulo = _latin1(titulo), _latin1(subtitulo)
+    pdf.set_title(titulo)
+    pdf.add_page()
+
+    pdf.set_font("Helvetica", "B", 16)
+    pdf.cell(0, 9, titulo, new_x="LMARGIN", new_y="NEXT")
+    pdf.set_font("Helvetica", "", 9)
+    pdf.set_text_color(90)
+    generado = f"Generado el {datetime.datetime.now():%d/%m/%Y %H:%M}"
+    pdf.multi_cell(0, 5, f"{subtitulo}\n{generado}" if subtitulo else generado, new_x="LMARGIN", new_y="NEXT")
+
+    _titulo_seccion(pdf, "1. Métricas clave (ajustadas)")
+    _tabla(pdf, filas_metricas(metricas))
+
+    df_ldc = curva_duracion(perfil)
+    _imagen(pdf, "2. Cuadro de carga (LDC)", graficos_raster.linea(
+        df_ldc, "Duración (horas)", "Potencia Total (W)", titulo="Curva de Duración de Carga", alto_px=ALTO_GRAFICO_PX,
+    ), ALTO_GRAFICO_PX)
+
+    df_horario = pd.DataFrame({
+        "Hora": [formato_hora(h * paso) for h in range(n)],
+        "Potencia (W)": perfil,
+        "Segmento": np.where(mascara_diurna, "Diurno", "Nocturno"),
+    })
+    _imagen(pdf, "3. Potencia horaria diurna vs. nocturna", graficos_raster.barras(
+        df_horario, "Hora", "Potencia (W)", grupo="Segmento", colores=COLORES_SEGMENTO,
+        titulo="Perfil de consumo horario segmentado", alto_px=ALTO_GRAFICO_PX,
+    ), ALTO_GRAFICO_PX)
+
+    meses = list(dias_por_mes)
+    df_mensual = pd.DataFrame({"Mes": meses, "Energía (kWh)": metricas["energia_mensual_kwh"]})
+    _imagen(pdf, "4. Proyección de energía por mes", graficos_raster.barras(
+        df_mensual, "Mes", "Energía (kWh)", titulo="Energía mensual proyectada", alto_px=ALTO_GRAFICO_PX, media=True,
+    ), ALTO_GRAFICO_PX)
+
+    base = np.asarray(metricas["potencia_horaria"], dtype=np.float64)
+    _imagen(pdf, "5. Mapa de calor mensual", graficos_raster.heatmap(
+        tabla_mensual(base, multiplicadores, meses=meses), scheme, "Potencia por mes y hora (W)", "Mes",
+        alto_px=ALTO_HEATMAP_PX,
+    ), ALTO_HEATMAP_PX)
+    if tabla_anual is not None:
+        primeros = [f for f in tabla_anual.index if str(f).startswith("01/")]
+        _imagen(pdf, "6. Mapa de calor anual (día × hora)", graficos_raster.heatmap(
+            tabla_anual, scheme, "Potencia por día del año y hora (W)", "Fecha", alto_px=ALTO_HEATMAP_PX * 3 // 2,
+            marcas_y=primeros,
+        ), ALTO_HEATMAP_PX * 3 // 2)
+
+    return bytes(pdf.output())
+
+
+def informe_pdf(
+    metricas: dict,
+    titulo: str = "Informe de Cuadro de Carga",
+    subtitulo: str = "",
+    multiplicadores=None,
+    dias_por_mes=None,
+    scheme: str = "blues",
+    tabla_anual: pd.DataFrame = None,
+) -> bytes:
+    """
+    PDF paginado a partir de las métricas de motor.calcular_metricas (o del grafo de la pestaña 2,
+    con las mismas claves más 'mascara_diurna'). 'scheme': paleta de los mapas de calor (CB_PALETTES);
+    'tabla_anual': mapa día × hora opcional (matriz_heatmap.tabla_anual). Memoizado por huella.
+    """
+    dias_por_mes = DIAS_POR_MES if dias_por_mes is None else dias_por_mes
+    multiplicadores = normalizar_multiplicadores(multiplicadores, dias_por_mes)
+    claves = (metricas, titulo, subtitulo, multiplicadores, dias_por_mes, scheme, tabla_anual)
+    return _INFORMES.obtener_o_calcular(huella("informe_pdf", *claves), lambda: _generar(*claves))
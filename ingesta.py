@@ -0,0 +1,264 @@
+# ingesta.py
+# -*- coding: utf-8 -*-
+"""
+Lectura y normalización de tablas de carga (CSV / Excel).
+
+Misma lógica que la carga de archivos de la pestaña 1, sin Streamlit, para
+poder reutilizarla en procesos por lotes. Incluye un modo por bloques con
+tipos compactos para inventarios muy grandes.
+
+La resolución del horario (24, 48, 96 o 288 franjas) se detecta por los
+nombres de las columnas ('0'..'23' o 'H:MM'); ver motor_calculo.py.
+"""
+import datetime
+import glob
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from motor_calculo import COLUMNAS_HORAS, RESOLUCION_BASE, columnas_franjas, detectar_resolucion, remuestrear_horario
+
+# ======== COLUMNAS ========
+COLUMNAS = ["Item", "Carga", "Potencia (W)"] + COLUMNAS_HORAS
+EXTENSIONES = (".csv", ".xlsx")
+
+# Filas por bloque del modo por bloques (ver ingerir_por_bloques)
+TAMANO_BLOQUE = 100_000
+
+# Palabras iniciales del nombre de la carga que definen su categoría (ver categoria_por_nombre)
+PALABRAS_CATEGORIA = 1
+
+_PATRON_HORA = re.compile(r"^(\d{1,2}):(\d{2})(?::00)?$")
+
+
+def columnas_tabla(resolucion: int = RESOLUCION_BASE, item: bool = True) -> list:
+    """Columnas de la tabla de cargas para una resolución ('Item' opcional)."""
+    return (["Item"] if item else []) + ["Carga", "Potencia (W)"] + columnas_franjas(resolucion)
+
+
+def dtypes_compactos(resolucion: int = RESOLUCION_BASE) -> dict:
+    """Tipos compactos del modo por bloques: 1 byte por franja, float32 para potencia, Carga categórica."""
+    return {"Carga": "category", "Potencia (W)": "float32", **{h: "uint8" for h in columnas_franjas(resolucion)}}
+
+
+def nombre_columna(columna) -> str:
+    """Nombre de columna normalizado: las horas de Excel ('00:15:00', time(0, 15)) pasan a 'H:MM'."""
+    if isinstance(columna, (datetime.time, datetime.datetime)):
+        return f"{columna.hour}:{columna.minute:02d}"
+    texto = str(columna).strip()
+    coincidencia = _PATRON_HORA.match(texto)
+    if coincidencia:
+        return f"{int(coincidencia.group(1))}:{coincidencia.group(2)}"
+    return texto
+
+
+def categoria_por_nombre(cargas, palabras: int = PALABRAS_CATEGORIA) -> pd.Series:
+    """
+    Categoría de cada carga según las primeras 'palabras' de su nombre
+    ('Aire acondicionado rectoria' → 'Aire' con 1 palabra, 'Aire acondicionado' con 2).
+    """
+    nombres = pd.Series(cargas, dtype=object).fillna("").astype(str).str.strip()
+    return nombres.str.split().str[:max(int(palabras), 1)].str.join(" ").str.capitalize()
+
+
+def leer_crudo(archivo, nombre: str = None) -> pd.DataFrame:
+    """
+    Lee un CSV o XLSX (ruta o archivo subido) tal cual, sin normalizar.
+    'nombre' se usa para decidir el formato cuando 'archivo' no es una ruta.
+    """
+    nombre = nombre or getattr(archivo, "name", None) or str(archivo)
+    if nombre.lower().endswith(".csv"):
+        return pd.read_csv(archivo)
+    return pd.read_excel(archivo)
+
+
+def leer_tabla(archivo, nombre: str = None, resolucion: int = None) -> pd.DataFrame:
+    """
+    Lee un CSV o XLSX (ruta o archivo subido) y lo normaliza.
+    'resolucion': franjas por día de la tabla resultante (por defecto, la del archivo).
+    """
+    return normalizar_tabla(leer_crudo(archivo, nombre), resolucion=resolucion)
+
+
+def columnas_faltantes(columnas) -> list:
+    """
+    Columnas requeridas ('Carga', 'Potencia (W)' y un juego completo de franjas) que no están
+    en el encabezado crudo 'columnas'. Hay que comprobarlo antes de normalizar_tabla, que las rellena con 0.
+    """
+    presentes = {nombre_columna(c) for c in columnas}
+    return [c for c in columnas_tabla(detectar_resolucion(presentes), item=False) if c not in presentes]
+
+
+def normalizar_tabla(df: pd.DataFrame, resolucion: int = None) -> pd.DataFrame:
+    """
+    Fuerza 'Potencia (W)' numérica, agrega columnas faltantes con 0 y ordena las columnas (sin 'Item').
+    Si 'resolucion' difiere de la del archivo, el horario se remuestrea (ver remuestrear_tabla).
+    """
+    df = df.rename(columns=nombre_columna)
+    resolucion_archivo = detectar_resolucion(df.columns)
+
+    # FORZAR CONVERSIÓN NUMÉRICA DESPUÉS DE LA CARGA
+    if "Potencia (W)" in df.columns:
+        # Convertir a numérico; errores se convierten a NaN
+        df["Potencia (W)"] = pd.to_numeric(df["Potencia (W)"], errors='coerce')
+
+    # Preparamos las columnas para la fusión
+    for col in columnas_tabla(resolucion_archivo):
+        if col not in df.columns:
+            df[col] = 0
+
+    # Eliminamos la columna 'Item' si existe en el archivo cargado para evitar conflictos
+    if "Item" in df.columns:
+        df = df.drop(columns=["Item"])
+
+    # Garantizamos el orden de las columnas sin el Item temporalmente para el merge
+    if not df.empty:
+        df = df[columnas_tabla(resolucion_archivo, item=False)]
+    if resolucion and resolucion != resolucion_archivo:
+        df = remuestrear_tabla(df, resolucion)
+    return df
+
+
+def remuestrear_tabla(df: pd.DataFrame, resolucion: int) -> pd.DataFrame:
+    """Cambia la resolución del horario de una tabla (ver motor_calculo.remuestrear_horario)."""
+    origen = columnas_franjas(detectar_resolucion(df.columns))
+    destino = columnas_franjas(resolucion)
+    if origen == destino:
+        return df
+    horario = df[origen].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    franjas = pd.DataFrame(remuestrear_horario(horario, resolucion), index=df.index, columns=destino)
+    otras = [c for c in df.columns if c not in origen]
+    return pd.concat([df[otras], franjas], axis=1)
+
+
+def listar_archivos(entradas) -> list:
+    """Expande directorios y patrones glob a la lista ordenada de archivos CSV/XLSX."""
+    archivos = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            for raiz, _, nombres in os.walk(entrada):
+                archivos.extend(os.path.join(raiz, n) for n in nombres if n.lower().endswith(EXTENSIONES))
+        else:
+            archivos.extend(r for r in glob.glob(entrada, recursive=True) if r.lower().endswith(EXTENSIONES))
+    return sorted(set(archivos))
+
+
+# ---------- MODO POR BLOQUES (ARCHIVOS GRANDES) ----------
+
+def _bloques_excel(archivo, tamano_bloque: int):
+    """Recorre un XLSX fila a fila (openpyxl en modo solo lectura) y entrega DataFrames de 'tamano_bloque' filas."""
+    from openpyxl import load_workbook
+
+    libro = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        filas = libro.worksheets[0].iter_rows(values_only=True)
+        encabezado = [nombre_columna(c) if c is not None else "" for c in next(filas, ())]
+        bloque = []
+        for fila in filas:
+            bloque.append(fila)
+            if len(bloque) >= tamano_bloque:
+                yield pd.DataFrame(bloque, columns=encabezado)
+                bloque = []
+        if bloque:
+            yield pd.DataFrame(bloque, columns=encabezado)
+    finally:
+        libro.close()
+
+
+def filas_duplicadas(cargas: pd.Series) -> np.ndarray:
+    """
+    Filas (1 = primera) cuyo nombre de carga repite uno anterior (las vacías no cuentan).
+    Un archivo con cargas repetidas se rechaza entero, se lea completo o por bloques.
+    """
+    return np.flatnonzero(cargas.notna().to_numpy() & cargas.duplicated().to_numpy()) + 1
+
+
+def error_duplicada(fila: int) -> str:
+    return f"⚠️ Fila {fila}: carga duplicada."
+
+
+def leer_bloques(archivo, nombre: str = None, tamano_bloque: int = TAMANO_BLOQUE):
+    """Generador de bloques crudos (sin convertir) de un CSV o XLSX."""
+    nombre = nombre or getattr(archivo, "name", None) or str(archivo)
+    if nombre.lower().endswith(".csv"):
+        # Carga como texto para no inferir object/int64 en todo el archivo; se convierte por bloque
+        yield from pd.read_csv(archivo, chunksize=tamano_bloque, dtype={"Carga": str})
+    else:
+        yield from _bloques_excel(archivo, tamano_bloque)
+
+
+def convertir_bloque(bloque: pd.DataFrame) -> pd.DataFrame:
+    """Normaliza un bloque y convierte horas y potencia a numérico (NaN si no es convertible)."""
+    bloque = normalizar_tabla(bloque)
+    convertido = {"Carga": bloque["Carga"]}
+    convertido["Potencia (W)"] = pd.to_numeric(bloque["Potencia (W)"], errors="coerce")
+    for h in columnas_franjas(detectar_resolucion(bloque.columns)):
+        convertido[h] = pd.to_numeric(bloque[h], errors="coerce")
+    return pd.DataFrame(convertido, index=bloque.index)
+
+
+def compactar_bloque(bloque: pd.DataFrame) -> pd.DataFrame:
+    """Bloque ya validado → tipos compactos (uint8 / float32 / category)."""
+    return bloque.astype(dtypes_compactos(detectar_resolucion(bloque.columns)))
+
+
+def ingerir_por_bloques(archivo, nombre: str = None, tamano_bloque: int = TAMANO_BLOQUE, max_errores: int = 50) -> dict:
+    """
+    Lee un archivo grande por bloques, valida cada bloque al llegar y acumula
+    solo la versión compacta, junto con la potencia horaria parcial.
+    Devuelve {"datos", "errores", "filas", "potencia_horaria"}. Si hay errores,
+    se deja de acumular datos (pero se siguen reportando hasta 'max_errores').
+    Las cargas repetidas son un error, como en filas_duplicadas.
+    """
+    from validacion import validar_bloque
+
+    compactos = []
+    errores = []
+    huellas = []    # hash uint64 de cada nombre de carga (8 bytes/fila) para detectar duplicados
+    vacias = []     # nombres vacíos: se reportan como faltantes, no como duplicados
+    filas = 0
+    resolucion = RESOLUCION_BASE
+    perfil = None
+
+    for crudo in leer_bloques(archivo, nombre=nombre, tamano_bloque=tamano_bloque):
+        bloque = convertir_bloque(crudo)
+        if perfil is None:
+            # La resolución la fija el encabezado (igual en todos los bloques)
+            resolucion = detectar_resolucion(bloque.columns)
+            perfil = np.zeros(resolucion, dtype=np.float64)
+        errores.extend(validar_bloque(bloque, fila_inicial=filas, max_errores=max_errores - len(errores)))
+        huellas.append(pd.util.hash_pandas_object(bloque["Carga"].astype(str), index=False).to_numpy())
+        vacias.append(bloque["Carga"].isna().to_numpy())
+        filas += len(bloque)
+        if errores:
+            # Con errores ya no se acumulan datos; solo se siguen reportando problemas
+            compactos = []
+            if len(errores) >= max_errores:
+                break
+            continue
+
+        compacto = compactar_bloque(bloque)
+        perfil += compacto["Potencia (W)"].to_numpy(dtype=np.float64) @ compacto[columnas_franjas(resolucion)].to_numpy(dtype=np.float64)
+        compactos.append(compacto)
+
+    # Duplicados en todo el archivo (orden estable: se reporta la segunda aparición en adelante)
+    if huellas and len(errores) < max_errores:
+        todas = np.concatenate(huellas)
+        orden = np.argsort(todas, kind="stable")
+        repetidas = np.zeros(len(todas), dtype=bool)
+        repetidas[orden[1:]] = todas[orden[1:]] == todas[orden[:-1]]
+        repetidas &= ~np.concatenate(vacias)
+        for fila in (np.flatnonzero(repetidas) + 1)[: max_errores - len(errores)]:
+            errores.append(error_duplicada(fila))
+
+    if errores or not compactos:
+        datos = pd.DataFrame(columns=columnas_tabla(resolucion, item=False)).astype(dtypes_compactos(resolucion))
+    else:
+        cargas = pd.api.types.union_categoricals([c["Carga"] for c in compactos])
+        datos = pd.concat([c.drop(columns=["Carga"]) for c in compactos], ignore_index=True)
+        datos.insert(0, "Carga", cargas)
+    if perfil is None:
+        perfil = np.zeros(resolucion, dtype=np.float64)
+    return {"datos": datos, "errores": errores, "filas": filas, "potencia_horaria": perfil}
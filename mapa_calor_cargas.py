@@ -0,0 +1,146 @@
+# mapa_calor_cargas.py
+# -*- coding: utf-8 -*-
+"""
+Agregación en el servidor del mapa de calor carga × hora.
+
+Con miles de cargas no se puede (ni conviene) enviar N×n celdas al
+navegador. Aquí se reduce la tabla a unas pocas decenas de filas antes de
+graficar:
+- top-K cargas por energía diaria + una fila "Otras" con el resto,
+- suma por categoría (ver ingesta.categoria_por_nombre),
+- una página de la tabla ordenada por energía,
+- grupos de filas consecutivas (potencia media por carga del grupo).
+El resultado es una matriz filas×n (ver matriz_heatmap.py).
+
+Cada función acepta la tabla de cargas (DataFrame) o el almacén compacto
+(AlmacenCargas): con el almacén la energía por carga sale de un popcount de
+las máscaras y solo se desempaquetan las filas que se grafican.
+"""
+import numpy as np
+import pandas as pd
+
+import horario_bits
+from matriz_heatmap import tabla_heatmap
+from motor_calculo import columnas_franjas, detectar_resolucion
+
+MAX_FILAS_HEATMAP = 60
+
+
+def potencia_por_carga(df: pd.DataFrame):
+    """(nombres, matriz N×n de potencia en W, energía diaria por carga en Wh) de la tabla de cargas."""
+    n = detectar_resolucion(df.columns)
+    horario = df[columnas_franjas(n)].to_numpy(dtype=np.float32, na_value=0)
+    potencia = pd.to_numeric(df["Potencia (W)"], errors="coerce").fillna(0).to_numpy(dtype=np.float32)
+    matriz = horario * potencia[:, None]
+    energia = matriz.sum(axis=1, dtype=np.float64) * (24 / n)
+    return df["Carga"].astype(str).to_numpy(dtype=object), matriz, energia
+
+
+def _componentes(cargas):
+    """
+    (nombres, energía diaria por carga en Wh, filas → matriz de potencia de esas cargas,
+    máscara booleana → suma de potencia de esas cargas como matriz 1×n) de 'cargas'.
+    """
+    if isinstance(cargas, pd.DataFrame):
+        nombres, matriz, energia = potencia_por_carga(cargas)
+        return nombres, energia, lambda filas: matriz[filas], lambda cuales: matriz[cuales].sum(axis=0, keepdims=True)
+    mascaras, potencia = cargas.mascaras()
+    potencia = np.nan_to_num(potencia)
+
+    def potencia_de(filas):
+        return horario_bits.desempaquetar(mascaras[filas], dtype=np.float32) * potencia[filas, None].astype(np.float32)
+
+    def suma_de(cuales):
+        return horario_bits.potencia_horaria(mascaras[cuales], potencia[cuales])[None, :]
+
+    nombres = cargas.nombres().astype(str)
+    return nombres, horario_bits.energia_por_carga(mascaras, potencia), potencia_de, suma_de
+
+
+def nombres_cargas(cargas) -> np.ndarray:
+    """Nombres de las cargas (tabla o almacén) en su orden."""
+    return cargas["Carga"].to_numpy(dtype=object) if isinstance(cargas, pd.DataFrame) else cargas.nombres()
+
+
+def _orden_por_energia(energia: np.ndarray) -> np.ndarray:
+    return np.argsort(-energia, kind="stable")
+
+
+def _como_tabla(matriz: np.ndarray, etiquetas) -> pd.DataFrame:
+    return tabla_heatmap(matriz, etiquetas, nombre_filas="Carga")
+
+
+def top_k_y_otras(cargas, k: int) -> pd.DataFrame:
+    """Las K cargas de mayor energía diaria y una fila 'Otras (M cargas)' con la suma del resto."""
+    nombres, energia, potencia_de, suma_de = _componentes(cargas)
+    k = min(max(int(k), 1), len(nombres))
+    if k < len(nombres):
+        top = np.argpartition(-energia, k - 1)[:k]
+        top = top[_orden_por_energia(energia[top])]
+    else:
+        top = _orden_por_energia(energia)
+    resto = np.ones(len(nombres), dtype=bool)
+    resto[top] = False
+    filas, etiquetas = [potencia_de(top)], list(nombres[top])
+    if resto.any():
+        filas.append(suma_de(resto))
+        etiquetas.append(f"Otras ({int(resto.sum()):,} cargas)")
+    return _como_tabla(np.concatenate(filas), etiquetas)
+
+
+def por_categoria(cargas, categorias, max_filas: int = MAX_FILAS_HEATMAP) -> pd.DataFrame:
+    """
+    Suma de potencia por categoría, ordenada por energía diaria (entre paréntesis, el número de cargas).
+    Si hay más de 'max_filas' categorías, las menores se juntan en 'Otras categorías'.
+    """
+    nombres, _, potencia_de, _ = _componentes(cargas)
+    matriz = potencia_de(np.arange(len(nombres)))
+    codigos, niveles = pd.factorize(pd.Series(categorias, dtype=object).fillna("").to_numpy())
+    suma = np.zeros((len(niveles), matriz.shape[1]), dtype=np.float64)
+    np.add.at(suma, codigos, matriz)
+    subtotales = pd.DataFrame(suma, index=niveles, columns=columnas_franjas(matriz.shape[1]))
+    subtotales.insert(0, "Cargas", np.bincount(codigos, minlength=len(niveles)))
+    return tabla_categorias(subtotales, max_filas)
+
+
+def tabla_categorias(subtotales: pd.DataFrame, max_filas: int = MAX_FILAS_HEATMAP) -> pd.DataFrame:
+    """
+    Mapa por categoría a partir de subtotales ya sumados (una fila por categoría: 'Cargas' y
+    las franjas; p.ej. AlmacenCargas.subtotales_categoria), sin recorrer las cargas.
+    """
+    niveles = subtotales.index.to_numpy()
+    conteo = subtotales["Cargas"].to_numpy()
+    suma = subtotales.drop(columns="Cargas").to_numpy(dtype=np.float64)
+    # La energía diaria es proporcional a la suma de las franjas
+    orden = _orden_por_energia(suma.sum(axis=1))
+    etiquetas = [f"{niveles[c] or 'Sin categoría'} ({conteo[c]:,})" for c in orden[:max_filas]]
+    filas = [suma[orden[:max_filas]]]
+    if len(orden) > max_filas:
+        filas.append(suma[orden[max_filas:]].sum(axis=0, keepdims=True))
+        etiquetas.append(f"Otras categorías ({int(conteo[orden[max_filas:]].sum()):,})")
+    return _como_tabla(np.concatenate(filas), etiquetas)
+
+
+def pagina_cargas(cargas, pagina: int = 1, tamano: int = MAX_FILAS_HEATMAP) -> pd.DataFrame:
+    """Página 'pagina' (1 = primera) de las cargas ordenadas por energía diaria."""
+    nombres, energia, potencia_de, _ = _componentes(cargas)
+    orden = _orden_por_energia(energia)
+    inicio = (max(int(pagina), 1) - 1) * tamano
+    filas = orden[inicio:inicio + tamano]
+    return _como_tabla(potencia_de(filas), nombres[filas])
+
+
+def agrupar_filas(cargas, filas_por_grupo: int) -> pd.DataFrame:
+    """
+    Cargas ordenadas por energía en grupos de 'filas_por_grupo' consecutivas;
+    cada fila es la potencia media por carga del grupo ('Cargas 1–50', ...).
+    """
+    _, energia, potencia_de, _ = _componentes(cargas)
+    orden = _orden_por_energia(energia)
+    tamano = max(int(filas_por_grupo), 1)
+    inicios = np.arange(0, len(orden), tamano)
+    matriz = potencia_de(orden)
+    suma = np.add.reduceat(matriz, inicios, axis=0) if len(orden) else matriz
+    conteo = np.diff(np.append(inicios, len(orden)))
+    etiquetas = [f"Cargas {i + 1:,}–{i + c:,}" for i, c in zip(inicios, conteo)]
+    return _como_tabla(suma / conteo[:, None], etiquetas)
@@ -0,0 +1,66 @@
+# matriz_heatmap.py
+# -*- coding: utf-8 -*-
+"""
+Constructor vectorizado de las matrices de los mapas de calor.
+
+La matriz mes × hora es un producto exterior (multiplicadores × perfil
+horario) y se arma de una vez para cualquier número de meses, años o sitios
+(las dimensiones iniciales se propagan por broadcasting). El mismo formato
+sirve para el mapa anual día × hora (8760 celdas) y para apilar sitios.
+"""
+import numpy as np
+import pandas as pd
+
+from motor_calculo import ORDEN_MESES, columnas_franjas
+
+
+def matriz_estacional(perfiles, factores) -> np.ndarray:
+    """
+    Producto exterior factores × perfil: (..., F) × (..., n) → (..., F, n).
+    Con un perfil (n) y 12 multiplicadores da la matriz 12×n; con S sitios
+    (S×n y S×F, o F común) da S×F×n.
+    """
+    perfiles = np.asarray(perfiles, dtype=np.float64)
+    factores = np.asarray(factores, dtype=np.float64)
+    return factores[..., :, None] * perfiles[..., None, :]
+
+
+def tabla_heatmap(matriz, filas, columnas=None, nombre_filas: str = "Fila") -> pd.DataFrame:
+    """Matriz filas×n → DataFrame con las etiquetas de filas y las franjas como columnas."""
+    matriz = np.asarray(matriz)
+    columnas = columnas_franjas(matriz.shape[1]) if columnas is None else columnas
+    return pd.DataFrame(matriz, index=pd.Index(filas, name=nombre_filas), columns=columnas)
+
+
+def tabla_mensual(perfil, multiplicadores: dict = None, meses=ORDEN_MESES) -> pd.DataFrame:
+    """Mapa mes × franja: potencia del perfil escalada por el multiplicador de cada mes."""
+    multiplicadores = multiplicadores or {}
+    factores = [multiplicadores.get(mes, 1.0) for mes in meses]
+    return tabla_heatmap(matriz_estacional(perfil, factores), list(meses), nombre_filas="Mes")
+
+
+def tabla_anual(perfil_anual: np.ndarray, cal: pd.DataFrame) -> pd.DataFrame:
+    """Mapa día del año × franja (365/366 filas 'DD/MM') a partir del perfil anual días×n."""
+    return tabla_heatmap(perfil_anual, cal["Fecha"].dt.strftime("%d/%m").tolist(), nombre_filas="Fecha")
+
+
+def apilar_sitios(tablas: dict) -> pd.DataFrame:
+    """{sitio: tabla filas×n} → una tabla con índice (Sitio, fila) para graficar varios sitios juntos."""
+    return pd.concat(tablas, names=["Sitio"])
+
+
+def valores_compactos(tabla: pd.DataFrame) -> list:
+    """
+    Tabla filas×n → registros {'c': fila, 'h': franja, 'w': W redondeado} para Vega-Lite
+    (con 's': sitio si el índice es (Sitio, fila)).
+    Claves de una letra y enteros: un JSON varias veces menor que el del 'melt' completo.
+    """
+    filas, franjas = tabla.shape
+    valores = np.rint(tabla.to_numpy(dtype=np.float64)).astype(np.int64).ravel().tolist()
+    columnas = np.tile(np.asarray(tabla.columns, dtype=object), filas).tolist()
+    if tabla.index.nlevels == 2:
+        sitios = np.repeat(tabla.index.get_level_values(0).to_numpy(dtype=object), franjas).tolist()
+        etiquetas = np.repeat(tabla.index.get_level_values(1).to_numpy(dtype=object), franjas).tolist()
+        return [{"s": s, "c": c, "h": h, "w": w} for s, c, h, w in zip(sitios, etiquetas, columnas, valores)]
+    etiquetas = np.repeat(tabla.index.to_numpy(dtype=object), franjas).tolist()
+    return [{"c": c, "h": h, "w": w} for c, h, w in zip(etiquetas, columnas, valores)]
@@ -0,0 +1,304 @@
+# motor_calculo.py
+# -*- coding: utf-8 -*-
+"""
+Motor de cálculo del cuadro de carga (sin dependencia de Streamlit).
+
+Recibe la matriz de horarios N×n, el vector de potencias, la ventana diurna y
+los 12 multiplicadores mensuales, y devuelve todas las métricas de la pestaña
+de análisis (base y ajustadas) a partir de un único producto matriz-vector.
+
+El día se divide en n franjas (24, 48, 96 o 288: 60, 30, 15 o 5 minutos).
+Con 24 franjas las columnas se llaman '0'..'23'; con resoluciones
+subhorarias, 'H:MM' ('0:00', '0:15', ...). Las horas de inicio/fin de los
+segmentos y las horas de los picos se expresan siempre en horas.
+"""
+import numpy as np
+import pandas as pd
+
+import horario_bits
+
+# ======== CONSTANTES ========
+RESOLUCIONES = (24, 48, 96, 288)
+RESOLUCION_BASE = 24
+
+
+def columnas_franjas(n_franjas: int = RESOLUCION_BASE) -> list:
+    """Nombres de las columnas de horario: '0'..'23' o 'H:MM' para resoluciones subhorarias."""
+    if n_franjas not in RESOLUCIONES:
+        raise ValueError(f"Resolución no soportada: {n_franjas} franjas (use {', '.join(map(str, RESOLUCIONES))}).")
+    if n_franjas == RESOLUCION_BASE:
+        return [f"{i}" for i in range(24)]
+    minutos = 24 * 60 // n_franjas
+    return [f"{(k * minutos) // 60}:{(k * minutos) % 60:02d}" for k in range(n_franjas)]
+
+
+COLUMNAS_HORAS = columnas_franjas(RESOLUCION_BASE)
+
+# Días por mes (año no bisiesto, igual que la proyección de la pestaña 2)
+DIAS_POR_MES = {
+    "Enero": 31, "Febrero": 28, "Marzo": 31, "Abril": 30, "Mayo": 31, "Junio": 30,
+    "Julio": 31, "Agosto": 31, "Septiembre": 30, "Octubre": 31, "Noviembre": 30, "Diciembre": 31
+}
+ORDEN_MESES = list(DIAS_POR_MES.keys())
+
+
+# ---------- UTILIDADES ----------
+
+def detectar_resolucion(columnas) -> int:
+    """Resolución (franjas por día) de una tabla según sus columnas; 24 si no hay otra completa."""
+    presentes = set(map(str, columnas))
+    for n in sorted(RESOLUCIONES, reverse=True):
+        if n != RESOLUCION_BASE and presentes.issuperset(columnas_franjas(n)):
+            return n
+    return RESOLUCION_BASE
+
+
+def horas_por_franja(n_franjas: int = RESOLUCION_BASE):
+    """Duración de una franja en horas (1 para la resolución horaria)."""
+    return 24 // n_franjas if 24 % n_franjas == 0 else 24 / n_franjas
+
+
+def formato_hora(horas) -> str:
+    """Hora decimal → 'HH:MM' (p.ej. 13.25 → '13:15')."""
+    minutos = int(round(float(horas) * 60))
+    return f"{minutos // 60:02d}:{minutos % 60:02d}"
+
+
+def remuestrear_horario(horario, n_destino: int) -> np.ndarray:
+    """
+    Cambia la resolución de una matriz N×n de horarios.
+    Al refinar, cada franja se repite; al agrupar, la franja resultante queda
+    encendida si lo estaba al menos la mitad del tiempo (redondeo de la media).
+    Los grupos con valores que no son 0/1 conservan la media (o NaN) para que
+    la validación los siga reportando.
+    """
+    matriz = np.asarray(horario)
+    n_origen = matriz.shape[1]
+    if n_destino == n_origen:
+        return matriz
+    if n_destino > n_origen:
+        return np.repeat(matriz, n_destino // n_origen, axis=1)
+    grupos = matriz.reshape(len(matriz), n_destino, n_origen // n_destino).astype(np.float64)
+    media = grupos.mean(axis=2)
+    binarios = ((grupos == 0) | (grupos == 1)).all(axis=2)
+    resultado = np.where(binarios, (media >= 0.5).astype(np.float64), media)
+    return resultado.astype(matriz.dtype) if binarios.all() else resultado
+
+
+def get_horas_segmento(inicio, fin, n_franjas: int = RESOLUCION_BASE) -> list:
+    """Calcula las columnas de franjas para el segmento (incluso si cruza la medianoche)."""
+    columnas = columnas_franjas(n_franjas)
+    paso = horas_por_franja(n_franjas)
+    k_inicio, k_fin = int(np.ceil(inicio / paso)), int(np.ceil(fin / paso))
+    if inicio < fin:
+        # Caso normal: 07:00 a 19:00
+        return columnas[k_inicio:k_fin]
+    # Caso cruce de medianoche: 22:00 a 06:00 (22, 23, 0, 1, ..., 5)
+    return columnas[k_inicio:] + columnas[:k_fin]
+
+
+def mascara_segmento(inicio, fin, n_horas: int = RESOLUCION_BASE) -> np.ndarray:
+    """
+    Máscara booleana de longitud n (franjas) con las franjas del segmento [inicio, fin) en horas
+    (la misma ventana que horario_bits.mascara_segmento_bits, desempaquetada).
+    """
+    return horario_bits.segmento_booleano(horario_bits.mascara_segmento_bits(inicio, fin, n_horas), n_horas)
+
+
+def como_matrices(horario, potencia):
+    """Convierte horario y potencia a arreglos float64 contiguos."""
+    if isinstance(horario, pd.DataFrame):
+        horario = horario[columnas_franjas(detectar_resolucion(horario.columns))].to_numpy()
+    matriz = np.ascontiguousarray(horario, dtype=np.float64)
+    vector = np.ascontiguousarray(potencia, dtype=np.float64).reshape(-1)
+    if matriz.ndim != 2 or matriz.shape[1] not in RESOLUCIONES:
+        raise ValueError("La matriz de horarios debe tener forma N×24 (o N×48, N×96, N×288).")
+    if matriz.shape[0] != vector.shape[0]:
+        raise ValueError("La matriz de horarios y el vector de potencias deben tener el mismo número de cargas.")
+    return matriz, vector
+
+
+def es_compacto(horario) -> bool:
+    """True si 'horario' es un vector de máscaras de bits (ver horario_bits.py) en vez de una matriz N×n."""
+    return isinstance(horario, np.ndarray) and horario.ndim == 1 and horario.dtype.kind in "iuV"
+
+
+def como_compacto(horario, potencia):
+    """Convierte horario y potencia a (máscaras, potencia float64): 4 bytes por carga (n/8 si es subhorario)."""
+    if es_compacto(horario):
+        return horario, np.ascontiguousarray(potencia, dtype=np.float64).reshape(-1)
+    matriz, vector = como_matrices(horario, potencia)
+    return horario_bits.empaquetar(matriz), vector
+
+
+def potencia_horaria(horario, potencia) -> np.ndarray:
+    """
+    Potencia total por franja (W): producto potencia · horario (una sola pasada).
+    'horario' puede ser la matriz N×n o el vector de máscaras de bits.
+    """
+    if es_compacto(horario):
+        return horario_bits.potencia_horaria(horario, potencia)
+    matriz, vector = como_matrices(horario, potencia)
+    return vector @ matriz
+
+
+# ---------- MÉTRICAS ----------
+
+def metricas_perfil(perfil: np.ndarray, mascara_diurna: np.ndarray, sufijo: str = "", sufijo_factor: str = "") -> dict:
+    """
+    Métricas de potencia, energía y factor de carga de un perfil diario de n franjas.
+    Las horas de los picos se devuelven en horas (int con 24 franjas, decimales si es subhorario).
+    """
+    paso = horas_por_franja(len(perfil))
+    mascara_nocturna = ~mascara_diurna
+    # Duración de cada segmento en horas
+    num_diurnas = int(mascara_diurna.sum()) * paso
+    num_nocturnas = int(mascara_nocturna.sum()) * paso
+
+    energia_diurna = float(perfil[mascara_diurna].sum()) * paso / 1000.0
+    energia_nocturna = float(perfil[mascara_nocturna].sum()) * paso / 1000.0
+    energia_total = energia_diurna + energia_nocturna
+
+    potencia_max = float(perfil.max())
+    potencia_min = float(perfil.min())
+    potencia_media = (energia_total * 1000) / 24
+
+    def _segmento(mascara, num, energia):
+        # Devuelve (media, pico, hora del pico) del segmento o ceros / 'N/A' si está vacío
+        if num == 0:
+            return 0, 0, 'N/A'
+        horas = np.flatnonzero(mascara)
+        if mascara[0] and not mascara.all():
+            # Segmento que cruza la medianoche: se recorre desde su inicio (igual que get_horas_segmento),
+            # para que en empate gane la primera franja del segmento y no la más temprana del día
+            horas = np.roll(horas, -int(np.searchsorted(horas, np.flatnonzero(~mascara)[-1] + 1)))
+        idx = int(np.argmax(perfil[horas]))
+        return (energia * 1000) / num, float(perfil[horas[idx]]), int(horas[idx]) * paso
+
+    media_diurna, max_diurna, hora_max_diurna = _segmento(mascara_diurna, num_diurnas, energia_diurna)
+    media_nocturna, max_nocturna, hora_max_nocturna = _segmento(mascara_nocturna, num_nocturnas, energia_nocturna)
+
+    def _factor(media, pico):
+        return (media / pico) * 100 if pico > 0 else 0
+
+    s, sf = sufijo, sufijo_factor
+    return {
+        f"energia_diurna_dia{s}": energia_diurna,
+        f"energia_nocturna_dia{s}": energia_nocturna,
+        f"energia_total_dia{s}": energia_total,
+        f"potencia_max_w{s}": potencia_max,
+        f"hora_max{s}": int(np.argmax(perfil)) * paso,
+        f"potencia_min_w{s}": potencia_min,
+        f"hora_min{s}": int(np.argmin(perfil)) * paso,
+        f"potencia_media_total_w{s}": potencia_media,
+        f"potencia_media_diurna_w{s}": media_diurna,
+        f"potencia_max_diurna_w{s}": max_diurna,
+        f"hora_max_diurna{s}": hora_max_diurna,
+        f"potencia_media_nocturna_w{s}": media_nocturna,
+        f"potencia_max_nocturna_w{s}": max_nocturna,
+        f"hora_max_nocturna{s}": hora_max_nocturna,
+        f"factor_carga_general{sf}": _factor(potencia_media, potencia_max),
+        f"factor_carga_diurno{sf}": _factor(media_diurna, max_diurna),
+        f"factor_carga_nocturno{sf}": _factor(media_nocturna, max_nocturna),
+    }
+
+
+def normalizar_multiplicadores(multiplicadores=None, dias_por_mes=None) -> dict:
+    """Devuelve un dict {mes: factor} completo (1.0 para los meses que falten)."""
+    meses = list((DIAS_POR_MES if dias_por_mes is None else dias_por_mes).keys())
+    if multiplicadores is None:
+        return {mes: 1.0 for mes in meses}
+    if not isinstance(multiplicadores, dict):
+        multiplicadores = dict(zip(meses, multiplicadores))
+    return {mes: float(multiplicadores.get(mes, 1.0)) for mes in meses}
+
+
+def proyeccion_mensual(
+    energia_total_dia: float,
+    energia_diurna_dia: float,
+    energia_nocturna_dia: float,
+    multiplicadores=None,
+    dias_por_mes=None,
+) -> dict:
+    """Energía mensual y anual (kWh) a partir de la energía diaria base (vectorizada sobre los meses)."""
+    dias_por_mes = DIAS_POR_MES if dias_por_mes is None else dias_por_mes
+    multiplicadores = normalizar_multiplicadores(multiplicadores, dias_por_mes)
+    dias = np.array(list(dias_por_mes.values()), dtype=np.float64)
+    factores = np.array([multiplicadores[mes] for mes in dias_por_mes], dtype=np.float64)
+    peso = dias * factores
+    energia_mensual = peso * energia_total_dia
+    return {
+        "energia_mensual_kwh": energia_mensual,
+        "energia_anual_kwh": float(energia_mensual.sum()),
+        "energia_anual_diurna": float(peso.sum() * energia_diurna_dia),
+        "energia_anual_nocturna": float(peso.sum() * energia_nocturna_dia),
+        "total_dias_anual": int(dias.sum()),
+    }
+
+
+def curva_duracion(perfil: np.ndarray, paso_horas=None) -> pd.DataFrame:
+    """
+    Cuadro de carga (LDC): perfil ordenado de mayor a menor con su duración en horas.
+    'paso_horas': duración de cada valor (por defecto, la de un perfil diario de len(perfil) franjas).
+    """
+    ordenado = np.sort(np.asarray(perfil, dtype=np.float64))[::-1]
+    paso_horas = horas_por_franja(len(ordenado)) if paso_horas is None else paso_horas
+    return pd.DataFrame({
+        "Potencia Total (W)": ordenado,
+        "Duración (horas)": np.arange(1, len(ordenado) + 1) * paso_horas,
+    })
+
+
+def calcular_metricas(
+    horario,
+    potencia,
+    diurno_inicio: int = 6,
+    diurno_fin: int = 18,
+    multiplicadores=None,
+    mes_referencia: str = "Enero",
+    dias_por_mes=None,
+) -> dict:
+    """
+    Calcula todas las métricas del cuadro de carga.
+    - 'horario': matriz N×n de 0/1 (o DataFrame con columnas '0'..'23' o 'H:MM'),
+      o vector de máscaras de bits (forma compacta).
+    - 'potencia': vector de N potencias (W).
+    - 'multiplicadores': dict {mes: factor} o secuencia de 12 factores.
+    Devuelve un diccionario con los mismos nombres que usa la pestaña 2
+    (base y '_ajustada'/'_ajustado'), más la proyección mensual y anual.
+    """
+    dias_por_mes = DIAS_POR_MES if dias_por_mes is None else dias_por_mes
+    multiplicadores = normalizar_multiplicadores(multiplicadores, dias_por_mes)
+
+    perfil = potencia_horaria(horario, potencia)
+    paso = horas_por_franja(len(perfil))
+    # Ventana diurna como máscara de bits: sus franjas salen de un popcount
+    segmento_diurno = horario_bits.mascara_segmento_bits(diurno_inicio, diurno_fin, len(perfil))
+    mascara_diurna = horario_bits.segmento_booleano(segmento_diurno, len(perfil))
+    franjas_diurnas = horario_bits.franjas_segmento(segmento_diurno, len(perfil))
+    multiplicador_actual = float(multiplicadores.get(mes_referencia, 1.0))
+
+    resultado = {
+        "potencia_horaria": perfil,
+        "resolucion": len(perfil),
+        "mascara_diurna": mascara_diurna,
+        "num_horas_diurnas": franjas_diurnas * paso,
+        "num_horas_nocturnas": (len(perfil) - franjas_diurnas) * paso,
+        "multiplicador_actual": multiplicador_actual,
+    }
+    resultado.update(metricas_perfil(perfil, mascara_diurna))
+
+    # El ajuste es un escalado del perfil base (n valores), no se recalcula N×n
+    perfil_ajustado = perfil * multiplicador_actual
+    resultado["potencia_horaria_ajustada"] = perfil_ajustado
+    resultado.update(metricas_perfil(perfil_ajustado, mascara_diurna, sufijo="_ajustada", sufijo_factor="_ajustado"))
+
+    # Proyección mensual y anual
+    resultado.update(proyeccion_mensual(
+        resultado["energia_total_dia"],
+        resultado["energia_diurna_dia"],
+        resultado["energia_nocturna_dia"],
+        multiplicadores,
+        dias_por_mes,
+    ))
+    return resultado
@@ -0,0 +1,222 @@
+# procesamiento_lote.py
+# -*- coding: utf-8 -*-
+"""
+Procesamiento por lotes de tablas de carga (CSV / XLSX) desde la línea de comandos.
+
+Cada archivo pasa por la misma lectura, validación y métricas que la aplicación
+Streamlit, repartidos en un pool de procesos. Se genera una tabla consolidada
+de resultados (CSV o Parquet), un CSV con la curva LDC de cada archivo y,
+con --pdf, un informe PDF por archivo (ver informe_pdf.py).
+
+Uso:
+    python procesamiento_lote.py datos/ "campaña/**/*.xlsx" -o resultados --workers 8 --pdf
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from ingesta import columnas_faltantes, columnas_tabla, leer_crudo, listar_archivos, normalizar_tabla
+from motor_calculo import ORDEN_MESES, RESOLUCIONES, calcular_metricas, columnas_franjas, curva_duracion, detectar_resolucion
+from validacion import validar_datos
+
+# Métricas que se copian a la tabla consolidada (mismos nombres que la pestaña 2)
+METRICAS_RESUMEN = [
+    "energia_total_dia", "energia_diurna_dia", "energia_nocturna_dia",
+    "potencia_max_w_ajustada", "hora_max_ajustada",
+    "potencia_min_w_ajustada", "hora_min_ajustada",
+    "potencia_max_diurna_w_ajustada", "hora_max_diurna_ajustada",
+    "potencia_max_nocturna_w_ajustada", "hora_max_nocturna_ajustada",
+    "potencia_media_total_w_ajustada", "potencia_media_diurna_w_ajustada", "potencia_media_nocturna_w_ajustada",
+    "factor_carga_general_ajustado", "factor_carga_diurno_ajustado", "factor_carga_nocturno_ajustado",
+    "energia_anual_kwh", "energia_anual_diurna", "energia_anual_nocturna",
+]
+
+
+def _nombre_salida(ruta: str, raiz: str, sufijo: str = "_ldc.csv") -> str:
+    """Nombre plano y único para un archivo de salida de 'ruta' (relativo a la raíz común)."""
+    relativa = os.path.relpath(ruta, raiz) if raiz else os.path.basename(ruta)
+    base = os.path.splitext(relativa)[0]
+    return base.replace(os.sep, "__").replace("/", "__") + sufijo
+
+
+def _texto_faltantes(faltantes: list, max_columnas: int = 6) -> str:
+    """'❌ Faltan columnas requeridas: ...' (las franjas se abrevian si faltan muchas)."""
+    texto = ", ".join(faltantes[:max_columnas])
+    if len(faltantes) > max_columnas:
+        texto += f" y {len(faltantes) - max_columnas} más"
+    return f"❌ Faltan columnas requeridas: {texto}."
+
+
+def procesar_archivo(ruta: str, parametros: dict) -> dict:
+    """
+    Lee, valida y calcula las métricas de un archivo.
+    Nunca lanza excepciones: el resultado indica 'Estado' = ok / invalido / error.
+    """
+    inicio = time.perf_counter()
+    fila = {"Archivo": ruta, "Estado": "ok", "Errores": "", "Cargas": 0}
+    try:
+        crudo = leer_crudo(ruta)
+        # Antes de normalizar: normalizar_tabla rellena con 0 las columnas que falten
+        faltantes = columnas_faltantes(crudo.columns)
+        df = normalizar_tabla(crudo, resolucion=parametros.get("resolucion"))
+        resolucion = detectar_resolucion(df.columns)
+        fila.update({"Cargas": len(df), "Franjas": resolucion})
+        if faltantes:
+            errores = [_texto_faltantes(faltantes)]
+        elif df.empty:
+            errores = ["No hay datos para validar."]
+        else:
+            errores = validar_datos(df, columnas=columnas_tabla(resolucion, item=False))
+        if errores:
+            fila.update({"Estado": "invalido", "Errores": " | ".join(errores)})
+        else:
+            metricas = calcular_metricas(
+                df[columnas_franjas(resolucion)],
+                df["Potencia (W)"],
+                diurno_inicio=parametros["diurno_inicio"],
+                diurno_fin=parametros["diurno_fin"],
+                multiplicadores=parametros["multiplicadores"],
+                mes_referencia=parametros["mes_referencia"],
+            )
+            fila.update({k: metricas[k] for k in METRICAS_RESUMEN})
+
+            if parametros.get("dir_ldc"):
+                df_ldc = curva_duracion(metricas["potencia_horaria_ajustada"])
+                destino = os.path.join(parametros["dir_ldc"], _nombre_salida(ruta, parametros.get("raiz")))
+                df_ldc.to_csv(destino, index=False)
+                fila["LDC"] = destino
+
+            if parametros.get("dir_pdf"):
+                # Importación diferida: matplotlib y fpdf2 solo se cargan si se piden informes
+                from informe_pdf import informe_pdf
+
+                destino = os.path.join(parametros["dir_pdf"], _nombre_salida(ruta, parametros.get("raiz"), "_informe.pdf"))
+                pdf = informe_pdf(
+                    metricas,
+                    titulo=f"Informe de Cuadro de Carga: {os.path.basename(ruta)}",
+                    subtitulo=f"Mes de referencia: {parametros['mes_referencia']} (x{metricas['multiplicador_actual']:.2f})",
+                    multiplicadores=parametros["multiplicadores"],
+                )
+                with open(destino, "wb") as f:
+                    f.write(pdf)
+                fila["PDF"] = destino
+    except Exception as e:
+        fila.update({"Estado": "error", "Errores": f"{type(e).__name__}: {e}"})
+    fila["Segundos"] = round(time.perf_counter() - inicio, 4)
+    return fila
+
+
+def procesar_lote(archivos, parametros: dict, workers: int = None, progreso=None) -> pd.DataFrame:
+    """
+    Procesa 'archivos' en paralelo y devuelve la tabla consolidada.
+    'progreso(i, total, fila)' se llama cada vez que termina un archivo.
+    """
+    filas = []
+    total = len(archivos)
+    if workers == 1:
+        # Sin pool: útil para depurar y para lotes pequeños
+        for i, ruta in enumerate(archivos, start=1):
+            fila = procesar_archivo(ruta, parametros)
+            filas.append(fila)
+            if progreso:
+                progreso(i, total, fila)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futuros = [pool.submit(procesar_archivo, ruta, parametros) for ruta in archivos]
+            for i, futuro in enumerate(as_completed(futuros), start=1):
+                fila = futuro.result()
+                filas.append(fila)
+                if progreso:
+                    progreso(i, total, fila)
+
+    columnas = ["Archivo", "Estado", "Errores", "Cargas", "Franjas"] + METRICAS_RESUMEN + ["LDC", "PDF", "Segundos"]
+    resultados = pd.DataFrame(filas).reindex(columns=columnas)
+    return resultados.sort_values("Archivo").reset_index(drop=True)
+
+
+def _leer_multiplicadores(texto: str) -> dict:
+    """'1.1' (general) o 12 valores separados por comas (Enero..Diciembre)."""
+    if not texto:
+        return {mes: 1.0 for mes in ORDEN_MESES}
+    valores = [float(v) for v in texto.split(",")]
+    if len(valores) == 1:
+        valores = valores * len(ORDEN_MESES)
+    if len(valores) != len(ORDEN_MESES):
+        raise argparse.ArgumentTypeError("Se esperan 1 o 12 multiplicadores separados por comas.")
+    return dict(zip(ORDEN_MESES, valores))
+
+
+def _imprimir_progreso(i: int, total: int, fila: dict):
+    detalle = f" — {fila['Errores']}" if fila["Estado"] != "ok" else ""
+    print(f"[{i}/{total}] {fila['Estado']:<8} {fila['Archivo']} ({fila['Segundos']:.2f} s){detalle}", file=sys.stderr)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Cuadro de carga por lotes: valida y analiza tablas CSV/XLSX en paralelo.")
+    parser.add_argument("entradas", nargs="+", help="Directorios, archivos o patrones glob (p.ej. 'datos/**/*.csv').")
+    parser.add_argument("-o", "--salida", default="resultados_lote", help="Directorio de salida.")
+    parser.add_argument("--formato", choices=["csv", "parquet"], default="csv", help="Formato de la tabla consolidada.")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos en paralelo (por defecto: núcleos disponibles).")
+    parser.add_argument("--diurno-inicio", type=int, default=6, help="Hora de inicio del período diurno (0-23).")
+    parser.add_argument("--diurno-fin", type=int, default=18, help="Hora de fin del período diurno (0-23).")
+    parser.add_argument("--mes-referencia", choices=ORDEN_MESES, default="Enero", help="Mes de referencia para las métricas ajustadas.")
+    parser.add_argument("--multiplicadores", type=_leer_multiplicadores, default=None,
+                        help="Multiplicador general o 12 multiplicadores mensuales separados por comas.")
+    parser.add_argument("--resolucion", type=int, choices=RESOLUCIONES, default=None,
+                        help="Franjas por día para todos los archivos (por defecto, la de cada archivo).")
+    parser.add_argument("--sin-ldc", action="store_true", help="No escribir el CSV de LDC por archivo.")
+    parser.add_argument("--pdf", action="store_true", help="Escribir un informe PDF por archivo en <salida>/pdf/.")
+    args = parser.parse_args(argv)
+
+    archivos = listar_archivos(args.entradas)
+    if not archivos:
+        print("No se encontraron archivos CSV/XLSX en las entradas indicadas.", file=sys.stderr)
+        return 2
+
+    os.makedirs(args.salida, exist_ok=True)
+    dir_ldc = None
+    if not args.sin_ldc:
+        dir_ldc = os.path.join(args.salida, "ldc")
+        os.makedirs(dir_ldc, exist_ok=True)
+    dir_pdf = None
+    if args.pdf:
+        dir_pdf = os.path.join(args.salida, "pdf")
+        os.makedirs(dir_pdf, exist_ok=True)
+
+    parametros = {
+        "diurno_inicio": args.diurno_inicio,
+        "diurno_fin": args.diurno_fin,
+        "mes_referencia": args.mes_referencia,
+        "multiplicadores": args.multiplicadores or _leer_multiplicadores(None),
+        "resolucion": args.resolucion,
+        "dir_ldc": dir_ldc,
+        "dir_pdf": dir_pdf,
+        "raiz": os.path.commonpath([os.path.dirname(os.path.abspath(a)) for a in archivos]),
+    }
+
+    inicio = time.perf_counter()
+    resultados = procesar_lote(
+        [os.path.abspath(a) for a in archivos], parametros, workers=args.workers, progreso=_imprimir_progreso
+    )
+
+    destino = os.path.join(args.salida, f"resultados.{args.formato}")
+    if args.formato == "parquet":
+        resultados.to_parquet(destino, index=False)
+    else:
+        resultados.to_csv(destino, index=False)
+
+    fallidos = int((resultados["Estado"] != "ok").sum())
+    print(
+        f"✅ {len(resultados) - fallidos}/{len(resultados)} archivos procesados en "
+        f"{time.perf_counter() - inicio:.1f} s → {destino}",
+        file=sys.stderr,
+    )
+    return 1 if fallidos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
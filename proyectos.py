@@ -0,0 +1,351 @@
+# proyectos.py
+# -*- coding: utf-8 -*-
+"""
+Almacén persistente de proyectos en un archivo SQLite local.
+
+Cada proyecto guarda en un solo archivo su tabla de cargas, sus ajustes
+(multiplicadores estacionales, ventana diurna, mes de referencia...) y los
+resultados calculados. Las cargas se guardan una fila por carga, con el
+horario como máscara de bits (ver horario_bits.py) e índices por proyecto
+y por nombre de carga: reabrir un proyecto grande es una lectura indexada,
+no volver a subir y validar el archivo. Guardar desde el almacén de la
+sesión (AlmacenCargas) y abrir hacia él copian las máscaras tal cual, sin
+pasar por la tabla N×n; el archivo no reemplaza al almacén en memoria.
+
+Cada operación abre su propia conexión (Streamlit atiende cada sesión en
+un hilo) y el archivo usa journal WAL, de modo que varias sesiones pueden
+leer mientras otra guarda.
+"""
+import json
+import os
+import pickle
+import sqlite3
+import time
+from contextlib import closing, contextmanager
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+import horario_bits
+from almacen_cargas import AlmacenCargas
+from cache_resultados import huella
+from ingesta import columnas_tabla
+from motor_calculo import columnas_franjas, detectar_resolucion
+
+# Incrementar si cambia el esquema de las tablas
+VERSION_ESQUEMA = 1
+ARCHIVO_POR_DEFECTO = "proyectos_cuadro_carga.sqlite"
+# Segundos de espera si otra sesión está escribiendo
+ESPERA_BLOQUEO = 30
+FILAS_POR_LOTE = 10_000
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS proyectos (
+    id INTEGER PRIMARY KEY,
+    nombre TEXT NOT NULL UNIQUE,
+    resolucion INTEGER NOT NULL,
+    actualizado REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cargas (
+    proyecto_id INTEGER NOT NULL REFERENCES proyectos (id) ON DELETE CASCADE,
+    orden INTEGER NOT NULL,
+    carga TEXT,
+    potencia REAL,
+    horario BLOB NOT NULL,          -- máscara de bits, o float32 × n si la fila no es 0/1
+    irregular INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (proyecto_id, orden)
+) WITHOUT ROWID;
+CREATE UNIQUE INDEX IF NOT EXISTS cargas_por_nombre ON cargas (proyecto_id, carga);
+CREATE TABLE IF NOT EXISTS ajustes (
+    proyecto_id INTEGER NOT NULL REFERENCES proyectos (id) ON DELETE CASCADE,
+    clave TEXT NOT NULL,
+    valor TEXT NOT NULL,            -- JSON
+    PRIMARY KEY (proyecto_id, clave)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS resultados (
+    proyecto_id INTEGER NOT NULL REFERENCES proyectos (id) ON DELETE CASCADE,
+    nombre TEXT NOT NULL,
+    huella TEXT NOT NULL,
+    valor BLOB NOT NULL,            -- pickle
+    PRIMARY KEY (proyecto_id, nombre)
+) WITHOUT ROWID;
+"""
+
+
+def _a_filas(df: pd.DataFrame, resolucion: int):
+    """(carga, potencia, horario, irregular) por fila: las filas 0/1 como bits, el resto tal cual en float32."""
+    horario = df[columnas_franjas(resolucion)].apply(pd.to_numeric, errors="coerce").to_numpy(
+        dtype=np.float32, na_value=np.nan
+    )
+    binario = horario_bits.es_binario(horario)
+    mascaras = horario_bits.empaquetar(np.where(binario[:, None], horario, 0))
+    potencia = pd.to_numeric(df["Potencia (W)"], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    for k, (carga, valor) in enumerate(zip(df["Carga"].tolist(), potencia.tolist())):
+        carga = None if pd.isna(carga) else str(carga)
+        irregular = not binario[k]
+        datos = horario[k].tobytes() if irregular else mascaras[k:k + 1].tobytes()
+        yield carga, None if np.isnan(valor) else valor, datos, int(irregular)
+
+
+def _filas_compactas(nombres, potencia, mascaras, irregulares: dict):
+    """Como _a_filas, a partir de AlmacenCargas.compacto(): las máscaras se guardan sin desempaquetar."""
+    for k, (carga, valor) in enumerate(zip(nombres.tolist(), potencia.tolist())):
+        carga = None if pd.isna(carga) else str(carga)
+        irregular = k in irregulares
+        datos = irregulares[k].tobytes() if irregular else mascaras[k:k + 1].tobytes()
+        yield carga, None if np.isnan(valor) else valor, datos, int(irregular)
+
+
+class AlmacenProyectos:
+    """
+    Proyectos de cuadro de carga en un archivo SQLite ('ruta').
+    - guardar_proyecto / abrir_proyecto / abrir_almacen: tabla de cargas + ajustes completos.
+    - obtener_carga / guardar_carga / eliminar_carga: acceso indexado a una sola carga.
+    - guardar_resultado / leer_resultado: resultados calculados, validados por huella.
+    """
+
+    def __init__(self, ruta: str = ARCHIVO_POR_DEFECTO):
+        self.ruta = ruta
+        directorio = os.path.dirname(os.path.abspath(ruta))
+        os.makedirs(directorio, exist_ok=True)
+        with self._conexion() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.executescript(_ESQUEMA)
+            con.execute(f"PRAGMA user_version={VERSION_ESQUEMA}")
+
+    @contextmanager
+    def _conexion(self):
+        """Conexión propia de la operación; confirma al salir (o deshace si hubo un error)."""
+        with closing(sqlite3.connect(self.ruta, timeout=ESPERA_BLOQUEO)) as con:
+            con.execute("PRAGMA foreign_keys=ON")
+            with con:
+                yield con
+
+    def _id(self, con, proyecto: str) -> int:
+        fila = con.execute("SELECT id FROM proyectos WHERE nombre = ?", (proyecto,)).fetchone()
+        if fila is None:
+            raise KeyError(f"No existe el proyecto '{proyecto}'.")
+        return fila[0]
+
+    def _resolucion(self, con, proyecto_id: int) -> int:
+        return con.execute("SELECT resolucion FROM proyectos WHERE id = ?", (proyecto_id,)).fetchone()[0]
+
+    @staticmethod
+    def _tocar(con, proyecto_id: int):
+        con.execute("UPDATE proyectos SET actualizado = ? WHERE id = ?", (time.time(), proyecto_id))
+
+    # ---------- PROYECTOS ----------
+
+    def proyectos(self) -> pd.DataFrame:
+        """Proyectos guardados (Proyecto, Cargas, Franjas, Actualizado), el más reciente primero."""
+        with self._conexion() as con:
+            filas = con.execute(
+                "SELECT p.nombre, (SELECT COUNT(*) FROM cargas c WHERE c.proyecto_id = p.id), p.resolucion, "
+                "p.actualizado FROM proyectos p ORDER BY p.actualizado DESC"
+            ).fetchall()
+        tabla = pd.DataFrame(filas, columns=["Proyecto", "Cargas", "Franjas", "Actualizado"])
+        tabla["Actualizado"] = pd.to_datetime(tabla["Actualizado"], unit="s")
+        return tabla
+
+    def __contains__(self, proyecto: str) -> bool:
+        with self._conexion() as con:
+            return con.execute("SELECT 1 FROM proyectos WHERE nombre = ?", (proyecto,)).fetchone() is not None
+
+    def guardar_proyecto(self, proyecto: str, cargas, ajustes: dict = None):
+        """
+        Crea o sobrescribe 'proyecto' con 'cargas' (AlmacenCargas, o tabla con Carga, Potencia (W) y franjas;
+        'Item' se ignora) y, si se indican, sus 'ajustes'. Los resultados guardados se descartan: eran
+        de la tabla anterior. Los nombres de carga repetidos no se fusionan: se rechaza con ValueError.
+        """
+        if isinstance(cargas, AlmacenCargas):
+            compacto = cargas.compacto()
+            nombres = pd.Series(compacto[0], dtype=object)
+            resolucion = cargas.resolucion
+            filas = _filas_compactas(*compacto)
+        else:
+            nombres = cargas["Carga"]
+            resolucion = detectar_resolucion(cargas.columns)
+            filas = chain.from_iterable(
+                _a_filas(cargas.iloc[inicio:inicio + FILAS_POR_LOTE], resolucion)
+                for inicio in range(0, len(cargas), FILAS_POR_LOTE)
+            )
+        repetidas = nombres[nombres.notna() & nombres.duplicated()].unique()
+        if len(repetidas):
+            raise ValueError(f"Cargas duplicadas: {', '.join(map(str, repetidas[:5]))}. Corrígelas antes de guardar.")
+        with self._conexion() as con:
+            con.execute(
+                "INSERT INTO proyectos (nombre, resolucion, actualizado) VALUES (?, ?, ?) "
+                "ON CONFLICT (nombre) DO UPDATE SET resolucion = excluded.resolucion, actualizado = excluded.actualizado",
+                (proyecto, resolucion, time.time()),
+            )
+            proyecto_id = self._id(con, proyecto)
+            con.execute("DELETE FROM cargas WHERE proyecto_id = ?", (proyecto_id,))
+            con.execute("DELETE FROM resultados WHERE proyecto_id = ?", (proyecto_id,))
+            con.executemany(
+                "INSERT INTO cargas (proyecto_id, orden, carga, potencia, horario, irregular) VALUES (?, ?, ?, ?, ?, ?)",
+                ((proyecto_id, k, *fila) for k, fila in enumerate(filas)),
+            )
+            if ajustes is not None:
+                self._guardar_ajustes(con, proyecto_id, ajustes)
+
+    def _leer_proyecto(self, proyecto: str) -> tuple:
+        """(filas (carga, potencia, horario, irregular) en su orden, resolución, ajustes) de 'proyecto'."""
+        with self._conexion() as con:
+            proyecto_id = self._id(con, proyecto)
+            resolucion = self._resolucion(con, proyecto_id)
+            filas = con.execute(
+                "SELECT carga, potencia, horario, irregular FROM cargas WHERE proyecto_id = ? ORDER BY orden",
+                (proyecto_id,),
+            ).fetchall()
+            ajustes = self._leer_ajustes(con, proyecto_id)
+        return filas, resolucion, ajustes
+
+    def abrir_proyecto(self, proyecto: str) -> tuple:
+        """(tabla de cargas en su orden, con 'Item', ajustes) de 'proyecto'."""
+        filas, resolucion, ajustes = self._leer_proyecto(proyecto)
+        return self._a_tabla(filas, resolucion), ajustes
+
+    def abrir_almacen(self, proyecto: str) -> tuple:
+        """(AlmacenCargas, ajustes) de 'proyecto', armado con las máscaras guardadas (sin la tabla N×n)."""
+        filas, resolucion, ajustes = self._leer_proyecto(proyecto)
+        mascaras = np.zeros(len(filas), dtype=horario_bits.dtype_mascara(resolucion))
+        regulares = [k for k, fila in enumerate(filas) if not fila[3]]
+        if regulares:
+            mascaras[regulares] = np.frombuffer(b"".join(filas[k][2] for k in regulares), dtype=mascaras.dtype)
+        almacen = AlmacenCargas.desde_compacto(
+            [fila[0] for fila in filas],
+            np.array([np.nan if fila[1] is None else fila[1] for fila in filas], dtype=np.float64),
+            mascaras,
+            {k: np.frombuffer(fila[2], dtype=np.float32) for k, fila in enumerate(filas) if fila[3]},
+            resolucion,
+        )
+        return almacen, ajustes
+
+    def eliminar_proyecto(self, proyecto: str) -> bool:
+        with self._conexion() as con:
+            return con.execute("DELETE FROM proyectos WHERE nombre = ?", (proyecto,)).rowcount > 0
+
+    @staticmethod
+    def _a_tabla(filas: list, resolucion: int) -> pd.DataFrame:
+        columnas_horas = columnas_franjas(resolucion)
+        horario = np.zeros((len(filas), resolucion), dtype=np.float32)
+        regulares = [k for k, fila in enumerate(filas) if not fila[3]]
+        if regulares:
+            mascaras = np.frombuffer(b"".join(filas[k][2] for k in regulares), dtype=horario_bits.dtype_mascara(resolucion))
+            horario[regulares] = horario_bits.desempaquetar(mascaras)
+        for k, fila in enumerate(filas):
+            if fila[3]:
+                horario[k] = np.frombuffer(fila[2], dtype=np.float32)
+        datos = {
+            "Item": pd.array(np.arange(1, len(filas) + 1), dtype="Int64"),
+            "Carga": pd.Series([fila[0] for fila in filas], dtype=object),
+            "Potencia (W)": pd.Series([fila[1] for fila in filas], dtype=np.float64),
+        }
+        # uint8 si todas las horas son 0/1, como la vista de AlmacenCargas
+        horario = horario if any(fila[3] for fila in filas) else horario.astype(np.uint8)
+        datos.update({h: horario[:, j] for j, h in enumerate(columnas_horas)})
+        return pd.DataFrame(datos, columns=columnas_tabla(resolucion))
+
+    # ---------- CARGAS (ACCESO INDEXADO) ----------
+
+    def obtener_carga(self, proyecto: str, carga: str) -> dict:
+        """Fila de una carga como dict {'Carga', 'Potencia (W)', franjas}; None si no existe."""
+        with self._conexion() as con:
+            proyecto_id = self._id(con, proyecto)
+            resolucion = self._resolucion(con, proyecto_id)
+            fila = con.execute(
+                "SELECT carga, potencia, horario, irregular FROM cargas WHERE proyecto_id = ? AND carga = ?",
+                (proyecto_id, carga),
+            ).fetchone()
+        if fila is None:
+            return None
+        return self._a_tabla([fila], resolucion).drop(columns="Item").iloc[0].to_dict()
+
+    def guardar_carga(self, proyecto: str, carga: str, potencia: float, horario):
+        """Agrega o reemplaza una carga (la nueva va al final, como AlmacenCargas.upsert)."""
+        with self._conexion() as con:
+            proyecto_id = self._id(con, proyecto)
+            resolucion = self._resolucion(con, proyecto_id)
+            df = pd.DataFrame([[carga, potencia, *horario]], columns=columnas_tabla(resolucion, item=False))
+            orden = con.execute(
+                "SELECT COALESCE(MAX(orden), -1) + 1 FROM cargas WHERE proyecto_id = ?", (proyecto_id,)
+            ).fetchone()[0]
+            con.execute("DELETE FROM cargas WHERE proyecto_id = ? AND carga = ?", (proyecto_id, carga))
+            con.execute(
+                "INSERT INTO cargas (proyecto_id, orden, carga, potencia, horario, irregular) VALUES (?, ?, ?, ?, ?, ?)",
+                (proyecto_id, orden, *next(_a_filas(df, resolucion))),
+            )
+            con.execute("DELETE FROM resultados WHERE proyecto_id = ?", (proyecto_id,))
+            self._tocar(con, proyecto_id)
+
+    def eliminar_carga(self, proyecto: str, carga: str) -> bool:
+        with self._conexion() as con:
+            proyecto_id = self._id(con, proyecto)
+            eliminada = con.execute(
+                "DELETE FROM cargas WHERE proyecto_id = ? AND carga = ?", (proyecto_id, carga)
+            ).rowcount > 0
+            if eliminada:
+                con.execute("DELETE FROM resultados WHERE proyecto_id = ?", (proyecto_id,))
+                self._tocar(con, proyecto_id)
+        return eliminada
+
+    # ---------- AJUSTES ----------
+
+    @staticmethod
+    def _guardar_ajustes(con, proyecto_id: int, ajustes: dict):
+        con.executemany(
+            "INSERT INTO ajustes (proyecto_id, clave, valor) VALUES (?, ?, ?) "
+            "ON CONFLICT (proyecto_id, clave) DO UPDATE SET valor = excluded.valor",
+            [(proyecto_id, str(clave), json.dumps(valor, default=float)) for clave, valor in ajustes.items()],
+        )
+
+    @staticmethod
+    def _leer_ajustes(con, proyecto_id: int) -> dict:
+        filas = con.execute("SELECT clave, valor FROM ajustes WHERE proyecto_id = ?", (proyecto_id,)).fetchall()
+        return {clave: json.loads(valor) for clave, valor in filas}
+
+    def guardar_ajustes(self, proyecto: str, ajustes: dict):
+        """Agrega o actualiza ajustes (valores serializables en JSON) sin tocar la tabla de cargas."""
+        with self._conexion() as con:
+            proyecto_id = self._id(con, proyecto)
+            self._guardar_ajustes(con, proyecto_id, ajustes)
+            self._tocar(con, proyecto_id)
+
+    def leer_ajustes(self, proyecto: str) -> dict:
+        with self._conexion() as con:
+            return self._leer_ajustes(con, self._id(con, proyecto))
+
+    # ---------- RESULTADOS ----------
+
+    def guardar_resultado(self, proyecto: str, nombre: str, valor, clave: str = None) -> bool:
+        """
+        Guarda un resultado calculado ('clave': huella de las entradas; por defecto, la del valor).
+        Si ya estaba guardado con la misma clave no se reescribe. Devuelve True si se escribió.
+        """
+        clave = clave or huella(valor)
+        with self._conexion() as con:
+            proyecto_id = self._id(con, proyecto)
+            fila = con.execute(
+                "SELECT huella FROM resultados WHERE proyecto_id = ? AND nombre = ?", (proyecto_id, nombre)
+            ).fetchone()
+            if fila is not None and fila[0] == clave:
+                return False
+            con.execute(
+                "INSERT INTO resultados (proyecto_id, nombre, huella, valor) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (proyecto_id, nombre) DO UPDATE SET huella = excluded.huella, valor = excluded.valor",
+                (proyecto_id, nombre, clave, pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL)),
+            )
+        return True
+
+    def leer_resultado(self, proyecto: str, nombre: str, clave: str = None, defecto=None):
+        """Resultado guardado; 'defecto' si no existe o si se indica 'clave' y no coincide."""
+        with self._conexion() as con:
+            fila = con.execute(
+                "SELECT r.huella, r.valor FROM resultados r JOIN proyectos p ON p.id = r.proyecto_id "
+                "WHERE p.nombre = ? AND r.nombre = ?",
+                (proyecto, nombre),
+            ).fetchone()
+        if fila is None or (clave is not None and fila[0] != clave):
+            return defecto
+        return pickle.loads(fila[1])
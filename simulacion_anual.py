@@ -0,0 +1,153 @@
+# simulacion_anual.py
+# -*- coding: utf-8 -*-
+"""
+Simulación anual hora a hora (8760 h, u 8784 h en años bisiestos).
+
+El perfil diario del sistema es lineal en el horario (potencia · horario), así
+que basta un producto N×n por tipo de día (laborable, fin de semana, festivo)
+para obtener tres perfiles de n franjas. El año se arma indexando esos
+perfiles con el calendario real y escalándolos por el multiplicador del mes:
+una matriz días×n (p.ej. 365×24) sin materializar nunca N×8760 por carga.
+"""
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from constructor_ldc import construir_ldc
+from motor_calculo import ORDEN_MESES, horas_por_franja, normalizar_multiplicadores
+
+# Tipos de día (índices de la matriz de perfiles)
+LABORABLE, FIN_DE_SEMANA, FESTIVO = 0, 1, 2
+TIPOS_DIA = ("Laborable", "Fin de semana", "Festivo")
+DIAS_FIN_DE_SEMANA = (5, 6)  # sábado y domingo (lunes = 0)
+DIAS_POR_BLOQUE = 31
+
+
+def es_bisiesto(anio: int) -> bool:
+    return anio % 4 == 0 and (anio % 100 != 0 or anio % 400 == 0)
+
+
+def parsear_festivos(texto: str):
+    """
+    Fechas de festivos desde texto, una por línea o separadas por comas,
+    en formato 'AAAA-MM-DD' o 'DD/MM/AAAA'.
+    Devuelve (fechas válidas ordenadas, entradas no reconocidas).
+    """
+    entradas = pd.Series(
+        [e.strip() for linea in (texto or "").splitlines() for e in linea.split(",") if e.strip()], dtype=object
+    )
+    fechas = pd.to_datetime(entradas, format="%Y-%m-%d", errors="coerce").fillna(
+        pd.to_datetime(entradas, format="%d/%m/%Y", errors="coerce")
+    )
+    invalidas = [e for e, f in zip(entradas, fechas) if pd.isna(f)]
+    validas = sorted({f.date() for f in fechas if not pd.isna(f)})
+    return validas, invalidas
+
+
+def calendario(anio: int, festivos=(), dias_fin_de_semana=DIAS_FIN_DE_SEMANA) -> pd.DataFrame:
+    """
+    Un registro por día del año: 'Fecha', 'Mes' (0 = Enero) y 'Tipo' (LABORABLE / FIN_DE_SEMANA / FESTIVO).
+    Un festivo que cae en fin de semana cuenta como festivo.
+    """
+    fechas = pd.date_range(datetime.date(anio, 1, 1), datetime.date(anio, 12, 31), freq="D")
+    tipo = np.where(np.isin(fechas.dayofweek, list(dias_fin_de_semana)), FIN_DE_SEMANA, LABORABLE).astype(np.uint8)
+    if festivos:
+        tipo[fechas.isin(pd.to_datetime(list(festivos)))] = FESTIVO
+    return pd.DataFrame({"Fecha": fechas, "Mes": (fechas.month - 1).astype(np.uint8), "Tipo": tipo})
+
+
+def _factores_mes(multiplicadores) -> np.ndarray:
+    multiplicadores = normalizar_multiplicadores(multiplicadores)
+    return np.array([multiplicadores[mes] for mes in ORDEN_MESES], dtype=np.float64)
+
+
+def iterar_bloques(perfiles_tipo, cal: pd.DataFrame, multiplicadores=None, dias_por_bloque: int = DIAS_POR_BLOQUE):
+    """
+    Generador perezoso del perfil anual: entrega (días del bloque, matriz días×n en W).
+    'perfiles_tipo': matriz 3×n (laborable, fin de semana, festivo).
+    """
+    perfiles_tipo = np.asarray(perfiles_tipo, dtype=np.float64)
+    factores = _factores_mes(multiplicadores)
+    tipos = cal["Tipo"].to_numpy()
+    meses = cal["Mes"].to_numpy()
+    for inicio in range(0, len(cal), dias_por_bloque):
+        fin = inicio + dias_por_bloque
+        yield cal.iloc[inicio:fin], perfiles_tipo[tipos[inicio:fin]] * factores[meses[inicio:fin], None]
+
+
+def perfil_anual(perfiles_tipo, cal: pd.DataFrame, multiplicadores=None) -> np.ndarray:
+    """Perfil anual completo (días×n, W): perfil del tipo de día × multiplicador del mes."""
+    return np.concatenate([bloque for _, bloque in iterar_bloques(perfiles_tipo, cal, multiplicadores)])
+
+
+def resumen_anual(perfil: np.ndarray, cal: pd.DataFrame) -> dict:
+    """Picos, base, energía mensual y por tipo de día y factor de carga del año simulado."""
+    dias, n = perfil.shape
+    paso = horas_por_franja(n)
+    energia_dia = perfil.sum(axis=1) * paso / 1000.0
+    pico_dia = perfil.max(axis=1)
+    inicios_mes = np.flatnonzero(np.diff(cal["Mes"].to_numpy(), prepend=-1))
+
+    k_max, k_min = int(np.argmax(perfil)), int(np.argmin(perfil))
+    fechas = cal["Fecha"]
+
+    def _momento(k):
+        return fechas.iloc[k // n] + pd.Timedelta(minutes=(k % n) * (24 * 60 // n))
+
+    horas = dias * 24
+    energia_anual = float(energia_dia.sum())
+    potencia_media = energia_anual * 1000 / horas
+    potencia_max = float(perfil.max())
+    tipos = cal["Tipo"].to_numpy()
+    return {
+        "horas_anio": horas,
+        "energia_anual_kwh": energia_anual,
+        "energia_mensual_kwh": np.add.reduceat(energia_dia, inicios_mes),
+        "pico_mensual_w": np.maximum.reduceat(pico_dia, inicios_mes),
+        "energia_por_tipo_kwh": np.bincount(tipos, weights=energia_dia, minlength=len(TIPOS_DIA)),
+        "dias_por_tipo": np.bincount(tipos, minlength=len(TIPOS_DIA)),
+        "potencia_max_anual_w": potencia_max,
+        "momento_max_anual": _momento(k_max),
+        "potencia_min_anual_w": float(perfil.min()),
+        "momento_min_anual": _momento(k_min),
+        "potencia_media_anual_w": potencia_media,
+        "factor_carga_anual": (potencia_media / potencia_max) * 100 if potencia_max > 0 else 0,
+    }
+
+
+def curva_duracion_anual(perfil: np.ndarray, metodo: str = "auto") -> dict:
+    """
+    LDC anual (ver constructor_ldc.construir_ldc): pico, media y percentiles exactos
+    y la curva ya reducida para el gráfico, duración en horas/año.
+    """
+    return construir_ldc(np.asarray(perfil).reshape(-1), horas_por_franja(perfil.shape[1]), metodo=metodo)
+
+
+def curva_duracion_completa(perfil: np.ndarray) -> pd.DataFrame:
+    """LDC anual con todos sus puntos (sin reducir), para el gráfico renderizado en el servidor."""
+    ordenado = np.sort(np.asarray(perfil, dtype=np.float64).reshape(-1))[::-1]
+    duraciones = np.arange(1, ordenado.size + 1) * horas_por_franja(perfil.shape[1])
+    return pd.DataFrame({"Potencia Total (W)": ordenado, "Duración (horas)": duraciones})
+
+
+def serie_anual(perfil: np.ndarray, cal: pd.DataFrame) -> pd.DataFrame:
+    """Serie temporal del año ('Fecha y hora', 'Tipo de día', 'Potencia (W)') para exportar."""
+    dias, n = perfil.shape
+    minutos = 24 * 60 // n
+    momentos = pd.date_range(cal["Fecha"].iloc[0], periods=dias * n, freq=f"{minutos}min")
+    return pd.DataFrame({
+        "Fecha y hora": momentos,
+        "Tipo de día": pd.Categorical.from_codes(np.repeat(cal["Tipo"].to_numpy(), n), categories=list(TIPOS_DIA)),
+        "Potencia (W)": perfil.reshape(-1),
+    })
+
+
+def tabla_mensual_anual(resumen: dict, cal: pd.DataFrame) -> pd.DataFrame:
+    """Energía y pico por mes del año simulado (con los días reales de cada mes)."""
+    return pd.DataFrame({
+        "Mes": pd.Categorical(ORDEN_MESES, categories=ORDEN_MESES, ordered=True),
+        "Días": np.bincount(cal["Mes"].to_numpy(), minlength=12),
+        "Energía (kWh)": resumen["energia_mensual_kwh"],
+        "Pico (W)": resumen["pico_mensual_w"],
+    })
@@ -0,0 +1,163 @@
+# tabla_segmentos.py
+# -*- coding: utf-8 -*-
+"""
+Tablas precalculadas de ventanas diurnas/nocturnas sobre el perfil diario.
+
+El perfil de n franjas se duplica (para las ventanas que cruzan la
+medianoche) y se guardan sus sumas acumuladas y una tabla dispersa (sparse
+table) de máximos. Así la energía, el pico, la hora del pico y el factor de
+carga de cualquier ventana [inicio, fin) son consultas O(1), y la matriz
+24×24 de todas las ventanas diurnas posibles se arma de una vez.
+"""
+import numpy as np
+import pandas as pd
+
+from motor_calculo import horas_por_franja
+
+HORAS_DIA = 24
+
+
+class TablaSegmentos:
+    """
+    Sumas acumuladas circulares + tabla dispersa de máximos de un perfil diario (W).
+    Las ventanas se indican en franjas: (inicio, longitud), con 0 ≤ inicio < n y 0 ≤ longitud ≤ n.
+    """
+
+    def __init__(self, perfil):
+        self.perfil = np.asarray(perfil, dtype=np.float64).reshape(-1)
+        self.n = n = len(self.perfil)
+        self.paso = horas_por_franja(n)
+        doble = np.concatenate([self.perfil, self.perfil])
+        self._acumulada = np.concatenate([[0.0], np.cumsum(doble)])
+
+        # _maximos[k, i] = índice (en 'doble') del máximo de doble[i:i + 2**k]
+        niveles = [np.arange(2 * n)]
+        while 2 ** len(niveles) <= n:
+            anterior, salto = niveles[-1], 2 ** (len(niveles) - 1)
+            izquierda, derecha = anterior[:-salto], anterior[salto:]
+            niveles.append(self._elegir(izquierda, derecha))
+        ancho = 2 * n
+        self._maximos = np.stack([np.pad(nivel, (0, ancho - len(nivel))) for nivel in niveles])
+
+    def _elegir(self, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        """
+        Índice del mayor valor; en empate, el primero dentro de la ventana (posición en 'doble' a partir
+        de su inicio), como idxmax sobre las franjas del segmento en su orden (ver get_horas_segmento).
+        """
+        doble_a, doble_b = self.perfil[a % self.n], self.perfil[b % self.n]
+        return np.where((doble_a > doble_b) | ((doble_a == doble_b) & (a <= b)), a, b)
+
+    def __eq__(self, otra) -> bool:
+        return isinstance(otra, TablaSegmentos) and np.array_equal(self.perfil, otra.perfil)
+
+    __hash__ = None
+
+    # ---------- VENTANAS ----------
+
+    def ventana(self, inicio_horas, fin_horas):
+        """
+        Ventana(s) diurna(s) [inicio, fin) en horas → (inicio, longitud) en franjas (escalares o vectores),
+        con la misma convención que motor_calculo.mascara_segmento (inicio == fin: todo el día).
+        """
+        inicio_horas, fin_horas = np.asarray(inicio_horas), np.asarray(fin_horas)
+        k_inicio = np.ceil(inicio_horas / self.paso).astype(np.int64)
+        k_fin = np.ceil(fin_horas / self.paso).astype(np.int64)
+        longitud = np.where(inicio_horas < fin_horas, k_fin - k_inicio, k_fin + self.n - k_inicio)
+        return k_inicio % self.n, np.clip(longitud, 0, self.n)
+
+    def complemento(self, inicio, longitud):
+        """Ventana nocturna: el resto del día."""
+        return (np.asarray(inicio) + np.asarray(longitud)) % self.n, self.n - np.asarray(longitud)
+
+    def energia(self, inicio, longitud) -> np.ndarray:
+        """Energía (kWh) de las ventanas; acepta escalares o vectores."""
+        inicio, longitud = np.asarray(inicio), np.asarray(longitud)
+        return (self._acumulada[inicio + longitud] - self._acumulada[inicio]) * self.paso / 1000.0
+
+    def pico(self, inicio, longitud):
+        """(pico W, franja del pico) de las ventanas; (0, -1) si la ventana está vacía."""
+        inicio, longitud = np.asarray(inicio), np.asarray(longitud)
+        vacia = longitud <= 0
+        largo = np.where(vacia, 1, longitud)
+        nivel = np.floor(np.log2(largo)).astype(np.int64)
+        a = self._maximos[nivel, inicio]
+        b = self._maximos[nivel, inicio + largo - (1 << nivel)]
+        franja = self._elegir(a, b) % self.n
+        return np.where(vacia, 0.0, self.perfil[franja]), np.where(vacia, -1, franja)
+
+    def resumen(self, inicio, longitud) -> dict:
+        """Horas, energía (kWh), media (W), pico (W), hora del pico y factor de carga (%) de las ventanas."""
+        longitud = np.asarray(longitud)
+        horas = longitud * self.paso
+        energia = self.energia(inicio, longitud)
+        pico, franja = self.pico(inicio, longitud)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            media = np.where(longitud > 0, energia * 1000 / np.where(horas > 0, horas, 1), 0.0)
+            factor = np.where(pico > 0, media / np.where(pico > 0, pico, 1) * 100, 0.0)
+        return {"horas": horas, "energia_kwh": energia, "media_w": media, "pico_w": pico,
+                "hora_pico": franja * self.paso, "factor_carga": factor}
+
+    # ---------- MÉTRICAS (misma salida que motor_calculo.metricas_perfil) ----------
+
+    def metricas(self, inicio_horas, fin_horas, sufijo: str = "", sufijo_factor: str = "") -> dict:
+        """Métricas diurnas/nocturnas de la ventana [inicio, fin) por consulta, sin recorrer el perfil."""
+        inicio, longitud = self.ventana(inicio_horas, fin_horas)
+        dia = self.resumen(inicio, longitud)
+        noche = self.resumen(*self.complemento(inicio, longitud))
+
+        def _hora(resumen):
+            return 'N/A' if resumen["horas"] == 0 else _como_hora(resumen["hora_pico"], self.paso)
+
+        energia_total = float(dia["energia_kwh"] + noche["energia_kwh"])
+        potencia_max = float(self.perfil.max())
+        potencia_media = energia_total * 1000 / HORAS_DIA
+        s, sf = sufijo, sufijo_factor
+        return {
+            f"energia_diurna_dia{s}": float(dia["energia_kwh"]),
+            f"energia_nocturna_dia{s}": float(noche["energia_kwh"]),
+            f"energia_total_dia{s}": energia_total,
+            f"potencia_max_w{s}": potencia_max,
+            f"hora_max{s}": _como_hora(int(np.argmax(self.perfil)) * self.paso, self.paso),
+            f"potencia_min_w{s}": float(self.perfil.min()),
+            f"hora_min{s}": _como_hora(int(np.argmin(self.perfil)) * self.paso, self.paso),
+            f"potencia_media_total_w{s}": potencia_media,
+            f"potencia_media_diurna_w{s}": float(dia["media_w"]),
+            f"potencia_max_diurna_w{s}": float(dia["pico_w"]),
+            f"hora_max_diurna{s}": _hora(dia),
+            f"potencia_media_nocturna_w{s}": float(noche["media_w"]),
+            f"potencia_max_nocturna_w{s}": float(noche["pico_w"]),
+            f"hora_max_nocturna{s}": _hora(noche),
+            f"factor_carga_general{sf}": (potencia_media / potencia_max) * 100 if potencia_max > 0 else 0,
+            f"factor_carga_diurno{sf}": float(dia["factor_carga"]),
+            f"factor_carga_nocturno{sf}": float(noche["factor_carga"]),
+        }
+
+    def matriz_ventanas(self) -> pd.DataFrame:
+        """
+        Todas las ventanas diurnas con inicio y fin en horas enteras (24×24 = 576),
+        con sus métricas diurnas y nocturnas. Inicio == fin es el día completo.
+        """
+        inicio_h, fin_h = np.meshgrid(np.arange(HORAS_DIA), np.arange(HORAS_DIA), indexing="ij")
+        inicio_h, fin_h = inicio_h.ravel(), fin_h.ravel()
+        franjas_hora = round(1 / self.paso)
+        inicio = inicio_h * franjas_hora
+        longitud = np.where(fin_h > inicio_h, fin_h - inicio_h, fin_h + HORAS_DIA - inicio_h) * franjas_hora
+        dia = self.resumen(inicio, longitud)
+        noche = self.resumen(*self.complemento(inicio, longitud))
+        return pd.DataFrame({
+            "Inicio diurno": inicio_h,
+            "Fin diurno": fin_h,
+            "Horas diurnas": dia["horas"],
+            "Energía diurna (kWh)": dia["energia_kwh"],
+            "Pico diurno (W)": dia["pico_w"],
+            "Hora pico diurno": dia["hora_pico"],
+            "Factor de carga diurno (%)": dia["factor_carga"],
+            "Energía nocturna (kWh)": noche["energia_kwh"],
+            "Pico nocturno (W)": noche["pico_w"],
+            "Factor de carga nocturno (%)": noche["factor_carga"],
+        })
+
+
+def _como_hora(horas, paso):
+    """Hora del pico como int con resolución horaria (igual que metricas_perfil), float si es subhoraria."""
+    return int(horas) if paso == 1 else float(horas)
@@ -0,0 +1,224 @@
+# validacion.py
+# -*- coding: utf-8 -*-
+"""
+Validación de la tabla de cargas (compartida por la pestaña 1 y el procesamiento por lotes).
+
+Todas las comprobaciones se hacen sobre la matriz N×n completa (24 columnas
+horarias o 48/96/288 subhorarias) y la columna de potencia a la vez (sin
+bucles por columna) y producen un índice compacto fila/columna de las celdas
+con problemas.
+"""
+import numpy as np
+import pandas as pd
+
+from ingesta import columnas_tabla
+from motor_calculo import columnas_franjas, detectar_resolucion
+
+# Tipos de problema del índice de errores
+NO_NUMERICO = "no numérico"
+FALTANTE = "faltante"
+NEGATIVO = "negativo"
+FUERA_DE_RANGO = "distinto de 0 o 1"
+DUPLICADO = "carga duplicada"
+
+MAX_ERRORES = 10_000
+
+
+def _como_numerico(serie: pd.Series) -> np.ndarray:
+    """Columna → float64 (NaN si no es convertible) sin lanzar excepciones."""
+    if pd.api.types.is_numeric_dtype(serie) and not pd.api.types.is_bool_dtype(serie):
+        return serie.to_numpy(dtype=np.float64, na_value=np.nan)
+    return pd.to_numeric(serie, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _columnas_franjas(df: pd.DataFrame) -> list:
+    return columnas_franjas(detectar_resolucion(df.columns))
+
+
+def _matriz_horas(df: pd.DataFrame, columnas_horas: list) -> np.ndarray:
+    """Bloque N×n como float64; convierte columna a columna solo si alguna no es numérica."""
+    bloque = df[columnas_horas]
+    if all(pd.api.types.is_numeric_dtype(t) and not pd.api.types.is_bool_dtype(t) for t in bloque.dtypes):
+        return bloque.to_numpy(dtype=np.float64, na_value=np.nan)
+    return np.column_stack([_como_numerico(bloque[c]) for c in columnas_horas])
+
+
+def indice_errores(df: pd.DataFrame, fila_inicial: int = 0, max_errores: int = MAX_ERRORES,
+                   duplicados: bool = True) -> pd.DataFrame:
+    """
+    Índice compacto de celdas con problemas: columnas 'Fila' (posición, 0 = primera fila),
+    'Columna' y 'Problema'. Se limita a 'max_errores' entradas.
+    'fila_inicial' desplaza las filas (útil al validar por bloques); con duplicados=False no se
+    buscan cargas duplicadas (por bloques se comprueban en todo el archivo, aparte).
+    """
+    n = len(df)
+    filas, columnas, problemas = [], [], []
+
+    def _agregar(mascara_filas, columna, problema):
+        posiciones = np.flatnonzero(mascara_filas)
+        if posiciones.size:
+            filas.append(posiciones)
+            columnas.append(np.full(posiciones.size, columna, dtype=object))
+            problemas.append(np.full(posiciones.size, problema, dtype=object))
+
+    # Potencia: no numérica / faltante / negativa
+    potencia_original = df["Potencia (W)"]
+    potencia = _como_numerico(potencia_original)
+    faltante = potencia_original.isnull().to_numpy()
+    _agregar(faltante, "Potencia (W)", FALTANTE)
+    _agregar(np.isnan(potencia) & ~faltante, "Potencia (W)", NO_NUMERICO)
+    _agregar(potencia < 0, "Potencia (W)", NEGATIVO)
+
+    # Carga: faltante / duplicada
+    cargas = df["Carga"]
+    _agregar(cargas.isnull().to_numpy(), "Carga", FALTANTE)
+    if duplicados:
+        _agregar((cargas.duplicated() & cargas.notnull()).to_numpy(), "Carga", DUPLICADO)
+
+    # Horas: una sola pasada sobre la matriz N×n
+    columnas_horas = _columnas_franjas(df)
+    horas_faltantes = df[columnas_horas].isnull().to_numpy()
+    horas = _matriz_horas(df, columnas_horas)
+    no_numericas = np.isnan(horas) & ~horas_faltantes
+    fuera_rango = ~np.isnan(horas) & (horas != 0) & (horas != 1)
+    for mascara, problema in ((horas_faltantes, FALTANTE), (no_numericas, NO_NUMERICO), (fuera_rango, FUERA_DE_RANGO)):
+        if mascara.any():
+            i, j = np.nonzero(mascara)
+            filas.append(i)
+            columnas.append(np.asarray(columnas_horas, dtype=object)[j])
+            problemas.append(np.full(i.size, problema, dtype=object))
+
+    if not filas:
+        return pd.DataFrame({
+            "Fila": pd.Series(dtype="int64"),
+            "Columna": pd.Categorical([]),
+            "Problema": pd.Categorical([]),
+        })
+
+    indice = pd.DataFrame({
+        "Fila": np.concatenate(filas).astype(np.int64) + fila_inicial,
+        "Columna": pd.Categorical(np.concatenate(columnas)),
+        "Problema": pd.Categorical(np.concatenate(problemas)),
+    })
+    indice = indice.sort_values(["Fila"], kind="stable").head(max_errores).reset_index(drop=True)
+    indice.attrs["total"] = int(sum(f.size for f in filas))
+    indice.attrs["filas"] = n
+    return indice
+
+
+def pagina_errores(indice: pd.DataFrame, pagina: int = 1, tamano: int = 100) -> pd.DataFrame:
+    """Página 'pagina' (1 = primera) del índice de errores, con 'Fila' en base 1 (igual que 'Item')."""
+    inicio = (max(pagina, 1) - 1) * tamano
+    vista = indice.iloc[inicio:inicio + tamano].copy()
+    vista["Fila"] = vista["Fila"] + 1
+    return vista
+
+
+def indice_ventana(indice: pd.DataFrame, posiciones: np.ndarray) -> pd.DataFrame:
+    """Índice restringido a las filas 'posiciones' de la tabla (p.ej. una página del editor), con 'Fila' relativa a ellas."""
+    relativas = pd.Index(posiciones).get_indexer(indice["Fila"].to_numpy())
+    vista = indice[relativas >= 0].copy()
+    vista["Fila"] = relativas[relativas >= 0]
+    return vista
+
+
+def estilos_errores(indice: pd.DataFrame, df: pd.DataFrame, color: str = "#ffb3b3") -> pd.DataFrame:
+    """Matriz de estilos CSS (misma forma que 'df') para resaltar en el editor las celdas del índice."""
+    estilos = np.full(df.shape, "", dtype=object)
+    posicion_columna = {c: k for k, c in enumerate(df.columns)}
+    cols = indice["Columna"].astype(str).map(posicion_columna)
+    validas = cols.notnull().to_numpy() & (indice["Fila"].to_numpy() < len(df))
+    estilos[indice["Fila"].to_numpy()[validas], cols.to_numpy()[validas].astype(int)] = f"background-color: {color}"
+    return pd.DataFrame(estilos, index=df.index, columns=df.columns)
+
+
+def _primeras_filas(filas: np.ndarray, limite: int = 5) -> str:
+    texto = ", ".join(str(f + 1) for f in filas[:limite])
+    return texto + ("…" if len(filas) > limite else "")
+
+
+def validar_datos(df: pd.DataFrame, columnas=None, indice: pd.DataFrame = None) -> list:
+    """
+    Devuelve la lista de mensajes de error (vacía si la tabla es válida).
+    'columnas': columnas requeridas (por defecto, las de la resolución detectada, con 'Item').
+    """
+    errores = []
+    if columnas is None:
+        columnas = columnas_tabla(detectar_resolucion(df.columns))
+
+    # Columnas requeridas
+    if not all(col in df.columns for col in columnas):
+        errores.append("❌ Faltan columnas requeridas o el formato no es correcto.")
+        return errores
+
+    if indice is None:
+        indice = indice_errores(df)
+    if indice.empty:
+        return errores
+
+    # Potencia debe ser numérica y no negativa
+    if not pd.api.types.is_numeric_dtype(df["Potencia (W)"]):
+        errores.append("⚠️ 'Potencia (W)' debe ser un valor numérico.")
+
+    grupos = indice.groupby(["Columna", "Problema"], observed=True, sort=False)["Fila"]
+    resumen = {clave: filas.to_numpy() for clave, filas in grupos}
+
+    potencia_mala = [resumen.get(("Potencia (W)", p)) for p in (NO_NUMERICO, FALTANTE)]
+    potencia_mala = np.sort(np.concatenate([f for f in potencia_mala if f is not None] or [np.array([], dtype=np.int64)]))
+    if potencia_mala.size:
+        errores.append(
+            f"⚠️ Hay valores no numéricos o faltantes en 'Potencia (W)' ({potencia_mala.size} filas: "
+            f"{_primeras_filas(potencia_mala)}). Revise el archivo."
+        )
+    if ("Potencia (W)", NEGATIVO) in resumen:
+        filas = resumen[("Potencia (W)", NEGATIVO)]
+        errores.append(f"⚠️ Hay valores negativos en 'Potencia (W)' ({filas.size} filas: {_primeras_filas(filas)}).")
+
+    # Columnas de horas (solo 0 o 1)
+    for col in _columnas_franjas(df):
+        malas = [resumen.get((col, p)) for p in (NO_NUMERICO, FUERA_DE_RANGO)]
+        malas = [f for f in malas if f is not None]
+        if malas:
+            filas = np.sort(np.concatenate(malas))
+            errores.append(
+                f"❌ La columna {col} contiene valores distintos de 0 o 1 ({filas.size} filas: {_primeras_filas(filas)})."
+            )
+
+    # Faltantes (fuera de Potencia (W), que ya se reportó)
+    faltantes = indice[(indice["Problema"] == FALTANTE) & (indice["Columna"] != "Potencia (W)")]
+    if not faltantes.empty:
+        errores.append(
+            f"⚠️ Hay valores faltantes en la tabla ({len(faltantes)} celdas, filas: "
+            f"{_primeras_filas(np.unique(faltantes['Fila'].to_numpy()))})."
+        )
+
+    # Duplicados
+    if ("Carga", DUPLICADO) in resumen:
+        filas = resumen[("Carga", DUPLICADO)]
+        errores.append(f"⚠️ Existen cargas duplicadas ({filas.size} filas: {_primeras_filas(filas)}).")
+
+    total = indice.attrs.get("total", len(indice))
+    if total > len(indice):
+        errores.append(f"ℹ️ Se muestran los primeros {len(indice):,} de {total:,} problemas.")
+    return errores
+
+
+def validar_bloque(bloque: pd.DataFrame, fila_inicial: int = 0, max_errores: int = 50) -> list:
+    """
+    Valida un bloque ya convertido a numérico (NaN = celda no numérica o vacía).
+    Devuelve mensajes con la fila del archivo (1 = primera fila de datos) y la columna.
+    Los duplicados entre bloques se comprueban aparte (ver ingesta.ingerir_por_bloques).
+    """
+    # Sin duplicados antes de truncar a 'max_errores', para que no desplacen a los demás errores
+    indice = indice_errores(bloque, fila_inicial=fila_inicial, max_errores=max_errores, duplicados=False)
+    errores = []
+    for fila, columna, problema in indice.itertuples(index=False):
+        if columna not in ("Carga", "Potencia (W)"):
+            errores.append(f"❌ Fila {fila + 1}, columna {columna}: valor distinto de 0 o 1.")
+        elif columna == "Carga":
+            errores.append(f"⚠️ Fila {fila + 1}: falta el nombre de la carga.")
+        elif problema == NEGATIVO:
+            errores.append(f"⚠️ Fila {fila + 1}: 'Potencia (W)' negativa.")
+        else:
+            errores.append(f"⚠️ Fila {fila + 1}: 'Potencia (W)' no numérica o faltante.")
+    return errores